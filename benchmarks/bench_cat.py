@@ -0,0 +1,239 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''CAT command path latency and throughput benchmarks.
+
+Runs against `qdxcat.QDXEmulator` with a configurable link latency, so no QDX is required. Results are written as JSON to compare firmware and library versions.
+
+Usage:
+```
+python benchmarks/bench_cat.py --latency 0.002 --jitter 0.001 --output results.json
+```
+'''
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+
+# run from a source checkout without installing
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import qdxcat
+from qdxcat.emulator import QDXEmulator
+
+
+def percentiles(samples):
+    '''Summarize latency samples.
+
+    Args:
+        samples (list): Latency samples in seconds
+
+    Returns:
+        dict: Sample count, and mean, p50, p95, p99, and max latency in milliseconds
+    '''
+    samples = sorted(samples)
+    count = len(samples)
+
+    def percentile(p):
+        return samples[ min(count - 1, int(round(p / 100 * (count - 1)))) ] * 1000
+
+    return {
+        'count': count,
+        'mean_ms': sum(samples) / count * 1000,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'max_ms': samples[-1] * 1000
+    }
+
+def timed(fn, iterations):
+    '''Time repeated function calls.
+
+    Args:
+        fn (callable): Function to call with no arguments
+        iterations (int): Number of calls
+
+    Returns:
+        list: Latency samples in seconds
+    '''
+    samples = []
+
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    return samples
+
+def new_radio(emulator, persistent=True):
+    '''Create a QDX object connected to an emulator.
+
+    Args:
+        emulator (qdxcat.QDXEmulator): Emulated QDX
+        persistent (bool): Whether to keep the connection open between requests, defaults to True
+
+    Returns:
+        qdxcat.QDX: QDX object
+    '''
+    radio = qdxcat.QDX(autodetect=False, persistent=persistent, transport=emulator.transport)
+    radio.set_port('emulator', sync=False)
+    return radio
+
+def bench_commands(radio, iterations):
+    '''Per-command get and set latency.'''
+    results = {}
+
+    for cmd in [qdxcat.QDX.VFO_A, qdxcat.QDX.OPERATING_MODE, qdxcat.QDX.TX_STATE, qdxcat.QDX.RADIO_INFO_DICT, qdxcat.QDX.VERSION]:
+        results['get ' + cmd] = percentiles( timed(lambda: radio.get(cmd, update=True), iterations) )
+
+    results['set ' + qdxcat.QDX.VFO_A] = percentiles( timed(lambda: radio.set(qdxcat.QDX.VFO_A, 7078000), iterations) )
+    results['set ' + qdxcat.QDX.OPERATING_MODE] = percentiles( timed(lambda: radio.set(qdxcat.QDX.OPERATING_MODE, 3), iterations) )
+    return results
+
+def bench_throughput(radio, iterations):
+    '''Commands per second for single and batched requests.'''
+    cmds = [cmd for cmd in qdxcat.QDX.GET_COMMANDS if cmd not in (qdxcat.QDX.RADIO_INFO, qdxcat.QDX.RADIO_INFO_DICT)]
+    total = 0
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        radio.get(cmds[i % len(cmds)], update=True)
+    single = iterations / (time.perf_counter() - start)
+
+    batches = max(1, iterations // len(cmds))
+    start = time.perf_counter()
+    for i in range(batches):
+        total += len( radio.get_many(cmds, update=True) )
+    batched = total / (time.perf_counter() - start)
+
+    return {'single_cmds_per_sec': single, 'batched_cmds_per_sec': batched, 'batch_size': len(cmds)}
+
+def bench_sync(radio, iterations):
+    '''Full local settings sync time.'''
+    return percentiles( timed(radio.sync_local_settings, max(1, iterations // 10)) )
+
+def bench_ptt_during_sync(radio, iterations):
+    '''PTT key-up latency while a full local settings sync is running.'''
+    samples = []
+
+    for i in range(max(1, iterations // 10)):
+        sync = threading.Thread(target=radio.sync_local_settings)
+        sync.start()
+        # let the sync start queueing bulk requests
+        time.sleep(0.001)
+
+        start = time.perf_counter()
+        radio.ptt_on()
+        samples.append(time.perf_counter() - start)
+
+        sync.join()
+        radio.ptt_off()
+
+    return percentiles(samples)
+
+def bench_ptt_scheduled(radio, iterations):
+    '''Scheduled key-up latency relative to the target time.'''
+    samples = []
+    radio.ptt.warm()
+
+    for i in range(max(1, iterations // 10)):
+        samples.append( radio.ptt.schedule(1, at=time.monotonic() + 0.01).result() )
+        radio.ptt_off()
+
+    return percentiles(samples)
+
+def bench_scaling(latency, jitter, iterations, max_radios):
+    '''Aggregate throughput with N radios driven in parallel.'''
+    results = {}
+    n = 1
+
+    while n <= max_radios:
+        emulators = {'emulator{}'.format(i): QDXEmulator(latency=latency, jitter=jitter) for i in range(n)}
+
+        def transport(device, baudrate=9600, timeout=1):
+            return emulators[device].transport(device, baudrate, timeout)
+
+        pool = qdxcat.QDXPool(autodetect=False, transport=transport)
+
+        for device in emulators:
+            pool.add(device)
+
+        # wait for the initial settings sync of each radio
+        pool.broadcast('sync_local_settings')
+
+        start = time.perf_counter()
+        for i in range(iterations):
+            pool.get_all(qdxcat.QDX.VFO_A, update=True)
+        elapsed = time.perf_counter() - start
+
+        results[str(n)] = {'cmds_per_sec': n * iterations / elapsed, 'round_ms': elapsed / iterations * 1000}
+        pool.close()
+        n *= 2
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='qdxcat CAT command path benchmarks')
+    parser.add_argument('--latency', type=float, default=0.002, help='emulated link latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.001, help='emulated maximum additional link latency in seconds')
+    parser.add_argument('--firmware', type=float, default=1.07, help='emulated firmware version')
+    parser.add_argument('--iterations', type=int, default=200, help='iterations per measurement')
+    parser.add_argument('--radios', type=int, default=8, help='maximum number of radios for the scaling benchmark')
+    parser.add_argument('--output', help='JSON output file, defaults to stdout')
+    args = parser.parse_args()
+
+    emulator = QDXEmulator(version=args.firmware, latency=args.latency, jitter=args.jitter, seed=0)
+    radio = new_radio(emulator)
+
+    results = {
+        'config': {
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'firmware': args.firmware,
+            'iterations': args.iterations,
+            'python': platform.python_version(),
+            'time': time.time()
+        },
+        'commands': bench_commands(radio, args.iterations),
+        'throughput': bench_throughput(radio, args.iterations),
+        'sync': bench_sync(radio, args.iterations),
+        'ptt_during_sync': bench_ptt_during_sync(radio, args.iterations),
+        'ptt_scheduled': bench_ptt_scheduled(radio, args.iterations),
+        'scaling': bench_scaling(args.latency, args.jitter, max(1, args.iterations // 10), args.radios)
+    }
+
+    radio.close()
+    output = json.dumps(results, indent=2)
+
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -26,4 +26,18 @@
 
 __docformat__ = 'google'
 
-from qdxcat.qdx import QDX
+from qdxcat.qdx import QDXBase, QDX, QDXTimeoutError, QDXCommandError, QDXVerifyError
+from qdxcat.aio import AsyncQDX
+from qdxcat.monitor import Monitor, Change
+from qdxcat.ptt import PTTEngine
+from qdxcat.scan import Scan, ScanResult
+from qdxcat.state import RadioState, RadioInfo
+from qdxcat.profile import Profile
+from qdxcat.broker import Broker, BrokerClient
+from qdxcat.rigctld import RigctlServer
+from qdxcat.pool import QDXPool
+from qdxcat.emulator import QDXEmulator
+from qdxcat.stats import Stats
+from qdxcat.recorder import Recorder, Replay
+from qdxcat.telemetry import Telemetry, RingBuffer
+from qdxcat.commands import CommandSpec, COMMAND_SPECS
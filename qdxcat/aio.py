@@ -0,0 +1,748 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''QRPLabs QDX transceiver CAT control for asyncio applications.
+
+`AsyncQDX` uses the same command set and response handling as `qdxcat.QDX` (see `qdxcat.QDXBase`).
+
+On POSIX systems the serial port is used in non-blocking mode and read via the event loop's file descriptor monitoring, so many radios can be driven from a single event loop without a thread per radio. On other platforms serial port I/O falls back to the event loop's default executor.
+
+Serial port enumeration and settings and capability cache file I/O also run in the default executor, so they do not block the event loop.
+'''
+
+__docformat__ = 'google'
+
+import asyncio
+import serial
+
+from qdxcat.qdx import QDXBase, QDXCommandError
+
+
+class AsyncQDX(QDXBase):
+    '''Asynchronous QDX transceiver control object.
+
+    The serial port is opened on first use and kept open. If the connection is lost (ex. USB cable unplugged) the serial port is re-opened automatically on the next request.
+
+    See `qdxcat.QDXBase` for command constants and attributes.
+    '''
+
+    def __init__(self, port=None, baudrate=9600, timeout=1, transport=None):
+        '''Initialize AsyncQDX instance object.
+
+        No serial port I/O is performed. Use `AsyncQDX.connect()` to set the serial port, auto-detecting the QDX device if *port* is not specified.
+
+        Args:
+            port (str): Windows COM port (ex. 'COM42') or Unix serial device path (ex. '/dev/ttyACM0'), defaults to None
+            baudrate (int): Serial port baudrate, defaults to 9600
+            timeout (int): Serial port timeout in seconds, defaults to 1
+            transport (callable): Serial port factory (see `qdxcat.transport`), defaults to None (`serial.Serial`)
+
+        Returns:
+            qdxcat.AsyncQDX: Constructed AsyncQDX object
+        '''
+        super().__init__(baudrate, timeout, transport)
+        self._port = port
+
+        self._serial_port = None
+        # file descriptor monitored by the event loop, or None if using the executor
+        self._fileno = None
+        self._buffer = bytearray()
+        self._connection_lost = False
+        # created on first use to bind to the running event loop
+        self._data_received = None
+        self._io_lock = None
+        self._sync_task = None
+
+    async def connect(self, sync=True):
+        '''Set the serial port, auto-detecting the QDX device if no serial port was specified.
+
+        Args:
+            sync (bool): Whether to sync local settings to transceiver settings in a background task (see `AsyncQDX.set_port`), defaults to True
+
+        Returns:
+            str: Serial port
+
+        Raises:
+            OSError: QDX device not found
+            OSError: Multiple QDX devices found
+        '''
+        if self._port is None:
+            await self.autodetect(sync)
+        else:
+            await self.set_port(self._port, self._baudrate, self._timeout, sync)
+
+        return self._port
+
+    async def autodetect(self, sync=True):
+        '''Auto-detect QDX device serial port.
+
+        All candidate serial ports are probed concurrently. Serial ports identified as QDX devices are cached for the life of the process (see `QDXBase.clear_discovery_cache`).
+
+        Args:
+            sync (bool): Whether to sync local settings to transceiver settings in a background task (see `AsyncQDX.set_port`), defaults to True
+
+        Raises:
+            OSError: QDX device not found
+            OSError: Multiple QDX devices found
+        '''
+        loop = asyncio.get_event_loop()
+        candidates = await loop.run_in_executor(None, self._candidate_ports)
+        known, probe = self._discovered_ports(candidates)
+        results = await asyncio.gather(*[self._probe(port.device) for port in probe])
+        detected = [port for port, is_qdx in zip(probe, results) if is_qdx]
+        self._cache_discovery(detected)
+        ports = [port for port in candidates if port in known or port in detected]
+
+        if len(ports) == 0:
+            # no matching device description on linux or windows
+            raise IOError('QDX device not found, check device connection or specifiy a serial port')
+
+        if len(ports) > 1:
+            devices = ', '.join( [port.name for port in ports] )
+            raise IOError('Multiple QDX devices found, try specifying a serial port: {}'.format(devices))
+
+        await self.set_port(ports[0].device, self._baudrate, self._timeout, sync)
+
+    async def set_port(self, port, baudrate=9600, timeout=1, sync=True):
+        '''Set QDX device serial port.
+
+        Args:
+            port (str): Windows COM port (ex. 'COM42') or Unix serial device path (ex. '/dev/ttyACM0')
+            baudrate (int): Serial port baudrate, defaults to 9600
+            timeout (int): Serial port timeout in seconds, defaults to 1
+            sync (bool): Whether to sync local settings to transceiver settings in a background task, defaults to True (only volatile settings if a settings snapshot is loaded, see *settings_cache*)
+        '''
+        if port is None:
+            return
+
+        self.close()
+
+        if port != self._port:
+            # capabilities are negotiated per device
+            self._serial_number = False
+            self.firmware_version = None
+            self.supported_commands = None
+
+        self._port = port
+        self._baudrate = baudrate
+        self._timeout = timeout
+
+        await self.open()
+
+        # settings from a previous session are available immediately
+        loop = asyncio.get_event_loop()
+        loaded = await loop.run_in_executor(None, self._load_settings)
+
+        if sync:
+            self._sync_task = asyncio.ensure_future(self.sync_volatile_settings() if loaded else self.sync_local_settings())
+
+    async def open(self):
+        '''Open the serial connection, if not already open.
+
+        Raises:
+            ValueError: Serial port not specified
+            OSError: Error opening serial port
+        '''
+        if self._serial_port is not None:
+            return
+
+        if self._port is None:
+            raise ValueError('Serial port not specified')
+
+        loop = asyncio.get_event_loop()
+
+        try:
+            serial_port = self._transport(self._port, self._baudrate, timeout=self._timeout)
+        except Exception as e:
+            raise OSError('Error opening serial port {}, check device connection'.format(self._port))
+
+        self._serial_port = serial_port
+        self._buffer.clear()
+        self._connection_lost = False
+
+        try:
+            fileno = serial_port.fileno()
+            # non-blocking reads, data is read when the event loop reports the port is readable
+            serial_port.timeout = 0
+            loop.add_reader(fileno, self._on_readable)
+            self._fileno = fileno
+        except (AttributeError, NotImplementedError, serial.SerialException):
+            # fileno or add_reader not supported on this platform, use the executor
+            serial_port.timeout = self._timeout
+            self._fileno = None
+
+    def close(self):
+        '''Close the serial connection, if open.'''
+        if self._serial_port is None:
+            return
+
+        if self._fileno is not None:
+            try:
+                asyncio.get_event_loop().remove_reader(self._fileno)
+            except Exception as e:
+                pass
+
+            self._fileno = None
+
+        try:
+            self._serial_port.close()
+        except Exception as e:
+            # port may already be gone (ex. device unplugged)
+            pass
+
+        self._serial_port = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    async def get(self, cmd, update=False, max_age=None):
+        '''Get command value.
+
+        Local settings are used if known and not expired, otherwise the value is read from the QDX.
+
+        Args:
+            cmd (str): Command to get value for
+            update (bool): Update local settings from QDX settings if True, or use local settings if False, defaults to False
+            max_age (float): Maximum local setting age in seconds, defaults to None (use the command time-to-live, see *cache_ttl*)
+
+        Returns:
+            int: Command value
+
+        Raises:
+            ValueError: Invalid QDX command (not in AsyncQDX.COMMANDS)
+            ValueError: Command is not gettable (not in AsyncQDX.GET_COMMANDS)
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        self._validate(cmd, AsyncQDX.GET_COMMANDS)
+
+        if update or not self._is_fresh(cmd, max_age):
+            await self.sync_local_setting(cmd)
+
+        return self.settings[cmd]
+
+    async def set(self, cmd, value, verify=QDXBase.VERIFY_NOW, callback=None):
+        '''Set command value.
+
+        See `qdxcat.QDX.set` for write modes.
+
+        Args:
+            cmd (str): Command to set value for
+            value (int): Command value to set
+            verify (str): Write mode, defaults to `AsyncQDX.VERIFY_NOW`
+            callback (callable): Function called with a `qdxcat.QDXVerifyError` (or the exception raised while reading back) if deferred verification fails, defaults to None
+
+        Returns:
+            int: Command value read back, or the value set if the command is not gettable or not verified
+
+            asyncio.Future: if *verify* is `AsyncQDX.VERIFY_DEFERRED`, future resolved with the command value read back, or the verification exception
+
+        Raises:
+            ValueError: Invalid QDX command (not in AsyncQDX.COMMANDS)
+            ValueError: Command is not settable (not in AsyncQDX.SET_COMMANDS)
+            ValueError: Invalid write mode
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        self._validate(cmd, AsyncQDX.SET_COMMANDS)
+        self._check_verify_mode(verify)
+
+        await self._serial_io(self._set_request(cmd, value), count=0)
+        self._invalidate(cmd)
+
+        if verify == AsyncQDX.VERIFY_NOW:
+            if cmd not in AsyncQDX.GETTABLE_COMMANDS:
+                return value
+
+            return await self.get(cmd, update=True)
+
+        self._assume_settings({cmd: value})
+
+        if verify == AsyncQDX.VERIFY_NONE:
+            return value
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending_verifications.append( ({cmd: value}, future, callback) )
+
+        if not self._verify_scheduled:
+            self._verify_scheduled = True
+            asyncio.ensure_future(self._run_verifications())
+
+        return future
+
+    async def transaction(self, settings, rollback=True):
+        '''Apply multiple settings as a single verified transaction.
+
+        See `qdxcat.QDX.transaction`. Requests from other tasks may be processed between the write, verification, and rollback steps.
+
+        Args:
+            settings (dict): Map of commands to command values
+            rollback (bool): Whether to restore previous values if verification fails, defaults to True
+
+        Returns:
+            dict: Map of gettable commands to command values read back
+
+        Raises:
+            ValueError: Invalid QDX command (not in AsyncQDX.COMMANDS)
+            ValueError: Command is not settable (not in AsyncQDX.SET_COMMANDS)
+            ValueError: Invalid command value (see `qdxcat.commands.CommandSpec.validate`)
+            qdxcat.QDXVerifyError: Values read back do not match, *rolled_back* attribute indicates whether previous values were restored
+            qdxcat.QDXTimeoutError: No response received before timeout
+        '''
+        for cmd in settings:
+            self._validate(cmd, AsyncQDX.SET_COMMANDS)
+
+        # encode all requests first, invalid values raise before any serial I/O
+        request = ''.join( [self._set_request(cmd, value) for cmd, value in settings.items()] )
+
+        if len(settings) == 0:
+            return {}
+
+        cmds = [cmd for cmd in settings if cmd in AsyncQDX.GETTABLE_COMMANDS]
+        previous = {}
+
+        if rollback and len(cmds) > 0:
+            previous = {cmd: value for cmd, value in (await self._get_many(cmds)).items() if not isinstance(value, Exception) and value is not None}
+
+        await self._serial_io(request, count=0)
+
+        for cmd in settings:
+            self._invalidate(cmd)
+
+        results = await self._get_many(cmds)
+        self._store_results(results)
+        error = self._verification_error(settings, results)
+
+        if error is None:
+            return {cmd: results[cmd] for cmd in cmds}
+
+        if len(previous) > 0:
+            await self._serial_io( ''.join([self._set_request(cmd, value) for cmd, value in previous.items()]), count=0 )
+
+            for cmd in previous:
+                self._invalidate(cmd)
+
+            error.rolled_back = True
+
+        raise error
+
+    async def get_many(self, cmds, update=False, max_age=None):
+        '''Get multiple command values in a single pipelined transaction.
+
+        Args:
+            cmds (list): Commands to get values for
+            update (bool): Update local settings from QDX settings if True, or use local settings if False, defaults to False
+            max_age (float): Maximum local setting age in seconds, defaults to None (use the command time-to-live, see *cache_ttl*)
+
+        Returns:
+            dict: Map of commands to command values
+
+        Raises:
+            ValueError: Invalid QDX command (not in AsyncQDX.COMMANDS)
+            ValueError: Command is not gettable (not in AsyncQDX.GET_COMMANDS)
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        for cmd in cmds:
+            self._validate(cmd, AsyncQDX.GET_COMMANDS)
+
+        pending = [cmd for cmd in cmds if update or not self._is_fresh(cmd, max_age)]
+
+        if len(pending) > 0:
+            errors = self._store_results( await self._get_many(pending) )
+
+            if len(errors) > 0:
+                raise errors[0]
+
+        return {cmd: self.settings[cmd] for cmd in cmds}
+
+    async def set_many(self, settings):
+        '''Set multiple command values in a single pipelined transaction.
+
+        Args:
+            settings (dict): Map of commands to command values
+
+        Returns:
+            dict: Map of commands to command values
+
+        Raises:
+            ValueError: Invalid QDX command (not in AsyncQDX.COMMANDS)
+            ValueError: Command is not settable (not in AsyncQDX.SET_COMMANDS)
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        for cmd in settings:
+            self._validate(cmd, AsyncQDX.SET_COMMANDS)
+
+        if len(settings) == 0:
+            return {}
+
+        request = ''.join( [self._set_request(cmd, value) for cmd, value in settings.items()] )
+        await self._serial_io(request, count=0)
+
+        for cmd in settings:
+            self._invalidate(cmd)
+
+        # not all settable commands are gettable (ex. AsyncQDX.TX_MODE)
+        return await self.get_many([cmd for cmd in settings if cmd in AsyncQDX.GETTABLE_COMMANDS], update=True)
+
+    async def sync_local_setting(self, cmd):
+        '''Sync local setting with transceiver setting.
+
+        Args:
+            cmd (str): Command to sync
+
+        Raises:
+            ValueError: Invalid QDX command (not in AsyncQDX.COMMANDS)
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        if cmd not in AsyncQDX.VALID_COMMANDS:
+            raise ValueError('Invalid QDX command: {}'.format(cmd))
+
+        self._check_supported(cmd)
+
+        # batch of one, includes status local settings derived from AsyncQDX.RADIO_INFO
+        errors = self._store_results( await self._get_many([cmd]) )
+
+        if len(errors) > 0:
+            raise errors[0]
+
+    async def sync_local_settings(self):
+        '''Sync all local settings with transceiver settings.
+
+        Static commands (see `QDXBase.STATIC_COMMANDS`) are not re-read once known. Commands not supported by the QDX firmware are skipped (see `AsyncQDX.negotiate`). Local settings for commands that are not understood by the QDX or that do not receive a response are set to None.
+        '''
+        if self.supported_commands is None:
+            await self.negotiate()
+
+        results = await self._get_many(self._sync_commands())
+        self._update_settings( {cmd: (None if isinstance(value, Exception) else value) for cmd, value in results.items()} )
+        self._verify_capabilities()
+        await asyncio.get_event_loop().run_in_executor(None, self.save_settings)
+
+    async def sync_volatile_settings(self):
+        '''Sync volatile local settings with transceiver settings.
+
+        See `qdxcat.QDX.sync_volatile_settings`.
+        '''
+        if self.supported_commands is None:
+            await self.negotiate()
+
+        version = self.firmware_version
+        results = await self._get_many(self._volatile_sync_commands())
+        self._update_settings( {cmd: value for cmd, value in results.items() if not isinstance(value, Exception)} )
+        self._verify_capabilities()
+
+        if self.firmware_version != version:
+            await self.sync_local_settings()
+        else:
+            await asyncio.get_event_loop().run_in_executor(None, self.save_settings)
+
+    async def negotiate(self, refresh=False):
+        '''Determine the commands supported by the QDX firmware.
+
+        See `qdxcat.QDX.negotiate`.
+
+        Args:
+            refresh (bool): Whether to ignore the capability cache and read the firmware version, defaults to False
+
+        Returns:
+            frozenset: Supported command strings
+
+        Raises:
+            qdxcat.QDXTimeoutError: No response received before timeout
+        '''
+        loop = asyncio.get_event_loop()
+
+        if not refresh and await loop.run_in_executor(None, self._load_capabilities):
+            return self.supported_commands
+
+        try:
+            version = await self._get(AsyncQDX.VERSION)
+            self._update_settings({AsyncQDX.VERSION: version})
+        except QDXCommandError:
+            # firmware older than v1.05
+            version = None
+
+        self._set_capabilities(version)
+        await loop.run_in_executor(None, self._save_capabilities)
+        return self.supported_commands
+
+    async def get_status(self, max_age=None):
+        '''Get a status snapshot from a single AsyncQDX.RADIO_INFO request.
+
+        See `qdxcat.QDX.get_status`.
+
+        Args:
+            max_age (float): Maximum snapshot age in seconds, defaults to None (use the command time-to-live, see *cache_ttl*)
+
+        Returns:
+            dict: Map of AsyncQDX.STATUS_COMMANDS and AsyncQDX.RADIO_INFO_DICT to command values
+
+        Raises:
+            ValueError: Invalid AsyncQDX.RADIO_INFO response
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        if not self._status_fresh(max_age):
+            await self.sync_local_setting(AsyncQDX.RADIO_INFO_DICT)
+
+        return self._status()
+
+    async def ptt_on(self):
+        '''Set PTT to transmit state.
+
+        The PTT state is not read back before returning, it is verified in the background (see `AsyncQDX.VERIFY_DEFERRED`).
+        '''
+        await self.set(AsyncQDX.TX_STATE, 1, verify=AsyncQDX.VERIFY_DEFERRED)
+
+    async def ptt_off(self):
+        '''Set PTT to receive state.
+
+        The PTT state is not read back before returning, it is verified in the background (see `AsyncQDX.VERIFY_DEFERRED`).
+        '''
+        await self.set(AsyncQDX.TX_STATE, 0, verify=AsyncQDX.VERIFY_DEFERRED)
+
+    async def toggle_ptt(self):
+        '''Toggle PTT state.'''
+        if await self.get(AsyncQDX.TX_STATE) == 0:
+            await self.ptt_on()
+        else:
+            await self.ptt_off()
+
+    async def _probe(self, device):
+        '''Check whether a serial port is connected to a QDX.
+
+        Args:
+            device (str): Serial device port *str*
+
+        Returns:
+            bool: True if the device responds with the QDX radio ID, False otherwise
+        '''
+        probe = AsyncQDX(device, self._baudrate, self._timeout, transport=self._transport)
+
+        try:
+            # check QDX radio ID ( int('020') )
+            return await probe._get(AsyncQDX.RADIO_ID) == 20
+        except Exception as e:
+            # error occurred while getting radio ID, must not be a properly functioning QDX
+            return False
+        finally:
+            probe.close()
+
+    async def _get(self, cmd):
+        '''Low level *get* operation handling.
+
+        Args:
+            cmd (str): Command to get value for
+
+        Returns:
+            int: Command value
+
+        Other value types may be returned in the case of custom command handling (ex. dict)
+
+        Raises:
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        if cmd not in AsyncQDX.GETTABLE_COMMANDS:
+            return None
+
+        request = self._get_request(cmd)
+        responses = await self._serial_io(request)
+        return self._parse_response(cmd, self._single_response(request, responses))
+
+    async def _get_many(self, cmds):
+        '''Low level batch *get* operation handling.
+
+        Args:
+            cmds (list): Commands to get values for
+
+        Returns:
+            dict: Map of commands to command values, or to exceptions (qdxcat.QDXTimeoutError or qdxcat.QDXCommandError) for failed commands
+        '''
+        requests = self._batch_requests(cmds)
+        responses = {}
+
+        for index in range(0, len(requests), AsyncQDX.BATCH_SIZE):
+            batch = requests[index:index + AsyncQDX.BATCH_SIZE]
+            batch_responses = await self._serial_io(''.join(batch), len(batch))
+            responses.update( zip(batch, self._match_responses(batch, batch_responses)) )
+
+        return self._batch_results(cmds, responses)
+
+    async def _run_verifications(self):
+        '''Read back and check all pending deferred verifications in a single batch.'''
+        # let other set operations queue verifications first
+        await asyncio.sleep(0)
+
+        pending = self._pending_verifications
+        self._pending_verifications = []
+        self._verify_scheduled = False
+
+        cmds = []
+        for settings, future, callback in pending:
+            cmds.extend( [cmd for cmd in settings if cmd in AsyncQDX.GETTABLE_COMMANDS and cmd not in cmds] )
+
+        try:
+            results = await self._get_many(cmds)
+            self._store_results(results)
+        except Exception as e:
+            results = {cmd: e for cmd in cmds}
+
+        self._resolve_verifications(pending, results)
+
+    async def _serial_io(self, request, count=1):
+        '''Write a serial request and read the expected number of responses.
+
+        The serial port is re-opened and the request is retried once if the connection was lost.
+
+        Args:
+            request (str): One or more concatenated requests
+            count (int): Number of expected responses, defaults to 1
+
+        Returns:
+            list: Response strings including leading command and trailing semicolon, may be shorter than *count* if the timeout expired
+
+        Raises:
+            ValueError: Serial port not specified
+            OSError: Error during serial port request/response
+        '''
+        if self._port is None:
+            raise ValueError('Serial port not specified')
+
+        if self._io_lock is None:
+            self._io_lock = asyncio.Lock()
+            self._data_received = asyncio.Event()
+
+        if self._debug:
+            print( 'TX: {}'.format(request) )
+
+        if not self._instrumented:
+            return await self._raw_io(request, count)
+
+        start = self._io_start(request)
+
+        try:
+            responses = await self._raw_io(request, count)
+        except Exception as e:
+            self._io_end(request, count, None, start, e)
+            raise
+
+        self._io_end(request, count, responses, start)
+        return responses
+
+    async def _raw_io(self, request, count=1):
+        '''Encode a serial request and read responses, re-opening the serial port if the connection was lost.
+
+        Args:
+            request (str): One or more concatenated requests
+            count (int): Number of expected responses, defaults to 1
+
+        Returns:
+            list: Response strings including leading command and trailing semicolon
+
+        Raises:
+            OSError: Error during serial port request/response
+        '''
+        # convert string to bytes
+        request = request.encode('utf-8')
+
+        async with self._io_lock:
+            for attempt in range(2):
+                try:
+                    if attempt > 0 and self.metrics is not None:
+                        self.metrics.record_reconnect()
+
+                    await self.open()
+
+                    if self._fileno is None:
+                        loop = asyncio.get_event_loop()
+                        responses = await loop.run_in_executor(None, self._transact, self._serial_port, request, count)
+                    else:
+                        responses = await self._transact_async(request, count)
+
+                    return self._decode_responses(responses)
+                except Exception as e:
+                    # connection lost (ex. device unplugged), re-open on retry
+                    self.close()
+
+        raise OSError('Error during serial port request/response {}, check device connection'.format(self._port))
+
+    async def _transact_async(self, request, count=1):
+        '''Write request and read responses using event loop file descriptor monitoring.
+
+        Args:
+            request (bytes): Encoded request
+            count (int): Number of expected responses, defaults to 1
+
+        Returns:
+            list: Raw responses, may be shorter than *count* if the timeout expired
+
+        Raises:
+            OSError: Serial connection lost
+        '''
+        loop = asyncio.get_event_loop()
+
+        # discard stale data (ex. unread error response to a previous set request)
+        self._buffer.clear()
+        self._serial_port.write(request)
+
+        deadline = loop.time() + self._timeout
+
+        while self._buffer.count(b';') < count:
+            if self._connection_lost:
+                raise OSError('Serial connection lost: {}'.format(self._port))
+
+            remaining = deadline - loop.time()
+
+            if remaining <= 0:
+                break
+
+            self._data_received.clear()
+
+            try:
+                await asyncio.wait_for(self._data_received.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+        # drop incomplete trailing response
+        responses = [response + b';' for response in bytes(self._buffer).split(b';')[:-1]]
+        self._buffer.clear()
+        return responses
+
+    def _on_readable(self):
+        '''Event loop callback when serial data is available.'''
+        try:
+            self._buffer += self._serial_port.read(self._serial_port.in_waiting or 1)
+        except Exception as e:
+            # device reports readiness but returns no data, connection lost (ex. device unplugged)
+            self._connection_lost = True
+            asyncio.get_event_loop().remove_reader(self._fileno)
+
+        if self._data_received is not None:
+            self._data_received.set()
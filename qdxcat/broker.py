@@ -0,0 +1,791 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''Local CAT broker for sharing QDX devices between processes.
+
+A `Broker` owns one or more QDX devices and serves *get*, *set*, and *subscribe* requests from other processes over a local Unix socket. Concurrent reads of the same command by several clients are coalesced into a single serial transaction. `BrokerClient` provides the `qdxcat.QDX` API on top of a broker connection.
+
+Messages are newline delimited JSON objects. Requests have the form `{"id": int, "op": str, "args": list, "kwargs": dict, "device": str}`, and are answered with `{"id": int, "result": ...}` or `{"id": int, "error": {"type": str, "message": str}}`. Setting changes are pushed to subscribed clients as `{"event": "change", "device": str, "cmd": str, "old": ..., "new": ..., "timestamp": float}`.
+
+Run the broker:
+```
+python -m qdxcat.broker --port /dev/ttyACM0
+```
+
+Example client:
+```
+import qdxcat
+qdx = qdxcat.BrokerClient()
+
+qdx.get(qdx.VFO_A, update = True)
+qdx.set(qdx.VFO_A, 7078000)
+qdx.subscribe(print, [qdx.TX_STATE])
+```
+'''
+
+__docformat__ = 'google'
+
+import os
+import json
+import socket
+import argparse
+import tempfile
+import threading
+import socketserver
+import concurrent.futures
+
+from qdxcat.qdx import QDXBase, QDX, QDXTimeoutError, QDXCommandError, QDXVerifyError
+from qdxcat.pool import QDXPool
+from qdxcat.monitor import Monitor, Change
+from qdxcat.state import RadioInfo
+
+
+DEFAULT_SOCKET = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(), 'qdxcat-{}.sock'.format(os.getuid() if hasattr(os, 'getuid') else 0))
+'''Default broker socket path (`$XDG_RUNTIME_DIR/qdxcat-<uid>.sock`, or in the system temporary directory)'''
+
+# QDX methods available to clients, *get* operations are coalesced
+OPERATIONS = frozenset(['get', 'get_many', 'set', 'set_many', 'transaction', 'get_status', 'sync_local_settings', 'negotiate', 'ptt_on', 'ptt_off', 'toggle_ptt', 'subscribe', 'unsubscribe'])
+
+# exception types reconstructed by clients
+_ERRORS = {error.__name__: error for error in [QDXTimeoutError, QDXCommandError, QDXVerifyError, ValueError, KeyError, OSError]}
+
+
+def encode_value(value):
+    '''Convert a command value to a JSON serializable value.
+
+    Args:
+        value: Command value or method return value
+
+    Returns:
+        JSON serializable value (`qdxcat.state.RadioInfo` objects are encoded as `{"radio_info": [fields]}`)
+    '''
+    if isinstance(value, RadioInfo):
+        return {'radio_info': list(value.fields)}
+
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+
+    if isinstance(value, dict):
+        return {key: encode_value(item) for key, item in value.items()}
+
+    return value
+
+def decode_value(value):
+    '''Convert a JSON value to a command value (see `encode_value`).
+
+    Args:
+        value: JSON decoded value
+
+    Returns:
+        Command value or method return value
+    '''
+    if isinstance(value, dict):
+        if len(value) == 1 and 'radio_info' in value:
+            return RadioInfo(value['radio_info'])
+
+        return {key: decode_value(item) for key, item in value.items()}
+
+    return value
+
+def encode_error(error):
+    '''Convert an exception to a JSON serializable error.
+
+    Args:
+        error (Exception): Exception raised by a QDX method
+
+    Returns:
+        dict: Error type, message, and verification details for `qdxcat.QDXVerifyError`
+    '''
+    encoded = {'type': type(error).__name__, 'message': str(error)}
+
+    if isinstance(error, QDXVerifyError):
+        encoded['failed'] = {cmd: [expected, str(actual) if isinstance(actual, Exception) else encode_value(actual)] for cmd, (expected, actual) in error.failed.items()}
+        encoded['rolled_back'] = error.rolled_back
+
+    return encoded
+
+def decode_error(error):
+    '''Convert a JSON error to an exception (see `encode_error`).
+
+    Args:
+        error (dict): JSON decoded error
+
+    Returns:
+        Exception: Exception of the original type if known, otherwise OSError
+    '''
+    if error.get('type') == 'QDXVerifyError':
+        failed = {cmd: tuple(values) for cmd, values in error.get('failed', {}).items()}
+        return QDXVerifyError(failed, error.get('rolled_back', False))
+
+    return _ERRORS.get(error.get('type'), OSError)( error.get('message') )
+
+
+class Broker:
+    '''CAT broker serving one or more QDX devices over a Unix socket.
+
+    Requests are processed concurrently by a thread pool, and serial traffic for each device is serialized by its worker thread (see `qdxcat.worker.SerialWorker`). Setting changes are detected by one `qdxcat.monitor.Monitor` per device, polling the commands subscribed by all clients.
+
+    Attributes:
+        path (str): Unix socket path
+        coalesced (int): Number of reads served by another client's in-flight read
+    '''
+
+    def __init__(self, radios, path=None, workers=8):
+        '''Initialize Broker instance object.
+
+        Args:
+            radios (qdxcat.QDX or qdxcat.QDXPool): Device(s) to serve
+            path (str): Unix socket path, defaults to None (`DEFAULT_SOCKET`)
+            workers (int): Number of request processing threads, defaults to 8
+
+        Returns:
+            qdxcat.broker.Broker: Constructed Broker object
+
+        Raises:
+            OSError: Unix sockets not supported on this platform
+        '''
+        if not hasattr(socketserver, 'UnixStreamServer'):
+            raise OSError('Unix sockets not supported on this platform')
+
+        self.path = DEFAULT_SOCKET if path is None else path
+        self.coalesced = 0
+
+        self._radios = radios
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='qdxcat-broker')
+        self._lock = threading.Lock()
+        # (QDX object, command) to future resolved by the in-flight read
+        self._inflight = {}
+        # client handler to {QDX object: set of commands}
+        self._subscriptions = {}
+        self._monitors = {}
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        '''Start serving requests in a background thread.'''
+        if self._server is None:
+            self._open()
+            self._thread = threading.Thread(target=self._server.serve_forever, name='qdxcat-broker')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def serve_forever(self):
+        '''Serve requests on the calling thread until *close()* is called.'''
+        self._open()
+        self._server.serve_forever()
+
+    def close(self):
+        '''Stop serving requests, stop monitors, and remove the socket file. Devices are not closed.'''
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        for monitor in self._monitors.values():
+            monitor.stop()
+
+        self._monitors = {}
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open(self):
+        '''Create the socket server, replacing a stale socket file.'''
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        self._server = _BrokerServer(self.path, _BrokerHandler)
+        self._server.broker = self
+        # local user only
+        os.chmod(self.path, 0o600)
+
+    def _radio(self, device=None):
+        '''Get the QDX object for a device.
+
+        Args:
+            device (str): Serial port or USB serial number, defaults to None (the only device)
+
+        Returns:
+            qdxcat.QDX: QDX object
+
+        Raises:
+            ValueError: Device not found, or not specified while serving multiple devices
+        '''
+        if not isinstance(self._radios, QDXPool):
+            if device is not None and device != self._radios._port:
+                raise ValueError('QDX device not served by broker: {}'.format(device))
+
+            return self._radios
+
+        if device is None:
+            radios = self._radios.radios()
+
+            if len(radios) != 1:
+                raise ValueError('Broker serves {} QDX devices, specify a device'.format(len(radios)))
+
+            return radios[0]
+
+        radio = self._radios.get(device)
+
+        if radio is None:
+            raise ValueError('QDX device not served by broker: {}'.format(device))
+
+        return radio
+
+    def _process(self, handler, message):
+        '''Process a client request and send the response, called by the thread pool.
+
+        Args:
+            handler (qdxcat.broker._BrokerHandler): Client connection
+            message (dict): Decoded request
+        '''
+        response = {'id': message.get('id')}
+
+        try:
+            op = message.get('op')
+
+            if op not in OPERATIONS:
+                raise ValueError('Invalid broker operation: {}'.format(op))
+
+            radio = self._radio(message.get('device'))
+            args = message.get('args', [])
+            kwargs = message.get('kwargs', {})
+
+            if op == 'get':
+                result = self._read(radio, [args[0]], *args[1:], **kwargs)[args[0]]
+            elif op == 'get_many':
+                result = self._read(radio, *args, **kwargs)
+            elif op == 'subscribe':
+                result = self._subscribe(handler, radio, *args)
+            elif op == 'unsubscribe':
+                result = self._unsubscribe(handler, radio)
+            else:
+                result = getattr(radio, op)(*args, **kwargs)
+
+                # deferred write verification
+                if isinstance(result, concurrent.futures.Future):
+                    result = result.result()
+
+            response['result'] = encode_value(result)
+        except Exception as e:
+            response['error'] = encode_error(e)
+
+        handler.send(response)
+
+    def _read(self, radio, cmds, update=False, max_age=None):
+        '''Get command values, coalescing reads with identical in-flight reads.
+
+        Fresh local settings are used without serial I/O. Commands already being read for another client wait for that read, and all other commands are read in a single pipelined transaction.
+
+        Args:
+            radio (qdxcat.QDX): QDX object
+            cmds (list): Commands to get values for
+            update (bool): Read from the QDX even if local settings are fresh, defaults to False
+            max_age (float): Maximum local setting age in seconds, defaults to None (use the command time-to-live)
+
+        Returns:
+            dict: Map of commands to command values
+
+        Raises:
+            ValueError: Invalid QDX command (not in QDX.COMMANDS)
+            ValueError: Command is not gettable (not in QDX.GET_COMMANDS)
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        for cmd in cmds:
+            radio._validate(cmd, QDX.GET_COMMANDS)
+
+        pending = [cmd for cmd in cmds if update or not radio._is_fresh(cmd, max_age)]
+        owned = []
+        waiting = {}
+
+        with self._lock:
+            for cmd in pending:
+                future = self._inflight.get( (radio, cmd) )
+
+                if future is None:
+                    self._inflight[(radio, cmd)] = concurrent.futures.Future()
+                    owned.append(cmd)
+                else:
+                    waiting[cmd] = future
+                    self.coalesced += 1
+
+        if len(owned) > 0:
+            try:
+                results = radio._get_many(owned)
+                radio._store_results(results)
+            except Exception as e:
+                results = {cmd: e for cmd in owned}
+
+            with self._lock:
+                for cmd in owned:
+                    future = self._inflight.pop( (radio, cmd) )
+
+                    if isinstance(results[cmd], Exception):
+                        future.set_exception(results[cmd])
+                    else:
+                        future.set_result(results[cmd])
+
+            for cmd in owned:
+                if isinstance(results[cmd], Exception):
+                    raise results[cmd]
+
+        for future in waiting.values():
+            future.result()
+
+        return {cmd: radio.settings[cmd] for cmd in cmds}
+
+    def _subscribe(self, handler, radio, cmds=None):
+        '''Subscribe a client to setting changes.
+
+        Args:
+            handler (qdxcat.broker._BrokerHandler): Client connection
+            radio (qdxcat.QDX): QDX object
+            cmds (list): Commands to monitor, defaults to None (QDX.STATUS_COMMANDS)
+
+        Returns:
+            list: Commands monitored for the client
+        '''
+        if cmds is None:
+            cmds = QDX.STATUS_COMMANDS
+
+        for cmd in cmds:
+            radio._validate(cmd, QDX.GET_COMMANDS)
+
+        with self._lock:
+            self._subscriptions.setdefault(handler, {}).setdefault(radio, set()).update(cmds)
+            subscribed = sorted(self._subscriptions[handler][radio])
+
+        self._update_monitor(radio)
+        return subscribed
+
+    def _unsubscribe(self, handler, radio=None):
+        '''Unsubscribe a client from setting changes.
+
+        Args:
+            handler (qdxcat.broker._BrokerHandler): Client connection
+            radio (qdxcat.QDX): QDX object, defaults to None (all devices)
+
+        Returns:
+            bool: True
+        '''
+        with self._lock:
+            subscriptions = self._subscriptions.get(handler, {})
+            radios = list(subscriptions) if radio is None else [radio]
+
+            for unsubscribed in radios:
+                subscriptions.pop(unsubscribed, None)
+
+            if len(subscriptions) == 0:
+                self._subscriptions.pop(handler, None)
+
+        for unsubscribed in radios:
+            self._update_monitor(unsubscribed)
+
+        return True
+
+    def _update_monitor(self, radio):
+        '''Restart the monitor of a device if the subscribed commands changed.
+
+        Args:
+            radio (qdxcat.QDX): QDX object
+        '''
+        with self._lock:
+            cmds = set()
+
+            for subscriptions in self._subscriptions.values():
+                cmds.update( subscriptions.get(radio, set()) )
+
+            previous = self._monitors.get(radio)
+
+            if previous is not None and set(previous.commands) == cmds:
+                return
+
+            self._monitors.pop(radio, None)
+
+            if len(cmds) > 0:
+                monitor = Monitor(radio, sorted(cmds))
+                monitor.subscribe( lambda change: self._publish(radio, change) )
+                self._monitors[radio] = monitor
+                monitor.start()
+
+        # stopped without holding the lock, the monitor thread may be publishing a change
+        if previous is not None:
+            previous.stop()
+
+    def _publish(self, radio, change):
+        '''Send a setting change to subscribed clients, called by the monitor thread.
+
+        Args:
+            radio (qdxcat.QDX): QDX object
+            change (qdxcat.monitor.Change): Setting change
+        '''
+        event = {
+            'event': 'change',
+            'device': radio._port,
+            'cmd': change.cmd,
+            'old': encode_value(change.old_value),
+            'new': encode_value(change.new_value),
+            'timestamp': change.timestamp
+        }
+
+        with self._lock:
+            handlers = [handler for handler, subscriptions in self._subscriptions.items() if change.cmd in subscriptions.get(radio, ())]
+
+        for handler in handlers:
+            handler.send(event)
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class _BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        '''Threaded Unix socket server, one thread per client connection.'''
+        daemon_threads = True
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    '''Broker client connection.'''
+
+    def setup(self):
+        super().setup()
+        self._send_lock = threading.Lock()
+
+    def handle(self):
+        '''Read requests until the client disconnects.'''
+        broker = self.server.broker
+
+        for line in self.rfile:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = None
+
+            # valid JSON that is not a request object (ex. '[1]') is rejected too
+            if not isinstance(message, dict):
+                self.send( {'id': None, 'error': {'type': 'ValueError', 'message': 'Invalid broker request: {}'.format(line)}} )
+                continue
+
+            broker._executor.submit(broker._process, self, message)
+
+    def finish(self):
+        self.server.broker._unsubscribe(self)
+        super().finish()
+
+    def send(self, message):
+        '''Send a message to the client.
+
+        Args:
+            message (dict): JSON serializable message
+        '''
+        data = (json.dumps(message, separators=(',', ':')) + '\n').encode('utf-8')
+
+        with self._send_lock:
+            try:
+                self.wfile.write(data)
+                self.wfile.flush()
+            except (OSError, ValueError):
+                # client disconnected
+                pass
+
+
+class BrokerClient(QDXBase):
+    '''QDX API client for a `Broker`.
+
+    Methods match `qdxcat.QDX`. Requests may be made from multiple threads, and responses are matched to requests by id. Local settings (*settings*) are updated from broker responses.
+
+    See `qdxcat.QDXBase` for command constants and attributes.
+    '''
+
+    def __init__(self, path=None, device=None, timeout=None):
+        '''Initialize BrokerClient instance object.
+
+        Args:
+            path (str): Broker socket path, defaults to None (`DEFAULT_SOCKET`)
+            device (str): Serial port or USB serial number of the device to control, defaults to None (the only device served)
+            timeout (float): Maximum time in seconds to wait for a broker response, defaults to None (wait indefinitely)
+
+        Returns:
+            qdxcat.broker.BrokerClient: Constructed BrokerClient object
+
+        Raises:
+            OSError: Error connecting to the broker
+        '''
+        super().__init__(timeout=timeout)
+        self.path = DEFAULT_SOCKET if path is None else path
+        self.device = device
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(self.path)
+        self._file = self._socket.makefile('rwb')
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_id = 0
+        self._subscribers = []
+
+        self._reader = threading.Thread(target=self._read_messages, name='qdxcat-broker-client')
+        self._reader.daemon = True
+        self._reader.start()
+
+    def close(self):
+        '''Close the broker connection.'''
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, cmd, update=False, max_age=None):
+        '''Get command value (see `qdxcat.QDX.get`).'''
+        self._validate(cmd, QDX.GET_COMMANDS)
+        value = self._call('get', cmd, update, max_age)
+        self._update_settings({cmd: value})
+        return value
+
+    def get_many(self, cmds, update=False, max_age=None):
+        '''Get multiple command values (see `qdxcat.QDX.get_many`).'''
+        values = self._call('get_many', list(cmds), update, max_age)
+        self._update_settings(values)
+        return values
+
+    def set(self, cmd, value, verify=QDXBase.VERIFY_NOW, callback=None):
+        '''Set command value (see `qdxcat.QDX.set`).
+
+        Returns:
+            int: Command value, or concurrent.futures.Future if *verify* is `QDX.VERIFY_DEFERRED`
+        '''
+        self._validate(cmd, QDX.SET_COMMANDS)
+        self._check_verify_mode(verify)
+        future = self._request('set', cmd, value, verify)
+
+        if verify != QDX.VERIFY_DEFERRED:
+            return future.result(self._timeout)
+
+        if callback is not None:
+            future.add_done_callback( lambda future: callback(future.exception()) if future.exception() is not None else None )
+
+        return future
+
+    def set_many(self, settings):
+        '''Set multiple command values (see `qdxcat.QDX.set_many`).'''
+        values = self._call('set_many', settings)
+        self._update_settings(values)
+        return values
+
+    def transaction(self, settings, rollback=True):
+        '''Apply multiple settings as a single verified transaction (see `qdxcat.QDX.transaction`).'''
+        values = self._call('transaction', settings, rollback)
+        self._update_settings(values)
+        return values
+
+    def get_status(self, max_age=None):
+        '''Get a status snapshot (see `qdxcat.QDX.get_status`).'''
+        return self._call('get_status', max_age)
+
+    def sync_local_settings(self):
+        '''Sync the broker local settings with transceiver settings (see `qdxcat.QDX.sync_local_settings`).'''
+        self._call('sync_local_settings')
+
+    def negotiate(self, refresh=False):
+        '''Get commands supported by the QDX firmware (see `qdxcat.QDX.negotiate`).'''
+        self.supported_commands = frozenset( self._call('negotiate', refresh) )
+        return self.supported_commands
+
+    def ptt_on(self):
+        '''Set PTT to transmit state.'''
+        self._call('ptt_on')
+
+    def ptt_off(self):
+        '''Set PTT to receive state.'''
+        self._call('ptt_off')
+
+    def toggle_ptt(self):
+        '''Toggle PTT state.'''
+        self._call('toggle_ptt')
+
+    def subscribe(self, callback, commands=None):
+        '''Subscribe to setting changes detected by the broker.
+
+        Args:
+            callback (callable): Function called with a `qdxcat.monitor.Change` object for each change, called by the client reader thread
+            commands (list): Command strings to monitor, defaults to None (QDX.STATUS_COMMANDS)
+
+        Returns:
+            list: Commands monitored for this client
+        '''
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+        return self._call('subscribe', commands)
+
+    def unsubscribe(self, callback=None):
+        '''Unsubscribe from setting changes.
+
+        Args:
+            callback (callable): Function previously passed to *subscribe()*, defaults to None (all callbacks)
+        '''
+        if callback is None:
+            self._subscribers = []
+        elif callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+        if len(self._subscribers) == 0:
+            self._call('unsubscribe')
+
+    def _call(self, op, *args):
+        '''Send a request and wait for the result.
+
+        Args:
+            op (str): Operation (see `OPERATIONS`)
+            *args: Positional arguments
+
+        Returns:
+            Operation result
+
+        Raises:
+            Exception raised by the broker operation
+            OSError: Broker connection lost
+        '''
+        return self._request(op, *args).result(self._timeout)
+
+    def _request(self, op, *args):
+        '''Send a request.
+
+        Args:
+            op (str): Operation (see `OPERATIONS`)
+            *args: Positional arguments
+
+        Returns:
+            concurrent.futures.Future: Future resolved with the operation result, or the exception raised
+
+        Raises:
+            OSError: Broker connection lost
+        '''
+        future = concurrent.futures.Future()
+
+        with self._pending_lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self._pending[request_id] = future
+
+        message = {'id': request_id, 'op': op, 'args': list(args), 'device': self.device}
+        data = (json.dumps(message, separators=(',', ':')) + '\n').encode('utf-8')
+
+        try:
+            with self._send_lock:
+                self._file.write(data)
+                self._file.flush()
+        except (OSError, ValueError):
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+
+            raise OSError('Broker connection lost: {}'.format(self.path))
+
+        return future
+
+    def _read_messages(self):
+        '''Client reader thread, resolves pending requests and dispatches change events.'''
+        try:
+            for line in self._file:
+                message = json.loads(line)
+
+                if message.get('event') == 'change':
+                    change = Change(message['cmd'], decode_value(message['old']), decode_value(message['new']), message['timestamp'])
+
+                    for callback in list(self._subscribers):
+                        callback(change)
+
+                    continue
+
+                with self._pending_lock:
+                    future = self._pending.pop(message.get('id'), None)
+
+                if future is None:
+                    continue
+
+                if 'error' in message:
+                    future.set_exception( decode_error(message['error']) )
+                else:
+                    future.set_result( decode_value(message.get('result')) )
+        except (OSError, ValueError):
+            pass
+
+        with self._pending_lock:
+            pending = self._pending
+            self._pending = {}
+
+        for future in pending.values():
+            future.set_exception( OSError('Broker connection lost: {}'.format(self.path)) )
+
+
+def main(args=None):
+    '''Run a broker until interrupted.
+
+    Args:
+        args (list): Command line arguments, defaults to None (`sys.argv`)
+    '''
+    parser = argparse.ArgumentParser(prog='qdxcat-broker', description='Share QDX devices between processes over a local Unix socket')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Unix socket path (default: %(default)s)')
+    parser.add_argument('--port', action='append', help='QDX serial port, may be repeated (default: auto-detect all devices)')
+    parser.add_argument('--baudrate', type=int, default=9600, help='serial port baudrate (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=1, help='serial port timeout in seconds (default: %(default)s)')
+    args = parser.parse_args(args)
+
+    pool = QDXPool(args.baudrate, args.timeout, persistent=True, autodetect=args.port is None)
+
+    for port in args.port or []:
+        pool.add(port)
+
+    broker = Broker(pool, args.socket)
+
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.close()
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''On-disk per-device cache.
+
+A `DiskCache` is a small JSON file mapping device keys (USB serial numbers) to JSON serializable entries. Writes replace the file atomically, so a crash never leaves a partially written cache. Cache files are stored in `DEFAULT_CACHE_DIR` unless another path is specified.
+'''
+
+__docformat__ = 'google'
+
+import os
+import json
+import threading
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'qdxcat')
+'''Default cache directory (`$XDG_CACHE_HOME/qdxcat`, or `~/.cache/qdxcat`)'''
+
+# one lock per cache file path, shared by all DiskCache objects in the process
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+class DiskCache:
+    '''JSON file cache of per-device entries.
+
+    Attributes:
+        path (str): Cache file path
+    '''
+
+    def __init__(self, path):
+        '''Initialize DiskCache instance object.
+
+        Args:
+            path (str): Cache file path, or file name relative to `DEFAULT_CACHE_DIR`
+
+        Returns:
+            qdxcat.cache.DiskCache: Constructed DiskCache object
+        '''
+        if os.path.dirname(path) == '':
+            path = os.path.join(DEFAULT_CACHE_DIR, path)
+
+        self.path = path
+
+        with _locks_lock:
+            self._lock = _locks.setdefault(os.path.abspath(path), threading.Lock())
+
+    def get(self, key, default=None):
+        '''Get a cache entry.
+
+        Args:
+            key (str): Device key
+            default: Value returned if there is no entry for *key*, defaults to None
+
+        Returns:
+            Cache entry, or *default*
+        '''
+        with self._lock:
+            return self._read().get(key, default)
+
+    def set(self, key, entry):
+        '''Set a cache entry.
+
+        Errors writing the cache file are ignored, the cache is an optimization only.
+
+        Args:
+            key (str): Device key
+            entry: JSON serializable cache entry
+        '''
+        with self._lock:
+            entries = self._read()
+            entries[key] = entry
+            self._write(entries)
+
+    def remove(self, key):
+        '''Remove a cache entry, if it exists.
+
+        Args:
+            key (str): Device key
+        '''
+        with self._lock:
+            entries = self._read()
+
+            if entries.pop(key, None) is not None:
+                self._write(entries)
+
+    def _read(self):
+        '''Read all cache entries, the lock must be held.
+
+        Returns:
+            dict: Map of device keys to entries, empty if the cache file is missing or invalid
+        '''
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self, entries):
+        '''Write all cache entries atomically, the lock must be held.
+
+        Args:
+            entries (dict): Map of device keys to entries
+        '''
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f, separators=(',', ':'))
+
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
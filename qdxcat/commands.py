@@ -0,0 +1,320 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''QDX CAT command specifications.
+
+`COMMAND_SPECS` maps each command string to a precompiled `CommandSpec` describing the wire code, access mode, value type, response width, valid range, enumerated options, and minimum firmware version. Each spec provides a dedicated encoder and decoder, so values are validated before they reach the wire and responses are converted without type guessing.
+
+Example:
+```
+from qdxcat.commands import COMMAND_SPECS
+
+spec = COMMAND_SPECS['MD']
+spec.options        # {1: 'LSB', 3: 'USB'}
+spec.encode(3)      # 'MD3;'
+spec.decode('3')    # 3
+```
+'''
+
+__docformat__ = 'google'
+
+
+COMMAND_MAP = {
+    'AG' : {'description': 'Audio Gain',          'unit': 'dB',       'options': None},
+    'C2' : {'description': 'Signal Gen',          'unit': 'Hz',       'options': None},
+    'FA' : {'description': 'VFO A',               'unit': 'Hz',       'options': None},
+    'FB' : {'description': 'VFO B',               'unit': 'Hz',       'options': None},
+    'FR' : {'description': 'RX VFO Mode',         'unit': '',         'options': {0:'VFO A', 1:'VFO B', 2:'Split'}},
+    'FT' : {'description': 'TX VFO Mode',         'unit': '',         'options': {0:'VFO A', 1:'VFO B', 2:'Split'}},
+    'FW' : {'description': 'Filter Bandwidth',    'unit': 'Hz',       'options': None},
+    'ID' : {'description': 'Radio ID',            'unit': '',         'options': None},
+    'IF' : {'description': 'Radio Info',          'unit': '',         'options': None},
+    'MD' : {'description': 'Operating Mode',      'unit': '',         'options': {1:'LSB', 3:'USB'}},
+    'Q0' : {'description': 'TXCO',                'unit': 'Hz',       'options': None},
+    'Q1' : {'description': 'Sideband',            'unit': '',         'options': {0:'USB', 1:'LSB'}},
+    'Q2' : {'description': 'Default Freq',        'unit': 'Hz',       'options': None},
+    'Q3' : {'description': 'VOX',                 'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
+    'Q4' : {'description': 'TX Rise',             'unit': '%',        'options': None},
+    'Q5' : {'description': 'TX Fall',             'unit': '%',        'options': None},
+    'Q6' : {'description': 'Cycle Min',           'unit': 'cycles',   'options': None},
+    'Q7' : {'description': 'Sample Min',          'unit': 'samples',  'options': None},
+    'Q8' : {'description': 'Discard',             'unit': 'cycles',   'options': None},
+    'Q9' : {'description': 'IQ Mode',             'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
+    'QA' : {'description': 'Japan Band Mode',     'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
+    'QB' : {'description': 'CAT Timeout Enable',  'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
+    'QC' : {'description': 'CAT Timeout',         'unit': 'sec',      'options': None},
+    'QD' : {'description': 'PTT Port as Serial',  'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
+    'QE' : {'description': 'VGA PS/2 Mode',       'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
+    'QF' : {'description': 'Serial 1 Baud Rate',  'unit': 'baud',     'options': None},
+    'QG' : {'description': 'Serial 2 Baud Rate',  'unit': 'baud',     'options': None},
+    'QH' : {'description': 'Serial 3 Baud Rate',  'unit': 'baud',     'options': None},
+    'QI' : {'description': 'Night Mode',          'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
+    'QJ' : {'description': 'TX Shift',            'unit': 'mHz',      'options': None},
+    'RD' : {'description': 'Neg RIT Offset',      'unit': 'Hz',       'options': None},
+    'RT' : {'description': 'RIT',                 'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
+    'RU' : {'description': 'Pos RIT Offset',      'unit': 'Hz',       'options': None},
+    'RX' : {'description': 'RX',                  'unit': '',         'options': None},
+    'SP' : {'description': 'Split Mode',          'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
+    'TQ' : {'description': 'RX/TX State',         'unit': '',         'options': {0:'RX', 1:'TX'}},
+    'TX' : {'description': 'TX',                  'unit': '',         'options': None},
+    'VN' : {'description': 'Firmware Version',    'unit': '',         'options': None}
+}
+'''Map of command strings to description, unit, and option data (see *QDXBase.command_map*)'''
+
+# value types
+INT = 'int'
+'''Integer value'''
+STR = 'str'
+'''Raw string value (ex. QDX.RADIO_INFO)'''
+DICT = 'dict'
+'''Parsed structured value (ex. QDX.RADIO_INFO_DICT)'''
+VERSION = 'version'
+'''Firmware version string (ex. '1_07'), decoded as *float*'''
+
+# access modes
+READ = 'r'
+WRITE = 'w'
+READ_WRITE = 'rw'
+
+MIN_FIRMWARE_VERSION = 1.03
+'''Oldest QDX firmware version with CAT support, assumed if the firmware version is unknown'''
+
+# maximum value of an 11 digit frequency field
+_MAX_FREQ = 99999999999
+
+
+def decode_value(response):
+    '''Convert a response string to a value by type inspection.
+
+    Used for responses that do not match the command value type.
+
+    Args:
+        response (str): Response value without leading command and trailing semicolon
+
+    Returns:
+        int, float, str, or None: Converted value, None if *response* is empty
+    '''
+    if response == '':
+        return None
+    elif response.replace('-', '', 1).isnumeric():
+        # handle negative sign in string
+        return int(response)
+    elif '.' in response and response.replace('.', '', 1).replace('-', '', 1).isnumeric():
+        # handle decimal point and negative sign in string
+        return float(response)
+
+    return response.strip()
+
+def _decode_int(response):
+    try:
+        return int(response)
+    except ValueError:
+        return decode_value(response)
+
+def _decode_str(response):
+    if response == '':
+        return None
+
+    return response.strip()
+
+def _decode_version(response):
+    try:
+        # version string format: 1_07
+        return float( response.replace('_', '.') )
+    except ValueError:
+        return decode_value(response)
+
+_DECODERS = {INT: _decode_int, STR: _decode_str, DICT: _decode_str, VERSION: _decode_version}
+
+
+class CommandSpec:
+    '''Precompiled command specification.
+
+    Attributes:
+        cmd (str): Command string (ex. 'FA', or '_IF' for custom command variants)
+        code (str): Wire command code (ex. 'FA', or 'IF' for QDX.RADIO_INFO_DICT)
+        access (str): Access mode, 'r', 'w', or 'rw'
+        type (str): Value type, 'int', 'str', 'dict', or 'version'
+        width (int): Fixed response value width in characters, or None if not fixed
+        minimum (int): Minimum settable value, or None
+        maximum (int): Maximum settable value, or None
+        options (dict): Map of valid values to descriptions, or None if not enumerated
+        min_version (float): Minimum firmware version
+        description (str): Command description
+        unit (str): Value unit (empty string if not applicable)
+        get_request (str): Precomputed *get* request string (ex. 'FA;')
+        gettable (bool): Whether the command supports a *get* operation
+        settable (bool): Whether the command supports a *set* operation
+    '''
+    __slots__ = ('cmd', 'code', 'access', 'type', 'width', 'minimum', 'maximum', 'options', 'min_version', 'description', 'unit',
+        'get_request', 'gettable', 'settable', '_decoder')
+
+    def __init__(self, cmd, access, value_type=INT, width=None, minimum=None, maximum=None, min_version=MIN_FIRMWARE_VERSION):
+        '''Initialize CommandSpec instance object.
+
+        Description, unit, and options are taken from `COMMAND_MAP` using the wire command code.
+
+        Args:
+            cmd (str): Command string
+            access (str): Access mode, 'r', 'w', or 'rw'
+            value_type (str): Value type, defaults to 'int'
+            width (int): Fixed response value width in characters, defaults to None
+            minimum (int): Minimum settable value, defaults to None
+            maximum (int): Maximum settable value, defaults to None
+            min_version (float): Minimum firmware version, defaults to `MIN_FIRMWARE_VERSION`
+
+        Returns:
+            qdxcat.commands.CommandSpec: Constructed CommandSpec object
+        '''
+        self.cmd = cmd
+        self.code = cmd.replace('_', '')
+        self.access = access
+        self.type = value_type
+        self.width = width
+        self.minimum = minimum
+        self.maximum = maximum
+        self.min_version = min_version
+
+        data = COMMAND_MAP.get(self.code, {})
+        self.description = data.get('description', '')
+        self.unit = data.get('unit', '')
+        self.options = data.get('options')
+
+        self.gettable = READ in access
+        self.settable = WRITE in access
+        self.get_request = '{};'.format(self.code)
+        self._decoder = _DECODERS[value_type]
+
+    def validate(self, value):
+        '''Validate a value to set.
+
+        Args:
+            value (int): Command value
+
+        Returns:
+            int: Validated value
+
+        Raises:
+            ValueError: Value is not an integer, not a valid option, or out of range
+        '''
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError('Invalid value for {} ({}): {}'.format(self.cmd, self.description, value))
+
+        if self.options is not None and value not in self.options:
+            raise ValueError('Invalid value for {} ({}): {}, valid options: {}'.format(self.cmd, self.description, value, list(self.options)))
+
+        if (self.minimum is not None and value < self.minimum) or (self.maximum is not None and value > self.maximum):
+            raise ValueError('Value out of range for {} ({}): {}, valid range: {} to {}'.format(self.cmd, self.description, value, self.minimum, self.maximum))
+
+        return value
+
+    def encode(self, value):
+        '''Format a validated *set* request.
+
+        Args:
+            value (int): Command value
+
+        Returns:
+            str: Request string (ex. 'FA7078000;')
+
+        Raises:
+            ValueError: Value is not an integer, not a valid option, or out of range
+        '''
+        return '{}{};'.format(self.code, self.validate(value))
+
+    def decode(self, response):
+        '''Convert a response value to a command value.
+
+        Args:
+            response (str): Response value without leading command and trailing semicolon
+
+        Returns:
+            Command value, None if *response* is empty
+        '''
+        if response == '':
+            return None
+
+        return self._decoder(response)
+
+    def __repr__(self):
+        return 'CommandSpec({}, {}, {})'.format(self.cmd, self.access, self.type)
+
+
+COMMAND_SPECS = {spec.cmd: spec for spec in [
+    CommandSpec('AG', READ_WRITE,   width=3),
+    CommandSpec('C2', READ_WRITE,   width=11, minimum=0, maximum=_MAX_FREQ),
+    CommandSpec('FA', READ_WRITE,   width=11, minimum=0, maximum=_MAX_FREQ),
+    CommandSpec('FB', READ_WRITE,   width=11, minimum=0, maximum=_MAX_FREQ),
+    CommandSpec('FR', READ_WRITE),
+    CommandSpec('FT', READ_WRITE),
+    CommandSpec('FW', READ,         width=4),
+    CommandSpec('ID', READ,         width=3),
+    CommandSpec('IF', READ,         STR),
+    CommandSpec('_IF', READ,        DICT),
+    CommandSpec('MD', READ_WRITE),
+    CommandSpec('Q0', READ_WRITE,   minimum=0, maximum=_MAX_FREQ),
+    CommandSpec('Q1', READ_WRITE),
+    CommandSpec('Q2', READ_WRITE,   minimum=0, maximum=_MAX_FREQ),
+    CommandSpec('Q3', READ_WRITE,   min_version=1.06),
+    CommandSpec('Q4', READ_WRITE,   minimum=0, maximum=100, min_version=1.06),
+    CommandSpec('Q5', READ_WRITE,   minimum=0, maximum=100, min_version=1.06),
+    CommandSpec('Q6', READ_WRITE,   minimum=0, min_version=1.06),
+    CommandSpec('Q7', READ_WRITE,   minimum=0, min_version=1.06),
+    CommandSpec('Q8', READ_WRITE,   minimum=0, min_version=1.06),
+    CommandSpec('Q9', READ_WRITE,   min_version=1.06),
+    CommandSpec('QA', READ_WRITE,   min_version=1.06),
+    CommandSpec('QB', READ_WRITE,   min_version=1.06),
+    CommandSpec('QC', READ_WRITE,   minimum=0, min_version=1.06),
+    CommandSpec('QD', READ_WRITE,   min_version=1.06),
+    CommandSpec('QE', READ_WRITE,   min_version=1.06),
+    CommandSpec('QF', READ_WRITE,   minimum=1, min_version=1.06),
+    CommandSpec('QG', READ_WRITE,   minimum=1, min_version=1.06),
+    CommandSpec('QH', READ_WRITE,   minimum=1, min_version=1.06),
+    CommandSpec('QI', READ_WRITE,   min_version=1.06),
+    CommandSpec('QJ', READ_WRITE,   min_version=1.06),
+    CommandSpec('RD', WRITE,        minimum=0, maximum=99999),
+    CommandSpec('RT', READ),
+    CommandSpec('RU', WRITE,        minimum=0, maximum=99999),
+    CommandSpec('RX', WRITE),
+    CommandSpec('SP', READ_WRITE),
+    CommandSpec('TQ', READ_WRITE),
+    CommandSpec('TX', WRITE),
+    CommandSpec('VN', READ,         VERSION, min_version=1.05)
+]}
+'''Map of command strings to `CommandSpec` objects'''
+
+
+def supported_commands(version=None):
+    '''Get the commands supported by a firmware version.
+
+    Args:
+        version (float): Firmware version, defaults to None (`MIN_FIRMWARE_VERSION`, the version response requires firmware v1.05)
+
+    Returns:
+        frozenset: Supported command strings
+    '''
+    if version is None:
+        version = MIN_FIRMWARE_VERSION
+
+    return frozenset( [cmd for cmd, spec in COMMAND_SPECS.items() if spec.min_version <= version] )
@@ -0,0 +1,465 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''QDX firmware emulator for testing and benchmarking without a QDX attached.
+
+`QDXEmulator` implements the QDX CAT command set in-process, including `IF` response formatting, `?;` responses to unknown or unsupported commands, firmware version dependent commands, and configurable response latency and jitter.
+
+The emulator can be used as an in-process loopback transport (see `qdxcat.transport`), or served on a pseudo-terminal on POSIX systems so that the emulated QDX appears as a serial device.
+
+Example:
+```
+import qdxcat
+from qdxcat.emulator import QDXEmulator
+
+emulator = QDXEmulator(latency = 0.002)
+
+# in-process loopback transport
+qdx = qdxcat.QDX('emulator', transport = emulator.transport)
+
+# pseudo-terminal serial device (POSIX only)
+device = emulator.open_pty()
+qdx = qdxcat.QDX(device)
+```
+'''
+
+__docformat__ = 'google'
+
+import os
+import time
+import random
+import threading
+
+from qdxcat.commands import COMMAND_SPECS
+from qdxcat.transport import Transport
+
+
+class QDXEmulator:
+    '''Emulated QDX transceiver.
+
+    Attributes:
+        state (dict): Map of wire command strings (ex. 'FA') to current *int* values
+        version (float): Emulated firmware version
+        latency (float): Response latency in seconds
+        jitter (float): Maximum additional random response latency in seconds
+        requests (int): Number of requests processed
+    '''
+
+    DEFAULT_STATE = {
+        'AG': 0,
+        'C2': 0,
+        'FA': 7074000,
+        'FB': 7074000,
+        'FR': 0,
+        'FT': 0,
+        'FW': 3000,
+        'ID': 20,
+        'MD': 3,
+        'Q0': 25000000,
+        'Q1': 0,
+        'Q2': 7074000,
+        'Q3': 0,
+        'Q4': 10,
+        'Q5': 10,
+        'Q6': 3,
+        'Q7': 5,
+        'Q8': 3,
+        'Q9': 0,
+        'QA': 0,
+        'QB': 0,
+        'QC': 10,
+        'QD': 0,
+        'QE': 0,
+        'QF': 9600,
+        'QG': 9600,
+        'QH': 9600,
+        'QI': 0,
+        'QJ': 0,
+        'RT': 0,
+        'SP': 0,
+        'TQ': 0,
+        # rit offset, set by RD and RU commands
+        '_RIT': 0
+    }
+    '''Default emulated QDX state'''
+
+
+    def __init__(self, version=1.07, latency=0, jitter=0, state=None, seed=None):
+        '''Initialize QDXEmulator instance object.
+
+        Args:
+            version (float): Emulated firmware version, defaults to 1.07
+            latency (float): Response latency in seconds, defaults to 0
+            jitter (float): Maximum additional random response latency in seconds, defaults to 0
+            state (dict): Map of wire command strings to initial values, overriding `QDXEmulator.DEFAULT_STATE`, defaults to None
+            seed (int): Random seed for latency jitter, defaults to None
+
+        Returns:
+            qdxcat.emulator.QDXEmulator: Constructed QDXEmulator object
+        '''
+        self.state = dict(QDXEmulator.DEFAULT_STATE)
+
+        if state is not None:
+            self.state.update(state)
+
+        self.version = version
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pty_fds = None
+        self._pty_thread = None
+
+    def process(self, data):
+        '''Process one or more concatenated requests.
+
+        Args:
+            data (bytes): Encoded requests (ex. b'FA;MD;')
+
+        Returns:
+            bytes: Concatenated encoded responses, empty if no request generates a response
+        '''
+        responses = []
+
+        with self._lock:
+            for request in data.decode('utf-8').split(';')[:-1]:
+                self.requests += 1
+                response = self._process(request.strip())
+
+                if response is not None:
+                    responses.append(response)
+
+        return ''.join(responses).encode('utf-8')
+
+    def response_delay(self):
+        '''Get the emulated response delay for a request.
+
+        Returns:
+            float: Response delay in seconds
+        '''
+        if self.jitter > 0:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+        return self.latency
+
+    def transport(self, device=None, baudrate=9600, timeout=1):
+        '''Open a loopback transport connected to the emulator.
+
+        Compatible with the *transport* argument of `qdxcat.QDX` (see `qdxcat.transport`).
+
+        Args:
+            device (str): Ignored, defaults to None
+            baudrate (int): Ignored, defaults to 9600
+            timeout (float): Read timeout in seconds, defaults to 1
+
+        Returns:
+            qdxcat.emulator.LoopbackTransport: Open loopback transport
+        '''
+        return LoopbackTransport(self, timeout)
+
+    def open_pty(self):
+        '''Serve the emulator on a pseudo-terminal (POSIX only).
+
+        Returns:
+            str: Serial device path for the pseudo-terminal (ex. '/dev/pts/3')
+
+        Raises:
+            OSError: Pseudo-terminals not supported on this platform
+        '''
+        if self._pty_fds is not None:
+            return os.ttyname(self._pty_fds[1])
+
+        try:
+            import tty
+            master, slave = os.openpty()
+        except (ImportError, AttributeError):
+            raise OSError('Pseudo-terminals not supported on this platform')
+
+        # disable echo and line buffering
+        tty.setraw(slave)
+
+        self._pty_fds = (master, slave)
+        self._pty_thread = threading.Thread(target=self._serve_pty, args=(master,), name='qdxcat-emulator')
+        self._pty_thread.daemon = True
+        self._pty_thread.start()
+
+        return os.ttyname(slave)
+
+    def close(self):
+        '''Stop serving the emulator on a pseudo-terminal.'''
+        if self._pty_fds is None:
+            return
+
+        for fd in self._pty_fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+        self._pty_fds = None
+
+    def format_radio_info(self):
+        '''Format the QDX.RADIO_INFO response value from the current state.
+
+        Returns:
+            str: Response value without leading command and trailing semicolon
+        '''
+        # split mode (FR2) receives on VFO A
+        rx_vfo = 1 if self.state['FR'] == 1 else 0
+        vfo = 'FB' if rx_vfo == 1 else 'FA'
+        rit_offset = self.state['_RIT']
+
+        return '{:011d}     {:+05d}{}{}{}{:02d}{}{}{}{}{}{}{:02d} '.format(
+            self.state[vfo],
+            rit_offset,
+            self.state['RT'],   # rit
+            0,                  # xit
+            0,                  # memory bank
+            0,                  # memory channel
+            self.state['TQ'],   # tx/rx state
+            self.state['MD'],   # mode
+            rx_vfo,             # rx vfo
+            0,                  # scan
+            self.state['SP'],   # split
+            0,                  # tone
+            0                   # tone number
+        )
+
+    def _process(self, request):
+        '''Process a single request.
+
+        Args:
+            request (str): Request without trailing semicolon
+
+        Returns:
+            str: Response including trailing semicolon, or None if the request does not generate a response
+        '''
+        cmd = request[:2]
+        value = request[2:]
+
+        spec = COMMAND_SPECS.get(cmd)
+
+        if spec is None or self.version < spec.min_version:
+            return '?;'
+
+        # TX and RX requests do not require a value (ex. 'TX;')
+        if value == '' and cmd not in ('TX', 'RX'):
+            return self._get(spec)
+
+        return self._set(spec, value)
+
+    def _get(self, spec):
+        '''Process a *get* request.
+
+        Args:
+            spec (qdxcat.commands.CommandSpec): Command specification
+
+        Returns:
+            str: Response including trailing semicolon
+        '''
+        cmd = spec.code
+
+        if cmd == 'IF':
+            return 'IF{};'.format( self.format_radio_info() )
+
+        if cmd == 'VN':
+            # version string format: 1_07
+            return 'VN{};'.format( '{:.2f}'.format(self.version).replace('.', '_') )
+
+        if not spec.gettable or cmd not in self.state:
+            return '?;'
+
+        # fixed width values are zero padded (Kenwood TS-480 format)
+        return '{}{:0{}d};'.format(cmd, self.state[cmd], spec.width or 1)
+
+    def _set(self, spec, value):
+        '''Process a *set* request.
+
+        Args:
+            spec (qdxcat.commands.CommandSpec): Command specification
+            value (str): Value string
+
+        Returns:
+            str: None, or '?;' if the request is not understood
+        '''
+        cmd = spec.code
+
+        if not spec.settable:
+            return '?;'
+
+        if cmd in ('TX', 'RX'):
+            self.state['TQ'] = 1 if cmd == 'TX' else 0
+            return None
+
+        try:
+            value = spec.validate(value)
+        except ValueError:
+            return '?;'
+
+        if cmd == 'RD':
+            self.state['_RIT'] = -value
+        elif cmd == 'RU':
+            self.state['_RIT'] = value
+        else:
+            self.state[cmd] = value
+
+        return None
+
+    def _serve_pty(self, master):
+        '''Pseudo-terminal server thread loop.
+
+        Args:
+            master (int): Pseudo-terminal master file descriptor
+        '''
+        buffer = b''
+
+        while True:
+            try:
+                data = os.read(master, 1024)
+            except OSError:
+                # pseudo-terminal closed
+                return
+
+            if len(data) == 0:
+                return
+
+            buffer += data
+
+            # process complete requests only
+            end = buffer.rfind(b';') + 1
+
+            if end == 0:
+                continue
+
+            response = self.process(buffer[:end])
+            buffer = buffer[end:]
+
+            if len(response) > 0:
+                delay = self.response_delay()
+
+                if delay > 0:
+                    time.sleep(delay)
+
+                try:
+                    os.write(master, response)
+                except OSError:
+                    return
+
+
+class LoopbackTransport(Transport):
+    '''In-process transport connected to a `QDXEmulator`.
+
+    Responses become available to read after the emulator response delay.
+    '''
+
+    def __init__(self, emulator, timeout=1):
+        '''Initialize LoopbackTransport instance object.
+
+        Args:
+            emulator (qdxcat.emulator.QDXEmulator): Connected emulator
+            timeout (float): Read timeout in seconds, defaults to 1
+        '''
+        super().__init__(timeout)
+        self._emulator = emulator
+        self._buffer = b''
+        # list of (ready time, bytes) responses not yet available to read
+        self._pending = []
+
+    @property
+    def in_waiting(self):
+        '''int: Number of bytes available to read without blocking'''
+        self._release()
+        return len(self._buffer)
+
+    def read(self, size=1):
+        '''Read bytes, blocking until *size* bytes are received or the timeout expires.
+
+        Args:
+            size (int): Number of bytes to read, defaults to 1
+
+        Returns:
+            bytes: Received bytes, may be shorter than *size* if the timeout expired
+        '''
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+        while True:
+            self._release()
+
+            if len(self._buffer) >= size or len(self._pending) == 0:
+                break
+
+            now = time.monotonic()
+            wake = self._pending[0][0]
+
+            if deadline is not None:
+                if now >= deadline:
+                    break
+
+                wake = min(wake, deadline)
+
+            time.sleep( max(0, wake - now) )
+
+        data = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return data
+
+    def write(self, data):
+        '''Write bytes to the emulator.
+
+        Args:
+            data (bytes): Encoded requests
+
+        Returns:
+            int: Number of bytes written
+
+        Raises:
+            OSError: Transport closed
+        '''
+        if not self.is_open:
+            raise OSError('Transport closed')
+
+        response = self._emulator.process(data)
+
+        if len(response) > 0:
+            ready = time.monotonic() + self._emulator.response_delay()
+
+            # responses are sent in order
+            if len(self._pending) > 0:
+                ready = max(ready, self._pending[-1][0])
+
+            self._pending.append( (ready, response) )
+
+        return len(data)
+
+    def reset_input_buffer(self):
+        '''Discard all bytes available to read.'''
+        self._release()
+        self._buffer = b''
+
+    def _release(self):
+        '''Move responses that are ready into the read buffer.'''
+        now = time.monotonic()
+
+        while len(self._pending) > 0 and self._pending[0][0] <= now:
+            self._buffer += self._pending.pop(0)[1]
@@ -0,0 +1,269 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''Background QDX setting change monitor.
+
+A `Monitor` polls a set of commands in a background thread and publishes only the changes to subscribers. The poll interval adapts to activity: polling is fast right after a change and backs off while nothing changes, keeping USB traffic low on idle radios.
+
+Example:
+```
+import qdxcat
+qdx = qdxcat.QDX()
+
+def on_change(change):
+    print(change.cmd, change.old_value, change.new_value)
+
+monitor = qdx.start_monitor(callback = on_change)
+
+# or iterate over changes
+for change in monitor.changes():
+    print(change)
+```
+'''
+
+__docformat__ = 'google'
+
+import time
+import queue
+import asyncio
+import threading
+import collections
+
+
+Change = collections.namedtuple('Change', ['cmd', 'old_value', 'new_value', 'timestamp'])
+Change.__doc__ = '''Setting change published by a `Monitor`.
+
+Attributes:
+    cmd (str): Command string
+    old_value: Previous command value (None if unknown)
+    new_value: New command value
+    timestamp (float): Time the change was detected (*time.time()*)
+'''
+
+
+class Monitor:
+    '''Background setting change monitor.
+
+    Commands in `qdxcat.QDXBase.STATUS_COMMANDS` are read with a single QDX.RADIO_INFO request (see `qdxcat.QDX.get_status`), other commands are read in a single pipelined batch (see `qdxcat.QDX.get_many`).
+
+    Attributes:
+        commands (list): Command strings to monitor
+        min_interval (float): Poll interval in seconds after a change
+        max_interval (float): Maximum poll interval in seconds while nothing changes
+        backoff (float): Poll interval multiplier applied after each poll without changes
+        interval (float): Current poll interval in seconds
+        last_error (Exception): Exception raised by the last poll, or None
+        last_callback_error (Exception): Exception raised by the last failed subscriber callback, or None
+    '''
+
+    def __init__(self, qdx, commands=None, min_interval=0.1, max_interval=2, backoff=1.5):
+        '''Initialize Monitor instance object.
+
+        Args:
+            qdx (qdxcat.QDX): QDX object to monitor
+            commands (list): Command strings to monitor, defaults to None (QDX.STATUS_COMMANDS)
+            min_interval (float): Poll interval in seconds after a change, defaults to 0.1
+            max_interval (float): Maximum poll interval in seconds while nothing changes, defaults to 2
+            backoff (float): Poll interval multiplier applied after each poll without changes, defaults to 1.5
+
+        Returns:
+            qdxcat.monitor.Monitor: Constructed Monitor object
+
+        Raises:
+            ValueError: Invalid QDX command (not in QDX.COMMANDS)
+            ValueError: Command is not gettable (not in QDX.GET_COMMANDS)
+        '''
+        if commands is None:
+            commands = qdx.STATUS_COMMANDS
+
+        for cmd in commands:
+            qdx._validate(cmd, qdx.GET_COMMANDS)
+
+        self.commands = list(commands)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.last_error = None
+        self.last_callback_error = None
+
+        self._qdx = qdx
+        self._subscribers = []
+        self._subscribers_lock = threading.Lock()
+        # last published values, initialized from local settings
+        self._values = {cmd: qdx.settings.get(cmd) for cmd in self.commands}
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        '''bool: Whether the monitor thread is running'''
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        '''Start the monitor thread, if not already running.'''
+        if self.running:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='qdxcat-monitor')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        '''Stop the monitor thread.'''
+        self._stop.set()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+        self._thread = None
+
+    def subscribe(self, callback):
+        '''Subscribe to setting changes.
+
+        Callbacks are called on the monitor thread and should return quickly. Exceptions raised by a callback are stored in `Monitor.last_callback_error` and do not prevent delivery to other subscribers.
+
+        Args:
+            callback (callable): Function called with a `Change` object for each change
+
+        Returns:
+            callable: *callback*, for use with `Monitor.unsubscribe`
+        '''
+        with self._subscribers_lock:
+            self._subscribers.append(callback)
+
+        return callback
+
+    def unsubscribe(self, callback):
+        '''Unsubscribe from setting changes.
+
+        Args:
+            callback (callable): Function previously passed to `Monitor.subscribe`
+        '''
+        with self._subscribers_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def changes(self, timeout=None):
+        '''Iterate over setting changes.
+
+        Args:
+            timeout (float): Seconds to wait for the next change before the iteration stops, defaults to None (wait forever)
+
+        Yields:
+            Change: Setting change
+        '''
+        changes = queue.Queue()
+        callback = self.subscribe(changes.put)
+
+        try:
+            while True:
+                try:
+                    yield changes.get(timeout=timeout)
+                except queue.Empty:
+                    return
+        finally:
+            self.unsubscribe(callback)
+
+    async def __aiter__(self):
+        '''Asynchronously iterate over setting changes.
+
+        Example:
+        ```
+        async for change in monitor:
+            print(change)
+        ```
+
+        Yields:
+            Change: Setting change
+        '''
+        loop = asyncio.get_event_loop()
+        changes = asyncio.Queue()
+        callback = self.subscribe( lambda change: loop.call_soon_threadsafe(changes.put_nowait, change) )
+
+        try:
+            while True:
+                yield await changes.get()
+        finally:
+            self.unsubscribe(callback)
+
+    def poll(self):
+        '''Poll monitored commands once and publish changes.
+
+        Called by the monitor thread, may also be called directly while the monitor thread is not running.
+
+        Returns:
+            list: `Change` objects published by this poll
+
+        Raises:
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        status_cmds = [cmd for cmd in self.commands if cmd in self._qdx.STATUS_COMMANDS or cmd == self._qdx.RADIO_INFO_DICT]
+        other_cmds = [cmd for cmd in self.commands if cmd not in status_cmds]
+        values = {}
+
+        if len(status_cmds) > 0:
+            values.update( self._qdx.get_status(max_age=0) )
+
+        if len(other_cmds) > 0:
+            values.update( self._qdx.get_many(other_cmds, update=True) )
+
+        now = time.time()
+        changes = []
+
+        for cmd in self.commands:
+            if values.get(cmd) != self._values.get(cmd):
+                changes.append( Change(cmd, self._values.get(cmd), values.get(cmd), now) )
+                self._values[cmd] = values.get(cmd)
+
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+
+        for change in changes:
+            for callback in subscribers:
+                try:
+                    callback(change)
+                except Exception as e:
+                    # one failing subscriber must not drop changes for the others
+                    self.last_callback_error = e
+
+        return changes
+
+    def _run(self):
+        '''Monitor thread loop.'''
+        while not self._stop.is_set():
+            try:
+                changes = self.poll()
+                self.last_error = None
+            except Exception as e:
+                # try again later (ex. device temporarily disconnected)
+                changes = []
+                self.last_error = e
+
+            if len(changes) > 0:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+
+            self._stop.wait(self.interval)
@@ -0,0 +1,283 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''Multiple QDX transceiver management.
+
+A `QDXPool` detects all connected QDX devices in parallel, creates a `qdxcat.QDX` object per device, and broadcasts operations to all devices in parallel.
+
+Example:
+```
+import qdxcat
+pool = qdxcat.QDXPool()
+
+# set all radios to the same frequency
+pool.set_all(qdxcat.QDX.VFO_A, 7078000)
+
+# read all tx states, keyed by serial port
+pool.get_all(qdxcat.QDX.TX_STATE, update = True)
+
+# access a single radio by serial port or USB serial number
+qdx = pool['/dev/ttyACM0']
+```
+'''
+
+__docformat__ = 'google'
+
+import threading
+
+import serial.tools.list_ports
+
+from qdxcat.qdx import QDX
+
+
+class QDXPool:
+    '''Registry of QDX objects, keyed by serial port and USB serial number.'''
+
+    def __init__(self, baudrate=9600, timeout=1, persistent=True, autodetect=True, transport=None):
+        '''Initialize QDXPool instance object.
+
+        Args:
+            baudrate (int): Serial port baudrate, defaults to 9600
+            timeout (int): Serial port timeout in seconds, defaults to 1
+            persistent (bool): Whether to keep serial ports open between requests, defaults to True
+            autodetect (bool): Whether to auto-detect QDX devices, defaults to True
+            transport (callable): Serial port factory (see `qdxcat.transport`), defaults to None (`serial.Serial`)
+
+        Returns:
+            qdxcat.pool.QDXPool: Constructed QDXPool object
+        '''
+        self._baudrate = baudrate
+        self._timeout = timeout
+        self._persistent = persistent
+        self._transport = transport
+        # serial port to QDX object
+        self._radios = {}
+        # serial port to USB serial number
+        self._serial_numbers = {}
+        self._lock = threading.Lock()
+
+        if autodetect:
+            self.detect()
+
+    def detect(self):
+        '''Detect QDX devices and add new devices to the pool.
+
+        All candidate serial ports are probed concurrently (see `qdxcat.QDX.detect_ports`).
+
+        Returns:
+            list: QDX objects added to the pool
+        '''
+        probe = QDX(baudrate=self._baudrate, timeout=self._timeout, autodetect=False, transport=self._transport)
+        added = []
+
+        for port in probe.detect_ports():
+            if port.device not in self._radios:
+                added.append( self.add(port.device, port.serial_number) )
+
+        return added
+
+    def add(self, port, serial_number=None):
+        '''Add a QDX device to the pool.
+
+        Args:
+            port (str): Windows COM port (ex. 'COM42') or Unix serial device path (ex. '/dev/ttyACM0')
+            serial_number (str): USB serial number, defaults to None (look up from the serial port)
+
+        Returns:
+            qdxcat.QDX: QDX object for the device
+        '''
+        if serial_number is None:
+            serial_number = self._lookup_serial_number(port)
+
+        radio = QDX(port, self._baudrate, self._timeout, autodetect=False, persistent=self._persistent, transport=self._transport)
+
+        with self._lock:
+            self._radios[port] = radio
+            self._serial_numbers[port] = serial_number
+
+        return radio
+
+    def remove(self, key):
+        '''Remove a QDX device from the pool and close its serial port.
+
+        Args:
+            key (str): Serial port or USB serial number
+
+        Raises:
+            KeyError: Device not in pool
+        '''
+        port = self._port(key)
+
+        with self._lock:
+            radio = self._radios.pop(port)
+            self._serial_numbers.pop(port)
+
+        radio.close()
+
+    def close(self):
+        '''Close all serial ports.'''
+        for radio in self.radios():
+            radio.close()
+
+    def get(self, key, default=None):
+        '''Get the QDX object for a device.
+
+        Args:
+            key (str): Serial port or USB serial number
+            default: Value returned if the device is not in the pool, defaults to None
+
+        Returns:
+            qdxcat.QDX: QDX object for the device, or *default*
+        '''
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def ports(self):
+        '''Get serial ports of devices in the pool.
+
+        Returns:
+            list: Serial port strings
+        '''
+        return list(self._radios.keys())
+
+    def serial_numbers(self):
+        '''Get USB serial numbers of devices in the pool.
+
+        Returns:
+            dict: Map of serial ports to USB serial numbers (None if unknown)
+        '''
+        return dict(self._serial_numbers)
+
+    def radios(self):
+        '''Get QDX objects in the pool.
+
+        Returns:
+            list: QDX objects
+        '''
+        return list(self._radios.values())
+
+    def broadcast(self, method, *args, **kwargs):
+        '''Call a QDX method on all devices in parallel.
+
+        Each call is processed by the serial port worker thread of the associated QDX object (see `qdxcat.worker.SerialWorker`).
+
+        Args:
+            method (str): QDX method name (ex. 'set')
+            *args: Positional arguments passed to the method
+            **kwargs: Keyword arguments passed to the method
+
+        Returns:
+            dict: Map of serial ports to method return values, or to exceptions raised by the method
+        '''
+        with self._lock:
+            radios = dict(self._radios)
+
+        futures = {}
+        for port, radio in radios.items():
+            futures[port] = radio._worker.submit(getattr(radio, method), *args, priority=QDX.PRIORITY_DEFAULT, **kwargs)
+
+        results = {}
+        for port, future in futures.items():
+            try:
+                results[port] = future.result()
+            except Exception as e:
+                results[port] = e
+
+        return results
+
+    def get_all(self, cmd, update=False):
+        '''Get command value from all devices in parallel.
+
+        Args:
+            cmd (str): Command to get value for
+            update (bool): Update local settings from QDX settings if True, or use local settings if False, defaults to False
+
+        Returns:
+            dict: Map of serial ports to command values, or to exceptions
+        '''
+        return self.broadcast('get', cmd, update)
+
+    def set_all(self, cmd, value):
+        '''Set command value on all devices in parallel.
+
+        Args:
+            cmd (str): Command to set value for
+            value (int): Command value to set
+
+        Returns:
+            dict: Map of serial ports to command values, or to exceptions
+        '''
+        return self.broadcast('set', cmd, value)
+
+    def __getitem__(self, key):
+        return self._radios[self._port(key)]
+
+    def __contains__(self, key):
+        try:
+            self._port(key)
+            return True
+        except KeyError:
+            return False
+
+    def __iter__(self):
+        return iter(self.radios())
+
+    def __len__(self):
+        return len(self._radios)
+
+    def _port(self, key):
+        '''Get the serial port for a key.
+
+        Args:
+            key (str): Serial port or USB serial number
+
+        Returns:
+            str: Serial port
+
+        Raises:
+            KeyError: Device not in pool
+        '''
+        if key in self._radios:
+            return key
+
+        for port, serial_number in self._serial_numbers.items():
+            if serial_number is not None and serial_number == key:
+                return port
+
+        raise KeyError('QDX device not in pool: {}'.format(key))
+
+    def _lookup_serial_number(self, port):
+        '''Look up the USB serial number of a serial port.
+
+        Args:
+            port (str): Serial port
+
+        Returns:
+            str: USB serial number, or None if unknown
+        '''
+        for port_info in serial.tools.list_ports.comports():
+            if port_info.device == port:
+                return port_info.serial_number
+
+        return None
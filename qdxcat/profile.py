@@ -0,0 +1,180 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''Station configuration profiles.
+
+A `Profile` is a set of QDX configuration settings (ex. sideband, VOX, TX rise and fall times, CAT timeout, serial baudrates) that can be exported from a QDX, saved to a JSON file, and applied to other QDX devices. Applying a profile compares it to the known QDX settings and writes only the settings that differ, in a single pipelined transaction.
+
+Example:
+```
+import qdxcat
+qdx = qdxcat.QDX()
+
+# export the current configuration
+qdx.export_profile().save('station.json')
+
+# apply to all radios, radios that already match are not written to
+profile = qdxcat.Profile.load('station.json')
+pool = qdxcat.QDXPool()
+pool.broadcast('apply_profile', profile)
+```
+'''
+
+__docformat__ = 'google'
+
+import json
+import time
+
+from qdxcat.commands import COMMAND_SPECS
+
+
+class Profile:
+    '''QDX configuration profile.
+
+    Attributes:
+        settings (dict): Map of commands to command values
+        name (str): Profile name, or None
+    '''
+
+    def __init__(self, settings, name=None):
+        '''Initialize Profile instance object.
+
+        Args:
+            settings (dict): Map of commands to command values, commands must be gettable and settable
+            name (str): Profile name, defaults to None
+
+        Returns:
+            qdxcat.profile.Profile: Constructed Profile object
+
+        Raises:
+            ValueError: Invalid QDX command, command is not gettable and settable, or invalid command value
+        '''
+        self.settings = {}
+        self.name = name
+
+        for cmd, value in settings.items():
+            spec = COMMAND_SPECS.get(cmd)
+
+            if spec is None or not (spec.gettable and spec.settable):
+                raise ValueError('Invalid profile command: {}'.format(cmd))
+
+            self.settings[cmd] = spec.validate(value)
+
+    @classmethod
+    def load(cls, path):
+        '''Load a profile from a JSON file (see `Profile.save`).
+
+        Args:
+            path (str): Profile file path
+
+        Returns:
+            qdxcat.profile.Profile: Loaded profile
+
+        Raises:
+            OSError: Error reading the profile file
+            ValueError: Invalid profile file
+        '''
+        with open(path, 'r') as f:
+            data = json.load(f)
+
+        if not isinstance(data, dict) or not isinstance(data.get('settings'), dict):
+            raise ValueError('Invalid profile file: {}'.format(path))
+
+        return cls(data['settings'], data.get('name'))
+
+    def save(self, path):
+        '''Save the profile to a JSON file.
+
+        Args:
+            path (str): Profile file path
+
+        Raises:
+            OSError: Error writing the profile file
+        '''
+        with open(path, 'w') as f:
+            json.dump({'name': self.name, 'time': time.time(), 'settings': self.settings}, f, indent=2)
+
+    def diff(self, qdx, max_age=None):
+        '''Compare the profile to QDX settings.
+
+        Known local settings are used without serial I/O while fresh (configuration settings do not expire by default, see `qdxcat.QDXBase.CACHE_TTL`), and all other settings are read in a single pipelined transaction. Commands not supported by the QDX firmware are ignored.
+
+        Args:
+            qdx (qdxcat.QDX): QDX object to compare to
+            max_age (float): Maximum local setting age in seconds, defaults to None (use the command time-to-live)
+
+        Returns:
+            dict: Map of commands to (current value, profile value) tuples for settings that differ
+
+        Raises:
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        cmds = self._supported(qdx)
+        current = qdx.get_many(cmds, max_age=max_age)
+        return {cmd: (current[cmd], self.settings[cmd]) for cmd in cmds if current[cmd] != self.settings[cmd]}
+
+    def apply(self, qdx, max_age=None, rollback=True):
+        '''Apply the profile to a QDX, writing only settings that differ.
+
+        Changed settings are written in a single pipelined transaction and verified in a single pass (see `qdxcat.QDX.transaction`).
+
+        Args:
+            qdx (qdxcat.QDX): QDX object to apply the profile to
+            max_age (float): Maximum local setting age in seconds used to compare settings, defaults to None (use the command time-to-live)
+            rollback (bool): Whether to restore previous values if verification fails, defaults to True
+
+        Returns:
+            dict: Map of commands to (previous value, profile value) tuples for settings written
+
+        Raises:
+            qdxcat.QDXVerifyError: Values read back do not match
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        changes = self.diff(qdx, max_age)
+
+        if len(changes) > 0:
+            qdx.transaction({cmd: value for cmd, (current, value) in changes.items()}, rollback)
+
+        return changes
+
+    def _supported(self, qdx):
+        '''Get profile commands supported by the QDX firmware.
+
+        Args:
+            qdx (qdxcat.QDX): QDX object
+
+        Returns:
+            list: Command strings
+        '''
+        if qdx.supported_commands is None:
+            return list(self.settings)
+
+        return [cmd for cmd in self.settings if cmd in qdx.supported_commands]
+
+    def __eq__(self, other):
+        return isinstance(other, Profile) and self.settings == other.settings
+
+    def __repr__(self):
+        return 'Profile({}, name={!r})'.format(self.settings, self.name)
@@ -0,0 +1,250 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''Low latency PTT engine.
+
+A `PTTEngine` keys the transmitter with a single `TQ1;` or `TQ0;` write at the highest worker priority, without reading the PTT state back on the critical path. The new state is verified afterwards with the deferred write verification batch (see `qdxcat.QDX.set`). Key-up can be scheduled at a monotonic or UTC timestamp for slot based modes (ex. WSPR, FT8), and the measured key-up latency is recorded for timing calibration.
+
+Example:
+```
+import time
+import qdxcat
+qdx = qdxcat.QDX(persistent = True)
+
+# open the serial port ahead of time
+qdx.ptt.warm()
+
+# key up at the start of the next 15 second FT8 slot
+slot = (int(time.time()) // 15 + 1) * 15
+future = qdx.ptt.schedule(1, utc = slot)
+future.result()
+
+qdx.ptt.key_down()
+qdx.ptt.latency_stats()
+```
+'''
+
+__docformat__ = 'google'
+
+import time
+import threading
+import collections
+import concurrent.futures
+
+
+class PTTEngine:
+    '''Low latency PTT control for a single QDX.
+
+    Latency is measured from the time a key request is made (or the scheduled target time) until the PTT request is written to the serial port. Keep the serial connection open (`qdxcat.QDX` *persistent* argument) to avoid opening the serial port on the critical path.
+
+    Attributes:
+        verify (bool): Whether to verify the PTT state after each key request, defaults to True
+        spin (float): Time in seconds before a scheduled key request to stop sleeping and busy-wait, defaults to 0.002
+        latencies (collections.deque): Measured key-up latencies in seconds, most recent last
+        last_error (Exception): Exception raised by the last failed verification, or None
+        state (int): Last PTT state keyed (1 for transmit, 0 for receive), or None
+    '''
+
+    REQUESTS = {0: 'TQ0;', 1: 'TQ1;'}
+    '''Preformatted PTT requests by state'''
+
+    def __init__(self, qdx, verify=True, history=1000, callback=None):
+        '''Initialize PTTEngine instance object.
+
+        Args:
+            qdx (qdxcat.QDX): QDX object to control
+            verify (bool): Whether to verify the PTT state after each key request, defaults to True
+            history (int): Number of key-up latencies to keep, defaults to 1000
+            callback (callable): Function called with the exception if verification fails, defaults to None
+
+        Returns:
+            qdxcat.ptt.PTTEngine: Constructed PTTEngine object
+        '''
+        self.verify = verify
+        self.spin = 0.002
+        self.latencies = collections.deque(maxlen=history)
+        self.last_error = None
+        self.state = None
+
+        self._qdx = qdx
+        self._callback = callback
+        self._lock = threading.Lock()
+
+    def warm(self):
+        '''Open the persistent serial connection ahead of the first key request.
+
+        Has no effect if the QDX object does not keep the serial port open.
+
+        Raises:
+            OSError: Error opening serial port
+        '''
+        if self._qdx._persistent:
+            self._qdx._worker.call(self._qdx._open_serial_port, priority=self._qdx.PRIORITY_PTT)
+
+    def key(self, state):
+        '''Set PTT state without reading it back.
+
+        Args:
+            state (int): 1 for transmit, 0 for receive
+
+        Returns:
+            float: Key latency in seconds
+
+        Raises:
+            ValueError: Invalid PTT state
+            OSError: Error during serial port request
+        '''
+        return self._key(state, time.monotonic())
+
+    def key_up(self):
+        '''Set PTT to transmit state without reading it back.
+
+        Returns:
+            float: Key-up latency in seconds
+        '''
+        return self.key(1)
+
+    def key_down(self):
+        '''Set PTT to receive state without reading it back.
+
+        Returns:
+            float: Key latency in seconds
+        '''
+        return self.key(0)
+
+    def schedule(self, state, at=None, utc=None):
+        '''Schedule a PTT state change.
+
+        The scheduling thread sleeps until shortly before the target time, then busy-waits (see *spin*) to reduce wake-up jitter.
+
+        Args:
+            state (int): 1 for transmit, 0 for receive
+            at (float): Target time as a *time.monotonic()* timestamp, defaults to None
+            utc (float): Target time as a *time.time()* (UTC epoch) timestamp, used if *at* is None, defaults to None (now)
+
+        Returns:
+            concurrent.futures.Future: Future resolved with the key latency in seconds relative to the target time, or the exception raised. Cancel the future to cancel the scheduled key request.
+
+        Raises:
+            ValueError: Invalid PTT state
+        '''
+        if state not in PTTEngine.REQUESTS:
+            raise ValueError('Invalid PTT state: {}'.format(state))
+
+        if at is None:
+            at = time.monotonic() if utc is None else time.monotonic() + (utc - time.time())
+
+        future = concurrent.futures.Future()
+        thread = threading.Thread(target=self._run_scheduled, args=(future, state, at), name='qdxcat-ptt')
+        thread.daemon = True
+        thread.start()
+        return future
+
+    def latency_stats(self):
+        '''Get key-up latency statistics.
+
+        Returns:
+            dict: Latency statistics in seconds, keys: 'count', 'min', 'mean', 'max', 'p50', 'p99' (values are None if no latencies are recorded)
+        '''
+        with self._lock:
+            latencies = sorted(self.latencies)
+
+        count = len(latencies)
+
+        if count == 0:
+            return {'count': 0, 'min': None, 'mean': None, 'max': None, 'p50': None, 'p99': None}
+
+        return {
+            'count': count,
+            'min': latencies[0],
+            'mean': sum(latencies) / count,
+            'max': latencies[-1],
+            'p50': latencies[int(0.5 * (count - 1))],
+            'p99': latencies[int(0.99 * (count - 1))]
+        }
+
+    def _key(self, state, start):
+        '''Write a PTT request and queue verification.
+
+        Args:
+            state (int): 1 for transmit, 0 for receive
+            start (float): *time.monotonic()* timestamp latency is measured from
+
+        Returns:
+            float: Key latency in seconds
+        '''
+        request = PTTEngine.REQUESTS.get(state)
+
+        if request is None:
+            raise ValueError('Invalid PTT state: {}'.format(state))
+
+        self._qdx._serial_io(request, count=0, priority=self._qdx.PRIORITY_PTT)
+        latency = time.monotonic() - start
+        self.state = state
+
+        if state == 1:
+            with self._lock:
+                self.latencies.append(latency)
+
+        self._qdx._invalidate(self._qdx.TX_STATE)
+        self._qdx._assume_settings({self._qdx.TX_STATE: state})
+
+        if self.verify:
+            self._qdx._defer_verification({self._qdx.TX_STATE: state}, self._on_error)
+
+        return latency
+
+    def _run_scheduled(self, future, state, at):
+        '''Scheduling thread, waits until *at* and keys.
+
+        Args:
+            future (concurrent.futures.Future): Future resolved with the key latency
+            state (int): 1 for transmit, 0 for receive
+            at (float): Target *time.monotonic()* timestamp
+        '''
+        delay = at - time.monotonic() - self.spin
+
+        if delay > 0:
+            time.sleep(delay)
+
+        while time.monotonic() < at:
+            pass
+
+        if not future.set_running_or_notify_cancel():
+            return
+
+        try:
+            future.set_result( self._key(state, at) )
+        except Exception as e:
+            future.set_exception(e)
+
+    def _on_error(self, error):
+        '''Record a failed verification.
+
+        Args:
+            error (Exception): Verification exception
+        '''
+        self.last_error = error
+
+        if self._callback is not None:
+            self._callback(error)
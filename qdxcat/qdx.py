@@ -29,15 +29,55 @@ QDX commands are based on the Kenwood TS-480 command set.
 
 __docformat__ = 'google'
 
+import copy
 import time
 import serial
 import threading
+import concurrent.futures
 
 from serial.tools.list_ports import grep
 
+from qdxcat.commands import COMMAND_MAP, COMMAND_SPECS, decode_value, supported_commands
+from qdxcat.cache import DiskCache
+from qdxcat.stats import Stats
+from qdxcat.recorder import Recorder
+from qdxcat.state import RADIO_INFO_FIELDS, RadioInfo, RadioState
+from qdxcat.transport import serial_transport
+from qdxcat.worker import SerialWorker
+from qdxcat.monitor import Monitor
+from qdxcat.ptt import PTTEngine
+from qdxcat.scan import Scan
+from qdxcat.profile import Profile
+from qdxcat.telemetry import Telemetry
 
-class QDX:
-    '''QDX transceiver control object.
+
+class QDXTimeoutError(OSError):
+    '''No response received from the QDX before the serial port timeout expired.'''
+    pass
+
+class QDXCommandError(ValueError):
+    '''Command not understood by the QDX (`?;` response).'''
+    pass
+
+class QDXVerifyError(QDXCommandError):
+    '''Value read back from the QDX after a *set* operation does not match the value set.
+
+    Attributes:
+        failed (dict): Map of commands to (expected value, value read back or exception) tuples
+        rolled_back (bool): Whether previous values were restored (see `QDX.transaction`)
+    '''
+
+    def __init__(self, failed, rolled_back=False):
+        self.failed = failed
+        self.rolled_back = rolled_back
+        details = ', '.join( ['{} (set {}, read {})'.format(cmd, expected, actual) for cmd, (expected, actual) in failed.items()] )
+        super().__init__('Setting not applied by QDX: {}'.format(details))
+
+
+class QDXBase:
+    '''Common QDX command set, local settings, and response handling.
+
+    Shared by `qdxcat.QDX` and `qdxcat.AsyncQDX`, which implement the serial port I/O.
     
     Attributes:
         command_map (dict): map of command strings to associated data
@@ -162,58 +202,96 @@ class QDX:
         TXCO_FREQ, SIDEBAND, DEFAULT_FREQ, VOX_EN, TX_RISE, TX_FALL, CYCLE_MIN, SAMPLE_MIN, DISCARD, IQ_MODE, JAPAN_BAND_LIM, CAT_TIMEOUT_EN, CAT_TIMEOUT,
         PTT_PORT_SERIAL, VGA_PS2_MODE, SERIAL1_BAUD, SERIAL2_BAUD, SERIAL3_BAUD, NIGHT_MODE, TX_SHIFT, RIT_STATUS, SPLIT_MODE, TX_STATE, VERSION]
 
-    def __init__(self, port=None, baudrate=9600, timeout=1, autodetect=True):
-        '''Initialize QDX instance object.
+    VERIFY_NOW = 'now'
+    '''Write mode: write, then read the value back before returning (default)'''
+    VERIFY_NONE = 'none'
+    '''Write mode: write without reading the value back (fire-and-forget)'''
+    VERIFY_DEFERRED = 'deferred'
+    '''Write mode: write, then read the value back later in a batch with other deferred verifications'''
+
+    VALID_COMMANDS = frozenset(COMMANDS)
+    '''Set of command strings, for constant time validation'''
+    GETTABLE_COMMANDS = frozenset(GET_COMMANDS)
+    '''Set of command strings that support a *get* operation, for constant time validation'''
+    SETTABLE_COMMANDS = frozenset(SET_COMMANDS)
+    '''Set of command strings that support a *set* operation, for constant time validation'''
+
+    COMMAND_SPECS = COMMAND_SPECS
+    '''Map of command strings to precompiled command specifications (see `qdxcat.commands.CommandSpec`)'''
+
+    CAPABILITY_CACHE = 'capabilities.json'
+    '''Default capability cache file, relative to `qdxcat.cache.DEFAULT_CACHE_DIR` (see *negotiate*)'''
+
+    BATCH_SIZE = 10
+    '''Maximum number of requests written back-to-back in a single batch transaction'''
+
+    STATIC_COMMANDS = [RADIO_ID, VERSION, TXCO_FREQ]
+    '''List of command strings with values that do not change during operation, not re-read by *sync_local_settings* once known'''
+
+    CACHE_TTL = {
+        RADIO_ID:           None,
+        VERSION:            None,
+        TXCO_FREQ:          None,
+        VFO_A:              1,
+        VFO_B:              1,
+        RADIO_INFO:         1,
+        RADIO_INFO_DICT:    1,
+        TX_STATE:           0.5
+    }
+    '''Default local settings time-to-live in seconds, by command
+
+    Local settings older than the time-to-live are re-read from the QDX by *get*. A time-to-live of None (the default for commands not listed) means local settings never expire, and are only updated by *set* or when re-read explicitly. See the *cache_ttl* instance attribute to configure per object.
+    '''
+
+    STATUS_COMMANDS = [VFO_A, TX_STATE, OPERATING_MODE, SPLIT_MODE, RIT_STATUS]
+    '''List of command strings with local settings updated from every QDX.RADIO_INFO response (see *get_status*)
+
+    QDX.VFO_A is only updated when VFO A is the receive VFO, otherwise QDX.VFO_B is updated.
+    '''
+
+    VOLATILE_COMMANDS = [VFO_A, VFO_B, RX_VFO_MODE, TX_VFO_MODE, OPERATING_MODE, RADIO_INFO, RADIO_INFO_DICT, SPLIT_MODE, RIT_STATUS, TX_STATE]
+    '''List of command strings with values that change during operation, refreshed in the background when local settings are loaded from a settings snapshot (see *settings_cache*)'''
+
+    _VOLATILE = frozenset(VOLATILE_COMMANDS)
+
+    PROFILE_COMMANDS = [AUDIO_GAIN, SIDEBAND, DEFAULT_FREQ, VOX_EN, TX_RISE, TX_FALL, CYCLE_MIN, SAMPLE_MIN, DISCARD, IQ_MODE, JAPAN_BAND_LIM,
+        CAT_TIMEOUT_EN, CAT_TIMEOUT, PTT_PORT_SERIAL, VGA_PS2_MODE, SERIAL1_BAUD, SERIAL2_BAUD, SERIAL3_BAUD, NIGHT_MODE, TX_SHIFT]
+    '''List of configuration command strings exported to profiles by default (see `qdxcat.profile.Profile`), excluding volatile and per-device calibration commands (ex. QDX.TXCO_FREQ)'''
+
+    SETTINGS_CACHE = 'settings.json'
+    '''Default settings snapshot file, relative to `qdxcat.cache.DEFAULT_CACHE_DIR`'''
+
+    # fixed-width QDX.RADIO_INFO response fields (Kenwood TS-480 format): name, start offset, end offset
+    _RADIO_INFO_FIELDS = RADIO_INFO_FIELDS
+
+    # process-wide discovery cache, (device, description, USB serial number) of QDX devices to device
+    _discovery = {}
+    _discovery_lock = threading.Lock()
+
+    DEPENDENT_COMMANDS = {
+        VFO_A:              [RADIO_INFO, RADIO_INFO_DICT],
+        RX_VFO_MODE:        [RADIO_INFO, RADIO_INFO_DICT, SPLIT_MODE],
+        TX_VFO_MODE:        [RADIO_INFO, RADIO_INFO_DICT, SPLIT_MODE],
+        OPERATING_MODE:     [RADIO_INFO, RADIO_INFO_DICT],
+        SIDEBAND:           [RADIO_INFO, RADIO_INFO_DICT, OPERATING_MODE],
+        NEG_RIT_OFFSET:     [RADIO_INFO, RADIO_INFO_DICT],
+        POS_RIT_OFFSET:     [RADIO_INFO, RADIO_INFO_DICT],
+        RX_MODE:            [RADIO_INFO, RADIO_INFO_DICT, TX_STATE],
+        SPLIT_MODE:         [RADIO_INFO, RADIO_INFO_DICT, RX_VFO_MODE, TX_VFO_MODE],
+        TX_STATE:           [RADIO_INFO, RADIO_INFO_DICT],
+        TX_MODE:            [RADIO_INFO, RADIO_INFO_DICT, TX_STATE]
+    }
+    '''Map of commands to the commands with local settings invalidated when the command is set (ex. setting QDX.VFO_A changes the QDX.RADIO_INFO response)'''
+
+    def __init__(self, baudrate=9600, timeout=1, transport=None):
+        '''Initialize command set and local settings.
 
         Args:
-            port (str): Windows COM port (ex. 'COM42') or Unix serial device path (ex. '/dev/ttyACM0'), defaults to None
             baudrate (int): Serial port baudrate, defaults to 9600
             timeout (int): Serial port timeout in seconds, defaults to 1
-            autodetect (bool): Whether to auto-detect QDX device serial port, defaults to True
-
-        Returns:
-            qdxcat.QDX: Constructed QDX object
+            transport (callable): Serial port factory (see `qdxcat.transport`), defaults to None (`serial.Serial`)
         '''
-        self.command_map = {
-            'AG' : {'description': 'Audio Gain',          'unit': 'dB',       'options': None},
-            'C2' : {'description': 'Signal Gen',          'unit': 'Hz',       'options': None},
-            'FA' : {'description': 'VFO A',               'unit': 'Hz',       'options': None},
-            'FB' : {'description': 'VFO B',               'unit': 'Hz',       'options': None},
-            'FR' : {'description': 'RX VFO Mode',         'unit': '',         'options': {0:'VFO A', 1:'VFO B', 2:'Split'}},
-            'FT' : {'description': 'TX VFO Mode',         'unit': '',         'options': {0:'VFO A', 1:'VFO B', 2:'Split'}},
-            'FW' : {'description': 'Filter Bandwidth',    'unit': 'Hz',       'options': None},
-            'ID' : {'description': 'Radio ID',            'unit': '',         'options': None},
-            'IF' : {'description': 'Radio Info',          'unit': '',         'options': None},
-            'MD' : {'description': 'Operating Mode',      'unit': '',         'options': {1:'LSB', 3:'USB'}},
-            'Q0' : {'description': 'TXCO',                'unit': 'Hz',       'options': None},
-            'Q1' : {'description': 'Sideband',            'unit': '',         'options': {0:'USB', 1:'LSB'}},
-            'Q2' : {'description': 'Default Freq',        'unit': 'Hz',       'options': None},
-            'Q3' : {'description': 'VOX',                 'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
-            'Q4' : {'description': 'TX Rise',             'unit': '%',        'options': None},
-            'Q5' : {'description': 'TX Fall',             'unit': '%',        'options': None},
-            'Q6' : {'description': 'Cycle Min',           'unit': 'cycles',   'options': None},
-            'Q7' : {'description': 'Sample Min',          'unit': 'samples',  'options': None},
-            'Q8' : {'description': 'Discard',             'unit': 'cycles',   'options': None},
-            'Q9' : {'description': 'IQ Mode',             'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
-            'QA' : {'description': 'Japan Band Mode',     'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
-            'QB' : {'description': 'CAT Timeout Enable',  'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
-            'QC' : {'description': 'CAT Timeout',         'unit': 'sec',      'options': None},
-            'QD' : {'description': 'PTT Port as Serial',  'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
-            'QE' : {'description': 'VGA PS/2 Mode',       'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
-            'QF' : {'description': 'Serial 1 Baud Rate',  'unit': 'baud',     'options': None},
-            'QG' : {'description': 'Serial 2 Baud Rate',  'unit': 'baud',     'options': None},
-            'QH' : {'description': 'Serial 3 Baud Rate',  'unit': 'baud',     'options': None},
-            'QI' : {'description': 'Night Mode',          'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
-            'QJ' : {'description': 'TX Shift',            'unit': 'mHz',      'options': None},
-            'RD' : {'description': 'Neg RIT Offset',      'unit': 'Hz',       'options': None},
-            'RT' : {'description': 'RIT',                 'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
-            'RU' : {'description': 'Pos RIT Offset',      'unit': 'Hz',       'options': None},
-            'RX' : {'description': 'RX',                  'unit': '',         'options': None},
-            'SP' : {'description': 'Split Mode',          'unit': '',         'options': {0:'Disabled', 1:'Enabled'}},
-            'TQ' : {'description': 'RX/TX State',         'unit': '',         'options': {0:'RX', 1:'TX'}},
-            'TX' : {'description': 'TX',                  'unit': '',         'options': None},
-            'VN' : {'description': 'Firmware Version',    'unit': '',         'options': None}
-        }
+        self.command_map = copy.deepcopy(COMMAND_MAP)
         '''
         Map of commands to associated data.
         
@@ -230,303 +308,1969 @@ class QDX:
         ```
         '''
 
-        self.settings = {}
+        self.settings = RadioState()
         '''
-        Local settings representation. Updated automatically when QDX.set() is called.
+        Local settings representation (see `qdxcat.state.RadioState`), supports dictionary access. Updated automatically when QDX.set() is called.
         
         Dictionary structure:
         ```
         {
-            'CMD' : int OR float OR str OR dict,
+            'CMD' : int OR float OR str OR qdxcat.state.RadioInfo,
             ...
         }
         ```
         '''
         
+        self.cache_ttl = dict(QDXBase.CACHE_TTL)
+        '''
+        Local settings time-to-live in seconds, by command. Defaults to a copy of QDXBase.CACHE_TTL.
+        '''
+
+        self.firmware_version = None
+        '''
+        QDX firmware version, None until known. See *negotiate()*.
+        '''
+
+        self.supported_commands = None
+        '''
+        Set of command strings supported by the QDX firmware, None until known (all commands allowed). Unsupported commands raise `qdxcat.QDXCommandError` without serial I/O. See *negotiate()*.
+        '''
+
+        self.capability_cache = QDXBase.CAPABILITY_CACHE
+        '''
+        Capability cache file path, or None to disable the on-disk capability cache. Defaults to QDXBase.CAPABILITY_CACHE.
+        '''
+
+        self.settings_cache = QDXBase.SETTINGS_CACHE
+        '''
+        Settings snapshot file path, or None to disable settings snapshots. Defaults to QDXBase.SETTINGS_CACHE.
+
+        Local settings are saved to the snapshot by USB serial number after each settings sync, and loaded when the serial port is set. Loaded settings are available immediately and marked stale (see *is_stale()*) until they are read from the QDX. Only QDXBase.VOLATILE_COMMANDS are refreshed in the background after loading a snapshot.
+        '''
+
+        self.metrics = None
+        '''
+        Serial I/O metrics (see `qdxcat.stats.Stats`), None while instrumentation is disabled. See *enable_stats()*.
+        '''
+
         self._settings_lock = threading.Lock()
+        # USB serial number of the configured serial port, False until looked up
+        self._serial_number = False
+        # commands with local settings loaded from a settings snapshot and not yet read from the QDX
+        self._stale = set()
         self._debug = False
+
+        # instrumentation
+        self._request_hooks = []
+        self._response_hooks = []
+        self._instrumented = False
+
+        # deferred write verification, (settings, future, callback) tuples
+        self._pending_verifications = []
+        self._verify_scheduled = False
         
         # serial port config
         self._port = None
         self._baudrate = baudrate
         self._timeout = timeout
+        self._transport = serial_transport if transport is None else transport
 
-        if port is not None:
-            self.set_port(port, baudrate, timeout)
-        elif autodetect:
-            self.autodetect()
+    def start_recording(self, path, buffer_size=65536):
+        '''Record all serial transactions to a binary session log.
 
-    def autodetect(self):
-        '''Auto-detect QDX device serial port.'''
-        # linux port description: 'QDX Transceiver'
-        # windows port description: 'USB Serial Device (COMx)'
+        See `qdxcat.recorder.Recorder`. Close the recorder to stop recording.
 
-        # try linux description
-        ports = list( serial.tools.list_ports.grep('QDX Transceiver') )
+        Args:
+            path (str): Log file path, records are appended if the file exists
+            buffer_size (int): Write buffer size in bytes, defaults to 65536
 
-        if len(ports) == 0:
-            # try windows description
-            ports = list( serial.tools.list_ports.grep('USB Serial Device') )
-            
-        # check QDX radio ID ( int('020') )
-        for port in ports.copy():
-            try:
-                if self._get(QDX.RADIO_ID, device = port.device) != 20:
-                    ports.remove(port)
-            except Exception as e:
-                # error occurred while getting radio ID, must not be a properly functioning QDX
-                ports.remove(port)
-                continue
+        Returns:
+            qdxcat.recorder.Recorder: Recorder object
+        '''
+        recorder = Recorder(path, buffer_size)
+        recorder.attach(self)
+        return recorder
 
-        if len(ports) == 0:
-            # no matching device description on linux or windows
-            raise IOError('QDX device not found, check device connection or specifiy a serial port')
+    def enable_stats(self, buckets=None):
+        '''Enable serial I/O instrumentation.
 
-        if len(ports) > 1:
-            devices = ', '.join( [port.name for port in ports] )
-            raise IOError('Multiple QDX devices found, try specifying a serial port: {}'.format(devices))
-        
-        self.set_port(ports[0].device)
+        Args:
+            buckets (tuple): Latency histogram bucket upper bounds in seconds, defaults to None (`qdxcat.stats.Stats.DEFAULT_BUCKETS`)
 
-    def set_port(self, port, baudrate=9600, timeout=1, sync=True):
-        '''Set QDX device serial port.
+        Returns:
+            qdxcat.stats.Stats: Metrics object, also available as *metrics*
+        '''
+        if self.metrics is None:
+            self.metrics = Stats(buckets)
+
+        self._update_instrumented()
+        return self.metrics
+
+    def disable_stats(self):
+        '''Disable serial I/O instrumentation and discard collected metrics.'''
+        self.metrics = None
+        self._update_instrumented()
+
+    def stats(self):
+        '''Get a snapshot of serial I/O metrics.
+
+        Returns:
+            dict: Metrics snapshot (see `qdxcat.stats.Stats.snapshot`), or None if instrumentation is disabled
+        '''
+        if self.metrics is None:
+            return None
+
+        return self.metrics.snapshot()
+
+    def add_request_hook(self, callback):
+        '''Add a callback called before each serial transaction.
+
+        Callbacks are called on the thread that issued the request (not necessarily the serial worker thread, see `qdxcat.worker.SerialWorker`) before the request is queued, and should return quickly.
 
         Args:
-            port (str): Windows COM port (ex. 'COM42') or Unix serial device path (ex. '/dev/ttyACM0')
-            baudrate (int): Serial port baudrate, defaults to 9600
-            timeout (int): Serial port timeout in seconds, defaults to 1
-            sync (bool): Whether to sync local settings to transceiver settings, defaults to True
+            callback (callable): Function called with the request string (one or more concatenated requests)
+
+        Returns:
+            callable: *callback*, for use with *remove_hook()*
         '''
-        if port is None:
-            return
-            
-        self._port = port
-        self._baudrate = baudrate
-        self._timeout = timeout
+        self._request_hooks.append(callback)
+        self._update_instrumented()
+        return callback
 
-        if sync:
-            # minimize delay at startup by using a thread
-            thread = threading.Thread(target=self.sync_local_settings)
-            thread.daemon = True
-            thread.start()
+    def add_response_hook(self, callback):
+        '''Add a callback called after each serial transaction.
 
-    def get(self, cmd, update=False):
-        '''Get command value.
+        Callbacks are called on the thread that issued the request (not necessarily the serial worker thread, see `qdxcat.worker.SerialWorker`) and should return quickly. The transaction duration is measured on that thread, so it includes time spent waiting in the serial worker queue behind other requests.
 
         Args:
-            cmd (str): Command to get value for
-            update (bool): Update local settings from QDX settings if True, or use local settings if False, defaults to False
+            callback (callable): Function called with the request string, the list of response strings (None if an error occurred), the transaction duration in seconds (including queue wait time), and the exception raised (None if no error occurred)
 
         Returns:
-            int: Command value
+            callable: *callback*, for use with *remove_hook()*
+        '''
+        self._response_hooks.append(callback)
+        self._update_instrumented()
+        return callback
 
-        Raises:
-            ValueError: Invalid QDX command (not in QDX.COMMANDS)
-            ValueError: Command is not settable (not in QDX.GET_COMMANDS)
+    def remove_hook(self, callback):
+        '''Remove a request or response hook.
+
+        Args:
+            callback (callable): Function previously passed to *add_request_hook()* or *add_response_hook()*
         '''
-        if cmd not in QDX.COMMANDS:
-            raise ValueError('Invalid QDX command: {}'.format(cmd))
-            
-        if cmd not in QDX.GET_COMMANDS:
-            raise ValueError('Command is not gettable: {}'.format(cmd))
-            
-        if update or cmd not in self.settings:
-            self.sync_local_setting(cmd)
-            
-        return self.settings[cmd]
+        for hooks in (self._request_hooks, self._response_hooks):
+            if callback in hooks:
+                hooks.remove(callback)
+
+        self._update_instrumented()
+
+    def setting_age(self, cmd):
+        '''Get the age of a local setting.
 
-    def set(self, cmd, value):
-        '''Set command value.
-        
         Args:
-            cmd (str): Command to set value for
-            value (int): Command value to set
+            cmd (str): Command string
 
         Returns:
-            int: Command value
+            float: Seconds since the local setting was read from the QDX, or None if the local setting is unknown or invalidated
+        '''
+        timestamp = self.settings.timestamp(cmd)
 
-        Raises:
-            ValueError: Invalid QDX command (not in QDX.COMMANDS)
-            ValueError: Command is not settable (not in QDX.SET_COMMANDS)
+        if timestamp is None:
+            return None
+
+        return time.monotonic() - timestamp
+
+    def _is_fresh(self, cmd, max_age=None):
+        '''Whether a local setting can be used without re-reading it from the QDX.
+
+        Args:
+            cmd (str): Command string
+            max_age (float): Maximum local setting age in seconds, defaults to None (use the command time-to-live, see *cache_ttl*)
+
+        Returns:
+            bool: True if the local setting is known and not expired, False otherwise
         '''
-        if cmd not in QDX.COMMANDS:
-            raise ValueError('Invalid QDX command: {}'.format(cmd))
-            
-        if cmd not in QDX.SET_COMMANDS:
-            raise ValueError('Command is not settable: {}'.format(cmd))
-            
-        self._set(cmd, value)
-        return self.get(cmd, update=True)
+        timestamp = self.settings.timestamp(cmd)
 
-    def sync_local_setting(self, cmd):
-        '''Sync local setting with transceiver setting.
+        if timestamp is None:
+            return False
+
+        if cmd in self._stale and cmd in QDXBase._VOLATILE:
+            # volatile settings loaded from a snapshot are re-read on use
+            return False
+
+        if max_age is None:
+            max_age = self.cache_ttl.get(cmd)
+
+        if max_age is None:
+            # never expires
+            return True
+
+        return time.monotonic() - timestamp <= max_age
+
+    def _update_settings(self, values):
+        '''Update local settings and timestamps.
 
         Args:
-            cmd (str): Command to sync
+            values (dict): Map of commands to command values
+        '''
+        now = time.monotonic()
 
-        Raises:
-            ValueError: Invalid QDX command (not in QDX.COMMANDS)
-            ValueError: Error processing command
+        with self._settings_lock:
+            for cmd, value in values.items():
+                self.settings.store(cmd, value, now)
+                self._stale.discard(cmd)
+
+    def is_stale(self, cmd):
+        '''Whether a local setting was loaded from a settings snapshot and not yet read from the QDX.
+
+        Args:
+            cmd (str): Command string
+
+        Returns:
+            bool: True if the local setting is stale, False otherwise
+        '''
+        return cmd in self._stale
+
+    def save_settings(self):
+        '''Save local settings to the settings snapshot (see *settings_cache*).
+
+        Local settings are saved automatically after each settings sync. Settings are only saved for USB serial devices (keyed by USB serial number).
         '''
+        key = self._device_key()
+
+        if key is None or self.settings_cache is None:
+            return
+
         with self._settings_lock:
-            if cmd not in QDX.COMMANDS:
-                raise ValueError('Invalid QDX command: {}'.format(cmd))
+            settings = {cmd: value.to_dict() if isinstance(value, RadioInfo) else value for cmd, value in self.settings.items() if value is not None}
 
-            self.settings[cmd] = self._get(cmd)
-    
-    def sync_local_settings(self):
-        '''Sync all local settings with transceiver settings.'''
-        for cmd in QDX.COMMANDS:
-            self.sync_local_setting(cmd)
+        DiskCache(self.settings_cache).set(key, {'time': time.time(), 'firmware': self.firmware_version, 'settings': settings})
 
-    def ptt_on(self):
-        '''Set PTT to transmit state.'''
-        self.set(QDX.TX_STATE, 1)
-                          
-    def ptt_off(self):
-        '''Set PTT to receive state.'''
-        self.set(QDX.TX_STATE, 0)
-        
-    def toggle_ptt(self):
-        '''Toggle PTT state.'''
-        if self.get(QDX.TX_STATE) == 0:
-            self.ptt_on()
-        else:
-            self.ptt_off()
-    
-    def _serial_request(self, request, device=None):
-        '''Process serial request and response.
+    def _load_settings(self):
+        '''Load local settings from the settings snapshot (see *settings_cache*).
 
-        Args:
-            request (str): Command to get, or command and value to set
-            device (str): Serial device port *str* to use instead of configured port, defaults to None
+        Loaded settings are marked stale. Setting ages are restored from the snapshot time, so local settings with a time-to-live expire as usual.
 
-        Raises:
-            ValueError: Serial port not specified
-            OSError: Error during serial port request/response
+        Returns:
+            bool: True if a snapshot was loaded, False otherwise
         '''
-        if device is None:
-            device = self._port
-        
-        if device is None:
-            raise ValueError('Serial port not specified')
+        key = self._device_key()
 
-        if self._debug:
-            print( 'TX: {}'.format(request) )
+        if key is None or self.settings_cache is None:
+            return False
+
+        entry = DiskCache(self.settings_cache).get(key)
+
+        if not isinstance(entry, dict) or not isinstance(entry.get('settings'), dict):
+            return False
+
+        age = max(0, time.time() - entry.get('time', 0))
+        timestamp = time.monotonic() - age
+        settings = dict(entry['settings'])
+
+        # QDX.RADIO_INFO_DICT is saved as a dictionary, rebuild it from the QDX.RADIO_INFO response
+        settings.pop(QDXBase.RADIO_INFO_DICT, None)
 
-        # convert string to bytes
-        request = request.encode('utf-8')
-                
         try:
-            with serial.Serial(device, self._baudrate, timeout=self._timeout) as serial_port:
-                serial_port.write(request)
-                #TODO use while loop to wait until in_waiting is True, accounting for timeout
-                time.sleep(0.1)
-        
-                response = b''
-                if serial_port.in_waiting:
-                    # handle pyserial library change in version 3.5
-                    if float(serial.__version__) >= 3.5:
-                        response = serial_port.read_until(expected=b';')
-                    else:
-                        response = serial_port.read_until(terminator=b';')
-                        
-        except Exception as e:
-            raise OSError('Error during serial port request/response {}, check device connection'.format(device))
-        
-        # decode bytes to string
-        response = response.decode('utf-8')
-        # remove empty byte at the end of some returned values
-        response = response.replace('\x00', '')
+            settings[QDXBase.RADIO_INFO_DICT] = RadioInfo.parse( settings[QDXBase.RADIO_INFO] )
+        except (KeyError, TypeError, ValueError):
+            pass
 
-        if self._debug:
-            print( 'RX: {}\n'.format(response) )
-        
-        # command was not understood
-        if response == '?;':
-            return None
-            
-        # remove leading command and trailing semicolon
-        response = response[2:-1]
-        return response
+        with self._settings_lock:
+            for cmd, value in settings.items():
+                if cmd in QDXBase.VALID_COMMANDS and cmd not in self.settings:
+                    self.settings.store(cmd, value, timestamp)
+                    self._stale.add(cmd)
 
-    def _get(self, cmd, device=None):
-        '''Low level *get* operation handling.
+        return True
 
-        Args:
-            cmd (str): Command to get value for
-            device (str): Windows COM port (ex. 'COM42') or Unix serial device path (ex. '/dev/ttyACM0'), defaults to None
+    def _volatile_sync_commands(self):
+        '''Get commands to read when refreshing volatile local settings.
 
-        Returns:
-            int: Command value
+        The firmware version is included to detect firmware updates since the settings snapshot was saved.
 
-        Other value types may be returned in the case of custom command handling (ex. dict)
+        Returns:
+            list: Command strings
         '''
-        if cmd not in QDX.GET_COMMANDS:
-            return None
+        cmds = QDXBase.VOLATILE_COMMANDS + [QDXBase.VERSION]
 
-        # handle custom command variants with leading underscore
-        # same command, different response handling (ex. parse to dict)
-        original_cmd = cmd
-        cmd = cmd.replace('_', '')
-        
-        request = '{};'.format(cmd)
-        response = self._serial_request(request, device)
+        if self.supported_commands is not None:
+            cmds = [cmd for cmd in cmds if cmd in self.supported_commands]
 
-        if response is None:
-            return None
+        return cmds
 
-        # type conversion
-        if response == '':
-            return None
-        elif response.replace('-', '', 1).isnumeric():
-            # handle negative sign in string
-             value = int(response)
-        elif '.' in response and response.replace('.', '', 1).replace('-', '', 1).isnumeric():
-            # handle decimal point and negative sign in string
-            value = float(response)
-        else:
-            value = response.strip()
-
-        if original_cmd == QDX.RADIO_INFO_DICT:
-            value = value.split('     ')
-
-            value = {
-                'vfo_freq': int(value[0]),
-                'rit_offset': int(value[1][0:4]),
-                'rit': bool(int(value[1][5])),
-                'xit': bool(int(value[1][6])),
-                'memory_bank': int(value[1][7]),
-                'memory_channel': int(value[1][8:9]),
-                'tx': bool(int(value[1][10])),
-                'rx': not(bool(int(value[1][10]))),
-                'mode': list(['USB', 'LSB', 'USB', 'USB'])[int(value[1][11])], # use value as list index
-                'rx_vfo': list(['A', 'B'])[int(value[1][12])], # use value as list index
-                'scan': bool(int(value[1][13])),
-                'split': bool(int(value[1][14])),
-                'tone': int(value[1][15]),
-                'tone_number': int(value[1][16])
-            }
-
-        elif original_cmd == QDX.VERSION:
-            value = float( value.replace('_', '.') )
-        
-        return value
+    def _check_verify_mode(self, verify):
+        '''Validate a write mode.
 
-    def _set(self, cmd, value):
-        '''Low level *set* operation handling.
+        Args:
+            verify (str): QDXBase.VERIFY_NOW, QDXBase.VERIFY_NONE, or QDXBase.VERIFY_DEFERRED
+
+        Raises:
+            ValueError: Invalid write mode
+        '''
+        if verify not in (QDXBase.VERIFY_NOW, QDXBase.VERIFY_NONE, QDXBase.VERIFY_DEFERRED):
+            raise ValueError('Invalid write mode: {}'.format(verify))
+
+    def _assume_settings(self, settings):
+        '''Update local settings with values written without read back.
 
         Args:
-            cmd (str): Command to get value for
-            value (int): Command value to set
+            settings (dict): Map of commands to command values
         '''
-        if cmd not in QDX.SET_COMMANDS:
-            return None
-        
-        # handle custom command variants with leading underscore
-        # same command, different response handling (ex. parse to dict)
-        original_cmd = cmd
-        cmd = cmd.replace('_', '')
+        self._update_settings( {cmd: QDXBase.COMMAND_SPECS[cmd].validate(value) for cmd, value in settings.items() if cmd in QDXBase.GETTABLE_COMMANDS} )
+
+    def _verification_error(self, settings, results):
+        '''Compare values read back from the QDX to the values set.
+
+        Args:
+            settings (dict): Map of commands to command values set
+            results (dict): Map of commands to command values or exceptions read back (see `QDXBase._batch_results`)
+
+        Returns:
+            qdxcat.QDXVerifyError: Verification error, or None if all gettable values match
+        '''
+        failed = {}
+
+        for cmd, value in settings.items():
+            if cmd not in QDXBase.GETTABLE_COMMANDS:
+                continue
+
+            actual = results.get(cmd)
+
+            if isinstance(actual, Exception) or actual != int(value):
+                failed[cmd] = (int(value), actual)
+
+        if len(failed) == 0:
+            return None
+
+        return QDXVerifyError(failed)
+
+    def _resolve_verifications(self, pending, results):
+        '''Resolve deferred verification futures.
+
+        Args:
+            pending (list): (settings, future, callback) tuples, see `QDX.set`
+            results (dict): Map of commands to command values or exceptions read back (see `QDXBase._batch_results`)
+        '''
+        for settings, future, callback in pending:
+            # cancelled by the caller
+            if future.done():
+                continue
+
+            error = self._verification_error(settings, results)
+
+            if error is None:
+                values = [results[cmd] for cmd in settings if cmd in results]
+                future.set_result(values[0] if len(values) > 0 else None)
+                continue
+
+            future.set_exception(error)
+
+            if callback is not None:
+                callback(error)
+
+    def _invalidate(self, cmd):
+        '''Invalidate a local setting and its dependent local settings.
+
+        Invalidated local settings are re-read from the QDX on the next *get*.
+
+        Args:
+            cmd (str): Command string
+        '''
+        with self._settings_lock:
+            for invalid_cmd in [cmd] + QDXBase.DEPENDENT_COMMANDS.get(cmd, []):
+                self.settings.expire(invalid_cmd)
+
+    def _sync_commands(self):
+        '''Get commands to read when syncing all local settings.
+
+        Returns:
+            list: Command strings, excluding static commands with known local settings and commands not supported by the QDX firmware
+        '''
+        cmds = [cmd for cmd in QDXBase.COMMANDS if not (cmd in QDXBase.STATIC_COMMANDS and self._is_fresh(cmd))]
+
+        if self.supported_commands is not None:
+            cmds = [cmd for cmd in cmds if cmd in self.supported_commands]
+
+        return cmds
+
+    def _check_supported(self, cmd):
+        '''Check that a command is supported by the QDX firmware.
+
+        Args:
+            cmd (str): Command string
+
+        Raises:
+            qdxcat.QDXCommandError: Command not supported by the QDX firmware version
+        '''
+        if self.supported_commands is not None and cmd not in self.supported_commands:
+            raise QDXCommandError('Command not supported by QDX firmware version {}: {}'.format(self.firmware_version, cmd))
+
+    def _set_capabilities(self, version):
+        '''Set the firmware version and supported commands.
+
+        Args:
+            version (float): Firmware version, or None if unknown (QDX.VERSION requires firmware version 1.05)
+        '''
+        self.firmware_version = version
+        self.supported_commands = supported_commands(version)
+
+    def _device_key(self):
+        '''Get the on-disk cache key for the configured serial port.
+
+        Returns:
+            str: USB serial number, or None if unknown (ex. emulated or non-USB serial port)
+        '''
+        if self._serial_number is False:
+            self._serial_number = None
+
+            for port_info in serial.tools.list_ports.comports():
+                if port_info.device == self._port:
+                    self._serial_number = port_info.serial_number
+                    break
+
+        return self._serial_number
+
+    def _load_capabilities(self):
+        '''Load the firmware version and supported commands from the capability cache.
+
+        Returns:
+            bool: True if a cache entry was found for the device, False otherwise
+        '''
+        key = self._device_key()
+
+        if key is None or self.capability_cache is None:
+            return False
+
+        entry = DiskCache(self.capability_cache).get(key)
+
+        if not isinstance(entry, dict) or 'commands' not in entry:
+            return False
+
+        self.firmware_version = entry.get('firmware')
+        self.supported_commands = frozenset( [cmd for cmd in entry['commands'] if cmd in QDXBase.VALID_COMMANDS] )
+        return True
+
+    def _save_capabilities(self):
+        '''Save the firmware version and supported commands to the capability cache.'''
+        key = self._device_key()
+
+        if key is None or self.capability_cache is None or self.supported_commands is None:
+            return
+
+        DiskCache(self.capability_cache).set(key, {'firmware': self.firmware_version, 'commands': sorted(self.supported_commands)})
+
+    def _verify_capabilities(self):
+        '''Update supported commands if the synced firmware version differs from the negotiated version (ex. after a firmware update).'''
+        version = self.settings.get(QDXBase.VERSION)
+
+        if version is not None and version != self.firmware_version:
+            self._set_capabilities(version)
+            self._save_capabilities()
+
+    def _validate(self, cmd, commands):
+        '''Validate command for a *get* or *set* operation.
+
+        Args:
+            cmd (str): Command to validate
+            commands (list): QDXBase.GET_COMMANDS or QDXBase.SET_COMMANDS
+
+        Raises:
+            ValueError: Invalid QDX command (not in QDX.COMMANDS)
+            ValueError: Command is not gettable or settable (not in *commands*)
+            qdxcat.QDXCommandError: Command not supported by the QDX firmware version
+        '''
+        spec = QDXBase.COMMAND_SPECS.get(cmd)
+
+        if spec is None:
+            raise ValueError('Invalid QDX command: {}'.format(cmd))
+
+        if commands is QDXBase.GET_COMMANDS:
+            if not spec.gettable:
+                raise ValueError('Command is not gettable: {}'.format(cmd))
+        elif commands is QDXBase.SET_COMMANDS:
+            if not spec.settable:
+                raise ValueError('Command is not settable: {}'.format(cmd))
+        elif cmd not in commands:
+            raise ValueError('Command is not supported: {}'.format(cmd))
+
+        self._check_supported(cmd)
+
+    def _discovered_ports(self, ports):
+        '''Split candidate serial ports by process-wide discovery cache status.
+
+        Args:
+            ports (list): Candidate serial ports (see `QDXBase._candidate_ports`)
+
+        Returns:
+            tuple: (list of ports previously identified as QDX devices, list of ports to probe)
+        '''
+        with QDXBase._discovery_lock:
+            known = [port for port in ports if QDXBase._discovery_key(port) in QDXBase._discovery]
+
+        return known, [port for port in ports if port not in known]
+
+    def _cache_discovery(self, ports):
+        '''Add serial ports identified as QDX devices to the process-wide discovery cache.
+
+        Args:
+            ports (list): Serial ports connected to QDX devices
+        '''
+        with QDXBase._discovery_lock:
+            QDXBase._discovery.update( {QDXBase._discovery_key(port): port.device for port in ports} )
+
+    @staticmethod
+    def _discovery_key(port):
+        '''Get the discovery cache key for a serial port.
+
+        Args:
+            port (serial.tools.list_ports_common.ListPortInfo): Serial port
+
+        Returns:
+            tuple: (device, description, USB serial number)
+        '''
+        return (port.device, port.description, port.serial_number)
+
+    @staticmethod
+    def clear_discovery_cache():
+        '''Forget QDX devices discovered by all QDX objects in this process, so the next discovery probes all candidate serial ports.'''
+        with QDXBase._discovery_lock:
+            QDXBase._discovery.clear()
+
+    def _candidate_ports(self):
+        '''List serial ports with a QDX device description.
+
+        Returns:
+            list: serial.tools.list_ports_common.ListPortInfo objects for candidate serial ports
+        '''
+        # linux port description: 'QDX Transceiver'
+        # windows port description: 'USB Serial Device (COMx)'
+
+        # try linux description
+        ports = list( serial.tools.list_ports.grep('QDX Transceiver') )
+
+        if len(ports) == 0:
+            # try windows description
+            ports = list( serial.tools.list_ports.grep('USB Serial Device') )
+
+        return ports
+
+    def _get_request(self, cmd):
+        '''Format a *get* request.
+
+        Custom command variants with a leading underscore use the same request as the base command.
+
+        Args:
+            cmd (str): Command to get value for
+
+        Returns:
+            str: Request string (ex. 'FA;')
+        '''
+        return QDXBase.COMMAND_SPECS[cmd].get_request
+
+    def _set_request(self, cmd, value):
+        '''Format a *set* request.
+
+        Args:
+            cmd (str): Command to set value for
+            value (int): Command value to set
+
+        Returns:
+            str: Request string (ex. 'FA7078000;')
+
+        Raises:
+            ValueError: Value is not an integer, not a valid option, or out of range (see `qdxcat.commands.CommandSpec.validate`)
+        '''
+        return QDXBase.COMMAND_SPECS[cmd].encode(value)
+
+    def _match_responses(self, requests, responses):
+        '''Match concatenated batch responses to *get* requests.
+
+        Responses are matched to requests by command. Requests that are not understood by the QDX (`?;` response) are matched in order, and requests without a response are reported as timeouts.
+
+        Args:
+            requests (list): List of *get* requests (ex. `['FA;', 'MD;']`)
+            responses (list): Response strings including leading command and trailing semicolon
+
+        Returns:
+            list: Response values (*str*) or exceptions (qdxcat.QDXTimeoutError or qdxcat.QDXCommandError) in the same order as *requests*
+        '''
+        codes = [request[:2] for request in requests]
+        results = [None] * len(requests)
+        index = 0
+
+        for response in responses:
+            if index >= len(requests):
+                break
+
+            if response == '?;':
+                results[index] = QDXCommandError('Command not understood by QDX: {}'.format(requests[index]))
+                index += 1
+                continue
+
+            # skip over requests that did not receive a response
+            try:
+                match = codes.index(response[:2], index)
+            except ValueError:
+                # unexpected response
+                continue
+
+            for skipped in range(index, match):
+                results[skipped] = QDXTimeoutError('No response from QDX: {}'.format(requests[skipped]))
+
+            # remove leading command and trailing semicolon
+            results[match] = response[2:-1]
+            index = match + 1
+
+        for skipped in range(index, len(requests)):
+            results[skipped] = QDXTimeoutError('No response from QDX before timeout ({} sec): {}'.format(self._timeout, requests[skipped]))
+
+        return results
+
+    def _single_response(self, request, responses):
+        '''Extract the response value for a single request.
+
+        Args:
+            request (str): Request string
+            responses (list): Response strings including leading command and trailing semicolon
+
+        Returns:
+            str: Response value without leading command and trailing semicolon
+
+        Raises:
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        if len(responses) == 0:
+            raise QDXTimeoutError('No response from QDX before timeout ({} sec): {}'.format(self._timeout, request))
+
+        response = responses[0]
+        
+        # command was not understood
+        if response == '?;':
+            raise QDXCommandError('Command not understood by QDX: {}'.format(request))
+            
+        # remove leading command and trailing semicolon
+        return response[2:-1]
+
+    def _decode_responses(self, responses):
+        '''Decode raw responses.
+
+        Args:
+            responses (list): Raw *bytes* responses
+
+        Returns:
+            list: Response strings
+        '''
+        # decode bytes to string
+        # remove empty byte at the end of some returned values
+        responses = [response.decode('utf-8').replace('\x00', '') for response in responses]
+
+        if self._debug and len(responses) > 0:
+            print( 'RX: {}\n'.format(''.join(responses)) )
+
+        return responses
+
+    def _batch_requests(self, cmds):
+        '''Format unique *get* requests for a batch of commands.
+
+        Custom command variants share a single request with their base command (ex. QDXBase.RADIO_INFO and QDXBase.RADIO_INFO_DICT). Commands that are not gettable are skipped.
+
+        Args:
+            cmds (list): Commands to get values for
+
+        Returns:
+            list: Unique request strings
+        '''
+        requests = []
+
+        for cmd in cmds:
+            if cmd not in QDXBase.GETTABLE_COMMANDS:
+                continue
+
+            request = self._get_request(cmd)
+
+            if request not in requests:
+                requests.append(request)
+
+        return requests
+
+    def _batch_results(self, cmds, responses):
+        '''Convert batch responses to command values.
+
+        If the batch includes a QDX.RADIO_INFO request, values for QDXBase.STATUS_COMMANDS that were not requested directly are included in the results (see `QDXBase._status_settings`).
+
+        Malformed responses are reported per command, like responses that are not understood by the QDX, so one bad response does not fail the whole batch.
+
+        Args:
+            cmds (list): Commands to get values for
+            responses (dict): Map of request strings to response values or exceptions (see `QDXBase._match_responses`)
+
+        Returns:
+            dict: Map of commands to command values, or to exceptions (qdxcat.QDXTimeoutError or qdxcat.QDXCommandError) for failed commands
+        '''
+        results = {}
+
+        for cmd in cmds:
+            if cmd not in QDXBase.GETTABLE_COMMANDS:
+                results[cmd] = None
+                continue
+
+            response = responses[self._get_request(cmd)]
+
+            if isinstance(response, Exception):
+                results[cmd] = response
+                continue
+
+            try:
+                results[cmd] = self._parse_response(cmd, response)
+            except ValueError as e:
+                results[cmd] = QDXCommandError('Invalid response to {}: {}'.format(cmd, e))
+
+        response = responses.get( self._get_request(QDXBase.RADIO_INFO) )
+
+        if response is not None and not isinstance(response, Exception):
+            try:
+                status = self._status_settings(response)
+            except ValueError as e:
+                error = QDXCommandError('Invalid response to {}: {}'.format(QDXBase.RADIO_INFO, e))
+
+                # other status commands requested directly have their own responses
+                for cmd in (QDXBase.RADIO_INFO, QDXBase.RADIO_INFO_DICT):
+                    if cmd in results:
+                        results[cmd] = error
+            else:
+                for cmd, value in status.items():
+                    results.setdefault(cmd, value)
+
+        return results
+
+    def _store_results(self, results):
+        '''Update local settings from batch results.
+
+        Args:
+            results (dict): Map of commands to command values or exceptions (see `QDXBase._batch_results`)
+
+        Returns:
+            list: Exceptions for failed commands
+        '''
+        self._update_settings( {cmd: value for cmd, value in results.items() if not isinstance(value, Exception)} )
+        return [value for value in results.values() if isinstance(value, Exception)]
+
+    def _status_settings(self, response):
+        '''Get local settings derived from a QDX.RADIO_INFO response.
+
+        Args:
+            response (str): Response value without leading command and trailing semicolon
+
+        Returns:
+            dict: Map of commands to command values, including QDX.RADIO_INFO, QDX.RADIO_INFO_DICT, and QDXBase.STATUS_COMMANDS
+        '''
+        info = RadioInfo.parse(response)
+        # vfo frequency is the frequency of the receive vfo
+        vfo_cmd = QDXBase.VFO_A if info.raw('rx_vfo') == 0 else QDXBase.VFO_B
+
+        return {
+            QDXBase.RADIO_INFO: self._parse_response(QDXBase.RADIO_INFO, response),
+            QDXBase.RADIO_INFO_DICT: info,
+            vfo_cmd: info.raw('vfo_freq'),
+            QDXBase.TX_STATE: info.raw('tx'),
+            QDXBase.OPERATING_MODE: info.raw('mode'),
+            QDXBase.SPLIT_MODE: info.raw('split'),
+            QDXBase.RIT_STATUS: info.raw('rit')
+        }
+
+    def _status_fresh(self, max_age=None):
+        '''Whether all local settings derived from a QDX.RADIO_INFO response are fresh.
+
+        Args:
+            max_age (float): Maximum local setting age in seconds, defaults to None (use the command time-to-live, see *cache_ttl*)
+
+        Returns:
+            bool: True if all status local settings are known and not expired, False otherwise
+        '''
+        return all( [self._is_fresh(cmd, max_age) for cmd in [QDXBase.RADIO_INFO_DICT] + QDXBase.STATUS_COMMANDS] )
+
+    def _status(self):
+        '''Get status local settings.
+
+        Returns:
+            dict: Map of QDXBase.STATUS_COMMANDS and QDX.RADIO_INFO_DICT to local settings
+        '''
+        return {cmd: self.settings.get(cmd) for cmd in QDXBase.STATUS_COMMANDS + [QDXBase.RADIO_INFO_DICT]}
+
+    def _update_instrumented(self):
+        '''Update the instrumentation flag checked on each serial transaction.'''
+        self._instrumented = self.metrics is not None or len(self._request_hooks) > 0 or len(self._response_hooks) > 0
+
+    def _io_start(self, request):
+        '''Start instrumentation of a serial transaction.
+
+        Args:
+            request (str): One or more concatenated requests
+
+        Returns:
+            float: Transaction start time (*time.perf_counter()*)
+        '''
+        for hook in self._request_hooks:
+            hook(request)
+
+        return time.perf_counter()
+
+    def _io_end(self, request, count, responses, start, error=None):
+        '''Record an instrumented serial transaction.
+
+        Args:
+            request (str): One or more concatenated requests
+            count (int): Number of expected responses
+            responses (list): Response strings, None if *error* occurred
+            start (float): Transaction start time returned by *_io_start()*
+            error (Exception): Exception raised by the transaction, defaults to None
+        '''
+        elapsed = time.perf_counter() - start
+
+        if self.metrics is not None:
+            self.metrics.record(request, count, responses, elapsed, error)
+
+        for hook in self._response_hooks:
+            hook(request, responses, elapsed, error)
+
+    def _transact(self, serial_port, request, count=1):
+        '''Write request and read responses on an open serial port.
+
+        Args:
+            serial_port (serial.Serial): Open serial port
+            request (bytes): Encoded request
+            count (int): Number of expected responses, defaults to 1
+
+        Returns:
+            list: Raw responses, empty if *count* is zero
+        '''
+        # discard stale data (ex. unread error response to a previous set request)
+        if serial_port.in_waiting:
+            serial_port.reset_input_buffer()
+
+        serial_port.write(request)
+
+        if count == 0:
+            return []
+
+        return self._read_responses(serial_port, count)
+
+    def _read_responses(self, serial_port, count=1):
+        '''Read responses from an open serial port.
+
+        Returns as soon as *count* `;` terminators are received. The configured timeout is applied as a deadline for all responses.
+
+        Args:
+            serial_port (serial.Serial): Open serial port
+            count (int): Number of expected responses, defaults to 1
+
+        Returns:
+            list: Raw responses including the trailing semicolon, may be shorter than *count* if the timeout expired
+        '''
+        deadline = time.monotonic() + self._timeout
+        buffer = b''
+
+        # restore the configured timeout if shortened by a previous read
+        if serial_port.timeout != self._timeout:
+            serial_port.timeout = self._timeout
+
+        while True:
+            # block until at least one byte is received, then read everything available
+            buffer += serial_port.read(serial_port.in_waiting or 1)
+
+            if buffer.count(b';') >= count:
+                break
+
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                break
+
+            # limit the next read to the time remaining before the deadline
+            if serial_port.timeout is None or serial_port.timeout > remaining:
+                serial_port.timeout = remaining
+
+        # drop incomplete trailing response
+        return [response + b';' for response in buffer.split(b';')[:-1]]
+
+    def _parse_response(self, cmd, response):
+        '''Convert a response string to a command value.
+
+        Args:
+            cmd (str): Command associated with the response
+            response (str): Response value without leading command and trailing semicolon
+
+        Returns:
+            int: Command value
+
+        Other value types may be returned in the case of custom command handling (ex. `qdxcat.state.RadioInfo` for QDX.RADIO_INFO_DICT)
+        '''
+        if response == '':
+            return None
+
+        if cmd == QDXBase.RADIO_INFO_DICT:
+            return RadioInfo.parse(response)
+
+        spec = QDXBase.COMMAND_SPECS.get(cmd)
+
+        if spec is None:
+            return decode_value(response)
+
+        return spec.decode(response)
+
+
+class QDX(QDXBase):
+    '''QDX transceiver control object.
+
+    All serial traffic on the configured serial port is processed by a single worker thread in priority order (see `qdxcat.worker.SerialWorker`). PTT requests are processed first, followed by frequency requests, other requests, and finally bulk settings sync requests.
+    
+    See `qdxcat.QDXBase` for command constants and attributes.
+    '''
+
+    PRIORITY_PTT = 0
+    '''Request priority for PTT commands (QDX.TX_STATE, QDX.TX_MODE, QDX.RX_MODE)'''
+    PRIORITY_FREQ = 1
+    '''Request priority for frequency commands (QDX.VFO_A, QDX.VFO_B)'''
+    PRIORITY_DEFAULT = 5
+    '''Request priority for all other commands'''
+    PRIORITY_BULK = 9
+    '''Request priority for bulk settings sync'''
+
+    def __init__(self, port=None, baudrate=9600, timeout=1, autodetect=True, persistent=False, transport=None, lazy=False):
+        '''Initialize QDX instance object.
+
+        If *lazy* is True no serial port I/O is performed. The serial port is set (and auto-detected if *port* is not specified) on first use, or in the background when `QDX.connect` is called.
+
+        Args:
+            port (str): Windows COM port (ex. 'COM42') or Unix serial device path (ex. '/dev/ttyACM0'), defaults to None
+            baudrate (int): Serial port baudrate, defaults to 9600
+            timeout (int): Serial port timeout in seconds, defaults to 1
+            autodetect (bool): Whether to auto-detect QDX device serial port, defaults to True
+            persistent (bool): Whether to keep the serial port open between requests, defaults to False
+            transport (callable): Serial port factory (see `qdxcat.transport`), defaults to None (`serial.Serial`)
+            lazy (bool): Whether to defer serial port detection and connection until first use, defaults to False
+
+        Returns:
+            qdxcat.QDX: Constructed QDX object
+        '''
+        super().__init__(baudrate, timeout, transport)
+
+        # persistent serial connection
+        self._persistent = persistent
+        self._serial_port = None
+        self._serial_lock = threading.RLock()
+
+        # serial port I/O thread
+        self._worker = SerialWorker()
+
+        # guards deferred write verification state
+        self._verify_lock = threading.Lock()
+
+        self.ptt = PTTEngine(self)
+        '''
+        Low latency PTT engine (see `qdxcat.ptt.PTTEngine`), used by *ptt_on()* and *ptt_off()*.
+        '''
+
+        # deferred connection, see connect()
+        self._lazy_port = port
+        self._connect_pending = lazy and (port is not None or autodetect)
+        self._connect_future = None
+        self._connect_lock = threading.Lock()
+
+        if lazy:
+            pass
+        elif port is not None:
+            self.set_port(port, baudrate, timeout)
+        elif autodetect:
+            self.autodetect()
+
+    def connect(self, sync=True):
+        '''Set the serial port in a background thread, auto-detecting the QDX device if no serial port was specified.
+
+        Repeated calls return the same future until the connection fails. Use `asyncio.wrap_future` to await the result.
+
+        Args:
+            sync (bool): Whether to sync local settings to transceiver settings after connecting (see `QDX.set_port`), defaults to True
+
+        Returns:
+            concurrent.futures.Future: Future resolved with the serial port, or the exception raised while connecting
+        '''
+        with self._connect_lock:
+            future = self._connect_future
+
+            if future is not None and not (future.done() and future.exception() is not None):
+                return future
+
+            future = concurrent.futures.Future()
+            self._connect_future = future
+
+        thread = threading.Thread(target=self._connect, args=(future, sync), name='qdxcat-connect')
+        thread.daemon = True
+        thread.start()
+        return future
+
+    def _connect(self, future, sync=True):
+        '''Connection thread, see `QDX.connect`.
+
+        Args:
+            future (concurrent.futures.Future): Future resolved with the serial port
+            sync (bool): Whether to sync local settings to transceiver settings after connecting
+        '''
+        try:
+            if self._port is None:
+                if self._lazy_port is not None:
+                    self.set_port(self._lazy_port, self._baudrate, self._timeout, sync)
+                else:
+                    self.autodetect(sync)
+
+            future.set_result(self._port)
+        except Exception as e:
+            future.set_exception(e)
+
+    def autodetect(self, sync=True):
+        '''Auto-detect QDX device serial port.
+
+        All candidate serial ports are probed concurrently. Serial ports identified as QDX devices are cached for the life of the process (see `QDXBase.clear_discovery_cache`).
+
+        Args:
+            sync (bool): Whether to sync local settings to transceiver settings (see `QDX.set_port`), defaults to True
+
+        Raises:
+            OSError: QDX device not found
+            OSError: Multiple QDX devices found (see `qdxcat.pool.QDXPool` to use multiple QDX devices)
+        '''
+        ports = self.detect_ports()
+
+        if len(ports) == 0:
+            # no matching device description on linux or windows
+            raise IOError('QDX device not found, check device connection or specifiy a serial port')
+
+        if len(ports) > 1:
+            devices = ', '.join( [port.name for port in ports] )
+            raise IOError('Multiple QDX devices found, try specifying a serial port: {}'.format(devices))
+        
+        self.set_port(ports[0].device, self._baudrate, self._timeout, sync)
+
+    def detect_ports(self, refresh=False):
+        '''Detect serial ports connected to QDX devices.
+
+        All candidate serial ports are probed concurrently, so the total detection time is limited to a single serial port timeout. Serial ports previously identified as QDX devices by any QDX object in this process are not probed again.
+
+        Args:
+            refresh (bool): Whether to probe all candidate serial ports, ignoring the discovery cache, defaults to False
+
+        Returns:
+            list: serial.tools.list_ports_common.ListPortInfo objects for serial ports connected to QDX devices
+        '''
+        ports = self._candidate_ports()
+        known, probe = ([], ports) if refresh else self._discovered_ports(ports)
+
+        if len(probe) > 0:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(probe)) as executor:
+                results = list( executor.map(self._probe, [port.device for port in probe]) )
+
+            detected = [port for port, is_qdx in zip(probe, results) if is_qdx]
+            self._cache_discovery(detected)
+            known += detected
+
+        return [port for port in ports if port in known]
+
+    def set_port(self, port, baudrate=9600, timeout=1, sync=True):
+        '''Set QDX device serial port.
+
+        Args:
+            port (str): Windows COM port (ex. 'COM42') or Unix serial device path (ex. '/dev/ttyACM0')
+            baudrate (int): Serial port baudrate, defaults to 9600
+            timeout (int): Serial port timeout in seconds, defaults to 1
+            sync (bool): Whether to sync local settings to transceiver settings, defaults to True (only volatile settings if a settings snapshot is loaded, see *settings_cache*)
+        '''
+        if port is None:
+            return
+
+        self._connect_pending = False
+            
+        with self._serial_lock:
+            # close any connection to the previous port
+            self._close_serial_port()
+
+            if port != self._port:
+                # capabilities are negotiated per device
+                self._serial_number = False
+                self.firmware_version = None
+                self.supported_commands = None
+
+            self._port = port
+            self._baudrate = baudrate
+            self._timeout = timeout
+
+            if self._persistent:
+                self._open_serial_port()
+
+        # settings from a previous session are available immediately
+        loaded = self._load_settings()
+
+        if sync:
+            # minimize delay at startup by using a thread
+            thread = threading.Thread(target=self.sync_volatile_settings if loaded else self.sync_local_settings)
+            thread.daemon = True
+            thread.start()
+
+    def open(self):
+        '''Open a persistent serial connection.
+
+        The serial port remains open and is reused by all requests until `QDX.close()` is called. If the connection is lost (ex. USB cable unplugged) the serial port is re-opened automatically on the next request.
+
+        Raises:
+            ValueError: Serial port not specified
+            OSError: Error opening serial port
+        '''
+        with self._serial_lock:
+            self._persistent = True
+            self._open_serial_port()
+
+    def close(self):
+        '''Close the persistent serial connection, save local settings (see *settings_cache*), and stop the worker thread.
+
+        Requests already queued are processed before the worker thread exits. Subsequent requests restart the worker thread, and open and close the serial port for each request.
+        '''
+        with self._serial_lock:
+            self._persistent = False
+            self._close_serial_port()
+
+        self.save_settings()
+        self._worker.stop()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, cmd, update=False, max_age=None):
+        '''Get command value.
+
+        Local settings are used if known and not expired, otherwise the value is read from the QDX.
+
+        Args:
+            cmd (str): Command to get value for
+            update (bool): Update local settings from QDX settings if True, or use local settings if False, defaults to False
+            max_age (float): Maximum local setting age in seconds, defaults to None (use the command time-to-live, see *cache_ttl*)
+
+        Returns:
+            int: Command value
+
+        Raises:
+            ValueError: Invalid QDX command (not in QDX.COMMANDS)
+            ValueError: Command is not settable (not in QDX.GET_COMMANDS)
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        self._validate(cmd, QDX.GET_COMMANDS)
+            
+        if update or not self._is_fresh(cmd, max_age):
+            self.sync_local_setting(cmd)
+            
+        return self.settings[cmd]
+
+    def set(self, cmd, value, verify=QDXBase.VERIFY_NOW, callback=None):
+        '''Set command value.
+
+        Write modes:
+        - `QDX.VERIFY_NOW`: the value is read back from the QDX before returning
+        - `QDX.VERIFY_NONE`: the value is written without read back, and the local setting is updated to the value set
+        - `QDX.VERIFY_DEFERRED`: like `QDX.VERIFY_NONE`, but the value is read back later in a single batch with other deferred verifications, and a future is returned
+        
+        Args:
+            cmd (str): Command to set value for
+            value (int): Command value to set
+            verify (str): Write mode, defaults to `QDX.VERIFY_NOW`
+            callback (callable): Function called with a `qdxcat.QDXVerifyError` (or the exception raised while reading back) if deferred verification fails, defaults to None
+
+        Returns:
+            int: Command value read back, or the value set if the command is not gettable or not verified
+
+            concurrent.futures.Future: if *verify* is `QDX.VERIFY_DEFERRED`, future resolved with the command value read back, None if superseded by a later deferred write of the same command, or the verification exception
+
+        Raises:
+            ValueError: Invalid QDX command (not in QDX.COMMANDS)
+            ValueError: Command is not settable (not in QDX.SET_COMMANDS)
+            ValueError: Invalid write mode
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        self._validate(cmd, QDX.SET_COMMANDS)
+        self._check_verify_mode(verify)
+            
+        self._set(cmd, value)
+        self._invalidate(cmd)
+
+        if verify == QDX.VERIFY_NOW:
+            if cmd not in QDX.GETTABLE_COMMANDS:
+                return value
+
+            return self.get(cmd, update=True)
+
+        self._assume_settings({cmd: value})
+
+        if verify == QDX.VERIFY_NONE:
+            return value
+
+        future = self._defer_verification({cmd: value}, callback)
+        return future
+
+    def transaction(self, settings, rollback=True):
+        '''Apply multiple settings as a single verified transaction.
+
+        Current values are read, all settings are written in one pipelined request, and all values are read back in a single verification pass. If any value read back does not match, the previous values are restored in one pipelined request.
+
+        The transaction is processed by the worker thread without interleaving other serial requests.
+
+        Example:
+        ```
+        qdx.transaction({qdx.SIDEBAND: 0, qdx.VOX_EN: 1, qdx.TX_RISE: 10, qdx.TX_FALL: 10, qdx.CAT_TIMEOUT: 5})
+        ```
+
+        Args:
+            settings (dict): Map of commands to command values
+            rollback (bool): Whether to restore previous values if verification fails, defaults to True
+
+        Returns:
+            dict: Map of gettable commands to command values read back
+
+        Raises:
+            ValueError: Invalid QDX command (not in QDX.COMMANDS)
+            ValueError: Command is not settable (not in QDX.SET_COMMANDS)
+            ValueError: Invalid command value (see `qdxcat.commands.CommandSpec.validate`)
+            qdxcat.QDXVerifyError: Values read back do not match, *rolled_back* attribute indicates whether previous values were restored
+            qdxcat.QDXTimeoutError: No response received before timeout
+        '''
+        for cmd in settings:
+            self._validate(cmd, QDX.SET_COMMANDS)
+
+        # encode all requests first, invalid values raise before any serial I/O
+        request = ''.join( [self._set_request(cmd, value) for cmd, value in settings.items()] )
+
+        if len(settings) == 0:
+            return {}
+
+        return self._worker.call(self._transaction, settings, request, rollback, priority=QDX.PRIORITY_DEFAULT)
+
+    def get_many(self, cmds, update=False, max_age=None):
+        '''Get multiple command values in a single pipelined transaction.
+
+        Args:
+            cmds (list): Commands to get values for
+            update (bool): Update local settings from QDX settings if True, or use local settings if False, defaults to False
+            max_age (float): Maximum local setting age in seconds, defaults to None (use the command time-to-live, see *cache_ttl*)
+
+        Returns:
+            dict: Map of commands to command values
+
+        Raises:
+            ValueError: Invalid QDX command (not in QDX.COMMANDS)
+            ValueError: Command is not gettable (not in QDX.GET_COMMANDS)
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        for cmd in cmds:
+            self._validate(cmd, QDX.GET_COMMANDS)
+
+        pending = [cmd for cmd in cmds if update or not self._is_fresh(cmd, max_age)]
+
+        if len(pending) > 0:
+            errors = self._store_results( self._get_many(pending) )
+
+            if len(errors) > 0:
+                raise errors[0]
+
+        return {cmd: self.settings[cmd] for cmd in cmds}
+
+    def set_many(self, settings):
+        '''Set multiple command values in a single pipelined transaction.
+
+        All *set* requests are written back-to-back, then all values are read back in a single batch.
+
+        Args:
+            settings (dict): Map of commands to command values
+
+        Returns:
+            dict: Map of commands to command values
+
+        Raises:
+            ValueError: Invalid QDX command (not in QDX.COMMANDS)
+            ValueError: Command is not settable (not in QDX.SET_COMMANDS)
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        for cmd in settings:
+            self._validate(cmd, QDX.SET_COMMANDS)
+
+        if len(settings) == 0:
+            return {}
+
+        request = ''.join( [self._set_request(cmd, value) for cmd, value in settings.items()] )
+        self._serial_request(request, response=False)
+
+        for cmd in settings:
+            self._invalidate(cmd)
+
+        # not all settable commands are gettable (ex. QDX.TX_MODE)
+        return self.get_many([cmd for cmd in settings if cmd in QDX.GETTABLE_COMMANDS], update=True)
+
+    def sync_local_setting(self, cmd):
+        '''Sync local setting with transceiver setting.
+
+        Args:
+            cmd (str): Command to sync
+
+        Raises:
+            ValueError: Invalid QDX command (not in QDX.COMMANDS)
+            ValueError: Error processing command
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        if cmd not in QDX.VALID_COMMANDS:
+            raise ValueError('Invalid QDX command: {}'.format(cmd))
+
+        self._check_supported(cmd)
+
+        # batch of one, includes status local settings derived from QDX.RADIO_INFO
+        errors = self._store_results( self._get_many([cmd]) )
+
+        if len(errors) > 0:
+            raise errors[0]
+    
+    def sync_local_settings(self):
+        '''Sync all local settings with transceiver settings.
+
+        Commands are requested in pipelined batches (see `QDX.get_many`) with bulk priority, so other requests are processed between batches. Static commands (see `QDX.STATIC_COMMANDS`) are not re-read once known. Commands not supported by the QDX firmware are skipped (see `QDX.negotiate`). Local settings for commands that are not understood by the QDX or that do not receive a response are set to None.
+        '''
+        if self.supported_commands is None:
+            self.negotiate()
+
+        results = self._get_many(self._sync_commands(), priority=QDX.PRIORITY_BULK)
+        self._update_settings( {cmd: (None if isinstance(value, Exception) else value) for cmd, value in results.items()} )
+        self._verify_capabilities()
+        self.save_settings()
+
+    def sync_volatile_settings(self):
+        '''Sync volatile local settings with transceiver settings.
+
+        Only `QDX.VOLATILE_COMMANDS` and the firmware version are requested, in pipelined batches with bulk priority. If the firmware version changed since capabilities were negotiated (ex. firmware update), all local settings are synced.
+        '''
+        if self.supported_commands is None:
+            self.negotiate()
+
+        version = self.firmware_version
+        results = self._get_many(self._volatile_sync_commands(), priority=QDX.PRIORITY_BULK)
+        self._update_settings( {cmd: value for cmd, value in results.items() if not isinstance(value, Exception)} )
+        self._verify_capabilities()
+
+        if self.firmware_version != version:
+            self.sync_local_settings()
+        else:
+            self.save_settings()
+
+    def negotiate(self, refresh=False):
+        '''Determine the commands supported by the QDX firmware.
+
+        The firmware version is read once and the supported commands are computed from per-command minimum firmware versions (see `qdxcat.commands.CommandSpec`). The result is cached on disk by USB serial number (see *capability_cache*), so later starts skip the version request. The cached firmware version is verified by the next *sync_local_settings*.
+
+        Called automatically by *sync_local_settings*. Unsupported commands raise `qdxcat.QDXCommandError` without serial I/O once negotiated.
+
+        Args:
+            refresh (bool): Whether to ignore the capability cache and read the firmware version, defaults to False
+
+        Returns:
+            frozenset: Supported command strings
+
+        Raises:
+            qdxcat.QDXTimeoutError: No response received before timeout
+        '''
+        if not refresh and self._load_capabilities():
+            return self.supported_commands
+
+        try:
+            version = self._get(QDX.VERSION)
+            self._update_settings({QDX.VERSION: version})
+        except QDXCommandError:
+            # firmware older than v1.05
+            version = None
+
+        self._set_capabilities(version)
+        self._save_capabilities()
+        return self.supported_commands
+
+    def get_status(self, max_age=None):
+        '''Get a status snapshot from a single QDX.RADIO_INFO request.
+
+        Local settings for QDX.RADIO_INFO, QDX.RADIO_INFO_DICT, and all commands in `QDX.STATUS_COMMANDS` are updated from one request. Subsequent *get* calls for these commands use the snapshot while it is fresh.
+
+        Args:
+            max_age (float): Maximum snapshot age in seconds, defaults to None (use the command time-to-live, see *cache_ttl*)
+
+        Returns:
+            dict: Map of QDX.STATUS_COMMANDS and QDX.RADIO_INFO_DICT to command values
+
+        Raises:
+            ValueError: Invalid QDX.RADIO_INFO response
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        if not self._status_fresh(max_age):
+            self.sync_local_setting(QDX.RADIO_INFO_DICT)
+
+        return self._status()
+
+    def export_profile(self, name=None, commands=None, max_age=None):
+        '''Export current settings to a configuration profile.
+
+        Args:
+            name (str): Profile name, defaults to None
+            commands (list): Commands to export, defaults to None (QDX.PROFILE_COMMANDS supported by the QDX firmware)
+            max_age (float): Maximum local setting age in seconds, defaults to None (use the command time-to-live)
+
+        Returns:
+            qdxcat.profile.Profile: Exported profile
+
+        Raises:
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        if commands is None:
+            commands = [cmd for cmd in QDX.PROFILE_COMMANDS if self.supported_commands is None or cmd in self.supported_commands]
+
+        return Profile(self.get_many(commands, max_age=max_age), name)
+
+    def apply_profile(self, profile, max_age=None, rollback=True):
+        '''Apply a configuration profile, writing only settings that differ.
+
+        See `qdxcat.profile.Profile.apply`.
+
+        Args:
+            profile (qdxcat.profile.Profile): Profile to apply
+            max_age (float): Maximum local setting age in seconds used to compare settings, defaults to None (use the command time-to-live)
+            rollback (bool): Whether to restore previous values if verification fails, defaults to True
+
+        Returns:
+            dict: Map of commands to (previous value, profile value) tuples for settings written
+        '''
+        return profile.apply(self, max_age, rollback)
+
+    def scan(self, frequencies=None, start=None, stop=None, step=None, dwell=0, commands=None, restore=True):
+        '''Create a frequency sweep over QDX.VFO_A.
+
+        See `qdxcat.scan.Scan` for details. The scan runs when iterated, or when *to_columns()* is called.
+
+        Args:
+            frequencies (list): Frequencies to scan in Hz, defaults to None
+            start (int): First frequency in Hz, defaults to None
+            stop (int): Last frequency in Hz (inclusive), defaults to None
+            step (int): Frequency step in Hz, defaults to None
+            dwell (float): Time in seconds to wait at each frequency before sampling, defaults to 0
+            commands (list): Command strings to sample at each step, defaults to None (QDX.VFO_A)
+            restore (bool): Whether to restore the QDX.VFO_A frequency after the scan, defaults to True
+
+        Returns:
+            qdxcat.scan.Scan: Scan object
+        '''
+        return Scan(self, frequencies, start, stop, step, dwell, commands, restore)
+
+    def start_monitor(self, commands=None, callback=None, min_interval=0.1, max_interval=2, backoff=1.5):
+        '''Start a background setting change monitor.
+
+        See `qdxcat.monitor.Monitor` for details.
+
+        Args:
+            commands (list): Command strings to monitor, defaults to None (QDX.STATUS_COMMANDS)
+            callback (callable): Function called with a `qdxcat.monitor.Change` object for each change, defaults to None
+            min_interval (float): Poll interval in seconds after a change, defaults to 0.1
+            max_interval (float): Maximum poll interval in seconds while nothing changes, defaults to 2
+            backoff (float): Poll interval multiplier applied after each poll without changes, defaults to 1.5
+
+        Returns:
+            qdxcat.monitor.Monitor: Running monitor object
+        '''
+        monitor = Monitor(self, commands, min_interval, max_interval, backoff)
+
+        if callback is not None:
+            monitor.subscribe(callback)
+
+        monitor.start()
+        return monitor
+
+    def start_telemetry(self, commands=None, capacity=86400, interval=1, downsample=1):
+        '''Start a background telemetry recorder.
+
+        See `qdxcat.telemetry.Telemetry` for details.
+
+        Args:
+            commands (list): Command strings to sample, defaults to None (QDX.VFO_A, QDX.TX_STATE, and QDX.RADIO_INFO_DICT)
+            capacity (int): Maximum number of stored samples per column, defaults to 86400
+            interval (float): Sample interval in seconds, defaults to 1
+            downsample (int): Number of samples aggregated into each stored sample, defaults to 1 (no downsampling)
+
+        Returns:
+            qdxcat.telemetry.Telemetry: Running telemetry object
+        '''
+        telemetry = Telemetry(self, commands, capacity, interval, downsample)
+        telemetry.start()
+        return telemetry
+
+    def submit_get(self, cmd, update=False):
+        '''Queue a *get* operation without waiting for the result.
+
+        Args:
+            cmd (str): Command to get value for
+            update (bool): Update local settings from QDX settings if True, or use local settings if False, defaults to False
+
+        Returns:
+            concurrent.futures.Future: Future resolved with the command value, or the exception raised by `QDX.get`
+        '''
+        return self._worker.submit(self.get, cmd, update, priority=self._command_priority(cmd))
+
+    def submit_set(self, cmd, value):
+        '''Queue a *set* operation without waiting for the result.
+
+        Args:
+            cmd (str): Command to set value for
+            value (int): Command value to set
+
+        Returns:
+            concurrent.futures.Future: Future resolved with the command value, or the exception raised by `QDX.set`
+        '''
+        return self._worker.submit(self.set, cmd, value, priority=self._command_priority(cmd))
+
+    def ptt_on(self):
+        '''Set PTT to transmit state.
+
+        The PTT state is verified in the background, see `qdxcat.ptt.PTTEngine`.
+        '''
+        self.ptt.key_up()
+                          
+    def ptt_off(self):
+        '''Set PTT to receive state.
+
+        The PTT state is verified in the background, see `qdxcat.ptt.PTTEngine`.
+        '''
+        self.ptt.key_down()
+        
+    def toggle_ptt(self):
+        '''Toggle PTT state.'''
+        if self.get(QDX.TX_STATE) == 0:
+            self.ptt_on()
+        else:
+            self.ptt_off()
+    
+    def _transaction(self, settings, request, rollback=True):
+        '''Process a verified transaction, called on the worker thread (see `QDX.transaction`).
+
+        Args:
+            settings (dict): Map of commands to command values
+            request (str): Concatenated *set* requests
+            rollback (bool): Whether to restore previous values if verification fails, defaults to True
+
+        Returns:
+            dict: Map of gettable commands to command values read back
+
+        Raises:
+            qdxcat.QDXVerifyError: Values read back do not match
+        '''
+        cmds = [cmd for cmd in settings if cmd in QDX.GETTABLE_COMMANDS]
+        previous = {}
+
+        if rollback and len(cmds) > 0:
+            previous = {cmd: value for cmd, value in self._get_many(cmds).items() if not isinstance(value, Exception) and value is not None}
+
+        self._serial_request(request, response=False)
+
+        for cmd in settings:
+            self._invalidate(cmd)
+
+        results = self._get_many(cmds)
+        self._store_results(results)
+        error = self._verification_error(settings, results)
+
+        if error is None:
+            return {cmd: results[cmd] for cmd in cmds}
+
+        if len(previous) > 0:
+            self._serial_request( ''.join([self._set_request(cmd, value) for cmd, value in previous.items()]), response=False )
+
+            for cmd in previous:
+                self._invalidate(cmd)
+
+            error.rolled_back = True
+
+        raise error
+
+    def _defer_verification(self, settings, callback=None):
+        '''Queue deferred verification of written settings.
+
+        Pending verifications are read back in a single batch by the worker thread at bulk priority. Commands in *settings* are dropped from older pending verifications, since only the latest value written can be read back (ex. PTT keyed down and up again before the batch runs). An older verification left with no commands is resolved with None.
+
+        Args:
+            settings (dict): Map of commands to command values set
+            callback (callable): Function called with the exception if verification fails, defaults to None
+
+        Returns:
+            concurrent.futures.Future: Future resolved with the value read back (the first gettable command in *settings*), None if superseded, or the verification exception
+        '''
+        future = concurrent.futures.Future()
+        superseded = []
+
+        with self._verify_lock:
+            pending = []
+
+            for pending_settings, pending_future, pending_callback in self._pending_verifications:
+                pending_settings = {cmd: value for cmd, value in pending_settings.items() if cmd not in settings}
+
+                if len(pending_settings) > 0:
+                    pending.append( (pending_settings, pending_future, pending_callback) )
+                else:
+                    superseded.append(pending_future)
+
+            pending.append( (settings, future, callback) )
+            self._pending_verifications = pending
+            schedule = not self._verify_scheduled
+            self._verify_scheduled = True
+
+        if schedule:
+            self._worker.submit(self._run_verifications, priority=QDX.PRIORITY_BULK)
+
+        for pending_future in superseded:
+            # cancelled by the caller
+            if not pending_future.done():
+                pending_future.set_result(None)
+
+        return future
+
+    def _run_verifications(self):
+        '''Read back and check all pending deferred verifications, called on the worker thread.'''
+        with self._verify_lock:
+            pending = self._pending_verifications
+            self._pending_verifications = []
+            self._verify_scheduled = False
+
+        cmds = []
+        for settings, future, callback in pending:
+            cmds.extend( [cmd for cmd in settings if cmd in QDX.GETTABLE_COMMANDS and cmd not in cmds] )
+
+        try:
+            results = self._get_many(cmds)
+            self._store_results(results)
+        except Exception as e:
+            results = {cmd: e for cmd in cmds}
+
+        self._resolve_verifications(pending, results)
+
+    def _probe(self, device):
+        '''Check whether a serial port is connected to a QDX.
+
+        Args:
+            device (str): Serial device port *str*
+
+        Returns:
+            bool: True if the device responds with the QDX radio ID, False otherwise
+        '''
+        try:
+            # check QDX radio ID ( int('020') )
+            return self._get(QDX.RADIO_ID, device = device) == 20
+        except Exception as e:
+            # error occurred while getting radio ID, must not be a properly functioning QDX
+            return False
+
+    def _command_priority(self, cmd):
+        '''Get the request priority for a command.
+
+        Args:
+            cmd (str): Command string
+
+        Returns:
+            int: Request priority (see `QDX.PRIORITY_PTT`, `QDX.PRIORITY_FREQ`, and `QDX.PRIORITY_DEFAULT`)
+        '''
+        if cmd in (QDX.TX_STATE, QDX.TX_MODE, QDX.RX_MODE):
+            return QDX.PRIORITY_PTT
+
+        if cmd in (QDX.VFO_A, QDX.VFO_B):
+            return QDX.PRIORITY_FREQ
+
+        return QDX.PRIORITY_DEFAULT
+
+    def _serial_request(self, request, device=None, response=True, priority=None):
+        '''Process serial request and response.
+
+        Args:
+            request (str): Command to get, or command and value to set
+            device (str): Serial device port *str* to use instead of configured port, defaults to None
+            response (bool): Whether to wait for a response, defaults to True (set requests do not generate a response)
+            priority (int): Request priority, defaults to None (priority of the first command in *request*)
+
+        Returns:
+            str: Response value without leading command and trailing semicolon, or None if *response* is False
+
+        Raises:
+            ValueError: Serial port not specified
+            OSError: Error during serial port request/response
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        responses = self._serial_io(request, device, int(response), priority)
+
+        if not response:
+            return None
+
+        return self._single_response(request, responses)
+
+    def _serial_batch(self, requests, device=None, priority=None):
+        '''Process multiple serial *get* requests and responses in a single transaction.
+
+        All requests are written back-to-back, and the concatenated responses are matched to the requests by command. Requests that are not understood by the QDX (`?;` response) are matched in order.
+
+        Args:
+            requests (list): List of *get* requests (ex. `['FA;', 'MD;']`)
+            device (str): Serial device port *str* to use instead of configured port, defaults to None
+            priority (int): Request priority, defaults to None (priority of the first request)
+
+        Returns:
+            list: Response values (*str*) or exceptions (qdxcat.QDXTimeoutError or qdxcat.QDXCommandError) in the same order as *requests*
+
+        Raises:
+            ValueError: Serial port not specified
+            OSError: Error during serial port request/response
+        '''
+        responses = self._serial_io(''.join(requests), device, len(requests), priority)
+        return self._match_responses(requests, responses)
+
+    def _serial_io(self, request, device=None, count=1, priority=None):
+        '''Write a serial request and read the expected number of responses.
+
+        Requests on the configured serial port are processed by the worker thread. Requests on other serial ports (ex. while auto-detecting) are processed on the calling thread.
+
+        Args:
+            request (str): One or more concatenated requests
+            device (str): Serial device port *str* to use instead of configured port, defaults to None
+            count (int): Number of expected responses, defaults to 1
+            priority (int): Request priority, defaults to None (priority of the first command in *request*)
+
+        Returns:
+            list: Response strings including leading command and trailing semicolon, may be shorter than *count* if the timeout expired
+
+        Raises:
+            ValueError: Serial port not specified
+            OSError: Error during serial port request/response
+        '''
+        if device is None:
+            if self._connect_pending:
+                # lazy construction, connect on first use
+                self.connect().result()
+
+            device = self._port
+        
+        if device is None:
+            raise ValueError('Serial port not specified')
+
+        if self._debug:
+            print( 'TX: {}'.format(request) )
+
+        if not self._instrumented:
+            return self._decode_responses( self._raw_io(request, device, count, priority) )
+
+        start = self._io_start(request)
+
+        try:
+            responses = self._decode_responses( self._raw_io(request, device, count, priority) )
+        except Exception as e:
+            self._io_end(request, count, None, start, e)
+            raise
+
+        self._io_end(request, count, responses, start)
+        return responses
+
+    def _raw_io(self, request, device, count=1, priority=None):
+        '''Encode a serial request and read raw responses.
+
+        Args:
+            request (str): One or more concatenated requests
+            device (str): Serial device port *str*
+            count (int): Number of expected responses, defaults to 1
+            priority (int): Request priority, defaults to None (priority of the first command in *request*)
+
+        Returns:
+            list: Raw responses
+
+        Raises:
+            OSError: Error during serial port request/response
+        '''
+        # convert string to bytes
+        request = request.encode('utf-8')
+
+        if device == self._port:
+            if priority is None:
+                priority = self._command_priority( request[:2].decode('utf-8') )
+
+            return self._worker.call(self._port_request, request, count, priority=priority)
+
+        return self._single_request(request, device, count)
+
+    def _port_request(self, request, count=1):
+        '''Process serial request and responses on the configured serial port.
+
+        Called on the worker thread.
+
+        Args:
+            request (bytes): Encoded request
+            count (int): Number of expected responses, defaults to 1
+
+        Returns:
+            list: Raw responses
+
+        Raises:
+            OSError: Error during serial port request/response
+        '''
+        with self._serial_lock:
+            if self._persistent:
+                return self._persistent_request(request, count)
+            else:
+                return self._single_request(request, self._port, count)
+
+    def _single_request(self, request, device, count=1):
+        '''Process serial request and responses using a temporary serial connection.
+
+        Args:
+            request (bytes): Encoded request
+            device (str): Serial device port *str*
+            count (int): Number of expected responses, defaults to 1
+
+        Returns:
+            list: Raw responses
+
+        Raises:
+            OSError: Error during serial port request/response
+        '''
+        try:
+            with self._transport(device, self._baudrate, timeout=self._timeout) as serial_port:
+                return self._transact(serial_port, request, count)
+        except Exception as e:
+            raise OSError('Error during serial port request/response {}, check device connection'.format(device))
+
+    def _persistent_request(self, request, count=1):
+        '''Process serial request and responses using the persistent serial connection.
+
+        The serial port is re-opened and the request is retried once if the connection was lost.
+
+        Args:
+            request (bytes): Encoded request
+            count (int): Number of expected responses, defaults to 1
+
+        Returns:
+            list: Raw responses
+
+        Raises:
+            OSError: Error during serial port request/response
+        '''
+        for attempt in range(2):
+            try:
+                if self._serial_port is None:
+                    if attempt > 0 and self.metrics is not None:
+                        self.metrics.record_reconnect()
+
+                    self._open_serial_port()
+
+                return self._transact(self._serial_port, request, count)
+            except Exception as e:
+                # connection lost (ex. device unplugged), re-open on retry
+                self._close_serial_port()
+
+        raise OSError('Error during serial port request/response {}, check device connection'.format(self._port))
+
+    def _open_serial_port(self):
+        '''Open the persistent serial connection, if not already open.
+
+        Raises:
+            ValueError: Serial port not specified
+            OSError: Error opening serial port
+        '''
+        if self._serial_port is not None:
+            return
+
+        if self._port is None:
+            raise ValueError('Serial port not specified')
+
+        try:
+            self._serial_port = self._transport(self._port, self._baudrate, timeout=self._timeout)
+        except Exception as e:
+            raise OSError('Error opening serial port {}, check device connection'.format(self._port))
+
+    def _close_serial_port(self):
+        '''Close the persistent serial connection, if open.'''
+        if self._serial_port is None:
+            return
+
+        try:
+            self._serial_port.close()
+        except Exception as e:
+            # port may already be gone (ex. device unplugged)
+            pass
+
+        self._serial_port = None
+
+    def _get(self, cmd, device=None):
+        '''Low level *get* operation handling.
+
+        Args:
+            cmd (str): Command to get value for
+            device (str): Windows COM port (ex. 'COM42') or Unix serial device path (ex. '/dev/ttyACM0'), defaults to None
+
+        Returns:
+            int: Command value
+
+        Other value types may be returned in the case of custom command handling (ex. dict)
+
+        Raises:
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        if cmd not in QDX.GETTABLE_COMMANDS:
+            return None
+
+        response = self._serial_request(self._get_request(cmd), device)
+        return self._parse_response(cmd, response)
+
+    def _get_many(self, cmds, device=None, priority=None):
+        '''Low level batch *get* operation handling.
+
+        Requests are pipelined in batches of up to `QDX.BATCH_SIZE` commands. Custom command variants share a single request with their base command (ex. QDX.RADIO_INFO and QDX.RADIO_INFO_DICT).
+
+        Args:
+            cmds (list): Commands to get values for
+            device (str): Windows COM port (ex. 'COM42') or Unix serial device path (ex. '/dev/ttyACM0'), defaults to None
+            priority (int): Request priority, defaults to None (priority of the first command in each batch)
+
+        Returns:
+            dict: Map of commands to command values, or to exceptions (qdxcat.QDXTimeoutError or qdxcat.QDXCommandError) for failed commands
+        '''
+        requests = self._batch_requests(cmds)
+        responses = {}
+
+        for index in range(0, len(requests), QDX.BATCH_SIZE):
+            batch = requests[index:index + QDX.BATCH_SIZE]
+            responses.update( zip(batch, self._serial_batch(batch, device, priority)) )
+
+        return self._batch_results(cmds, responses)
+
+    def _set(self, cmd, value):
+        '''Low level *set* operation handling.
+
+        Args:
+            cmd (str): Command to get value for
+            value (int): Command value to set
+        '''
+        if cmd not in QDX.SETTABLE_COMMANDS:
+            return None
         
-        request = '{}{};'.format(cmd, int(value))
-        self._serial_request(request)
+        self._serial_request(self._set_request(cmd, value), response=False)
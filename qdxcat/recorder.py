@@ -0,0 +1,310 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''Wire-level CAT session recorder and replay.
+
+A `Recorder` captures every serial transaction (request, responses, monotonic timestamp, and duration) into a compact append-only binary log. Records are written through a large write buffer by a response hook, on the thread that issued each request, so recording adds little overhead to each transaction. Durations are measured on that thread, so they include time spent waiting in the serial worker queue. A `Replay` feeds a recorded session back through the response parsing layer (`qdxcat.QDXBase._parse_response`, including QDX.RADIO_INFO parsing), at full speed or with the original timing.
+
+Example:
+```
+import qdxcat
+from qdxcat.recorder import Replay
+
+qdx = qdxcat.QDX()
+recorder = qdx.start_recording('session.qdxr')
+qdx.get(qdx.RADIO_INFO_DICT, update = True)
+recorder.close()
+
+for record, values in Replay('session.qdxr'):
+    print(record.request, values)
+
+# parsing throughput
+Replay('session.qdxr').benchmark()
+```
+
+Log format: a 5 byte header (`b'QDXR'` and a format version byte), followed by one record per transaction. Each record is a little-endian header (monotonic start time *float64*, duration *float64*, flags *uint8*, request length *uint16*, response length *uint32*) followed by the ASCII request and concatenated responses.
+'''
+
+__docformat__ = 'google'
+
+import time
+import struct
+import threading
+import collections
+
+from qdxcat.commands import COMMAND_SPECS
+
+
+MAGIC = b'QDXR\x01'
+'''Log file header, magic bytes and format version'''
+
+FLAG_ERROR = 0x01
+'''Record flag, the transaction raised an exception (no responses)'''
+
+_RECORD = struct.Struct('<ddBHI')
+
+# *get* request string to commands parsed from its response (ex. 'IF;' to QDX.RADIO_INFO and QDX.RADIO_INFO_DICT)
+_GET_REQUESTS = {}
+for _spec in COMMAND_SPECS.values():
+    if _spec.gettable:
+        _GET_REQUESTS.setdefault(_spec.get_request, []).append(_spec.cmd)
+
+
+Record = collections.namedtuple('Record', ['timestamp', 'elapsed', 'request', 'responses', 'error'])
+Record.__doc__ = '''Recorded serial transaction.
+
+Attributes:
+    timestamp (float): Transaction start time (*time.monotonic()*)
+    elapsed (float): Transaction duration in seconds, including serial worker queue wait time
+    request (str): One or more concatenated requests
+    responses (list): Response strings including leading command and trailing semicolon, None if an error occurred
+    error (bool): Whether the transaction raised an exception
+'''
+
+
+def read_records(path):
+    '''Read a session log.
+
+    Args:
+        path (str): Log file path
+
+    Yields:
+        qdxcat.recorder.Record: Recorded transactions, in order
+
+    Raises:
+        ValueError: Not a session log file
+    '''
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not a qdxcat session log: {}'.format(path))
+
+        while True:
+            header = f.read(_RECORD.size)
+
+            if len(header) < _RECORD.size:
+                # end of file, or a partial record from an interrupted write
+                return
+
+            timestamp, elapsed, flags, request_length, response_length = _RECORD.unpack(header)
+            data = f.read(request_length + response_length)
+
+            if len(data) < request_length + response_length:
+                return
+
+            request = data[:request_length].decode('ascii', errors='replace')
+            error = bool(flags & FLAG_ERROR)
+            responses = None if error else [response + ';' for response in data[request_length:].decode('ascii', errors='replace').split(';')[:-1]]
+
+            yield Record(timestamp, elapsed, request, responses, error)
+
+
+class Recorder:
+    '''Append-only binary session recorder.
+
+    Use `qdxcat.QDXBase.start_recording` to record serial transactions of a QDX object.
+
+    Attributes:
+        path (str): Log file path
+        records (int): Number of transactions recorded
+    '''
+
+    def __init__(self, path, buffer_size=65536):
+        '''Initialize Recorder instance object.
+
+        The log file is created if it does not exist, otherwise records are appended.
+
+        Args:
+            path (str): Log file path
+            buffer_size (int): Write buffer size in bytes, defaults to 65536
+
+        Returns:
+            qdxcat.recorder.Recorder: Constructed Recorder object
+
+        Raises:
+            OSError: Error opening the log file
+            ValueError: Existing file is not a session log
+        '''
+        self.path = path
+        self.records = 0
+
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab', buffering=buffer_size)
+        self._qdx = None
+
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        else:
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    self._file.close()
+                    raise ValueError('Not a qdxcat session log: {}'.format(path))
+
+    def attach(self, qdx):
+        '''Record serial transactions of a QDX object.
+
+        Args:
+            qdx (qdxcat.QDXBase): QDX object to record
+        '''
+        self._qdx = qdx
+        qdx.add_response_hook(self.record)
+
+    def record(self, request, responses, elapsed, error=None):
+        '''Record a serial transaction (response hook, see `qdxcat.QDXBase.add_response_hook`).
+
+        Args:
+            request (str): One or more concatenated requests
+            responses (list): Response strings, None if *error* occurred
+            elapsed (float): Transaction duration in seconds, including serial worker queue wait time
+            error (Exception): Exception raised by the transaction, defaults to None
+        '''
+        timestamp = time.monotonic() - elapsed
+        # non-ASCII characters (ex. serial line noise) are stored as '?', recording must never fail a request
+        request = request.encode('ascii', errors='replace')
+        response = b'' if responses is None else ''.join(responses).encode('ascii', errors='replace')
+        flags = 0 if error is None else FLAG_ERROR
+
+        with self._lock:
+            if self._file.closed:
+                return
+
+            self._file.write( _RECORD.pack(timestamp, elapsed, flags, len(request), len(response)) + request + response )
+            self.records += 1
+
+    def flush(self):
+        '''Write buffered records to the log file.'''
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self):
+        '''Stop recording and close the log file.'''
+        if self._qdx is not None:
+            self._qdx.remove_hook(self.record)
+            self._qdx = None
+
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Replay:
+    '''Replay a recorded session through the response parsing layer.
+
+    Attributes:
+        path (str): Log file path
+    '''
+
+    def __init__(self, path, parser=None):
+        '''Initialize Replay instance object.
+
+        Args:
+            path (str): Log file path
+            parser (qdxcat.QDXBase): Object used to parse responses, defaults to None (a new `qdxcat.QDXBase` object, no serial port I/O is performed)
+
+        Returns:
+            qdxcat.recorder.Replay: Constructed Replay object
+        '''
+        self.path = path
+
+        if parser is None:
+            # imported here, qdxcat.qdx imports this module
+            from qdxcat.qdx import QDXBase
+            parser = QDXBase()
+
+        self._parser = parser
+
+    def __iter__(self):
+        return self.results()
+
+    def results(self, realtime=False, speed=1):
+        '''Replay the session.
+
+        Args:
+            realtime (bool): Whether to replay with the original timing between transactions, defaults to False (full speed)
+            speed (float): Replay speed multiplier when *realtime* is True, defaults to 1
+
+        Yields:
+            tuple: (qdxcat.recorder.Record, dict) pairs, the dict maps commands to parsed command values, or to exceptions (qdxcat.QDXTimeoutError or qdxcat.QDXCommandError) for failed commands
+        '''
+        start = None
+
+        for record in read_records(self.path):
+            if realtime:
+                if start is None:
+                    start = (time.monotonic(), record.timestamp)
+
+                delay = start[0] + (record.timestamp - start[1]) / speed - time.monotonic()
+
+                if delay > 0:
+                    time.sleep(delay)
+
+            yield record, self.parse(record)
+
+    def parse(self, record):
+        '''Parse the responses of a recorded transaction.
+
+        Args:
+            record (qdxcat.recorder.Record): Recorded transaction
+
+        Returns:
+            dict: Map of commands to parsed command values, or to exceptions for failed commands, empty if the transaction contains no *get* requests or raised an exception
+        '''
+        if record.error:
+            return {}
+
+        requests = [request + ';' for request in record.request.split(';')[:-1] if request + ';' in _GET_REQUESTS]
+
+        if len(requests) == 0:
+            return {}
+
+        responses = dict( zip(requests, self._parser._match_responses(requests, record.responses)) )
+        cmds = [cmd for request in requests for cmd in _GET_REQUESTS[request]]
+        return self._parser._batch_results(cmds, responses)
+
+    def benchmark(self):
+        '''Measure parsing throughput at full speed.
+
+        The session log is read into memory before timing, so only parsing is measured.
+
+        Returns:
+            dict: 'records', 'responses', 'seconds', and 'responses_per_second'
+        '''
+        records = list( read_records(self.path) )
+        responses = sum([len(record.responses) for record in records if record.responses is not None])
+
+        start = time.perf_counter()
+        for record in records:
+            self.parse(record)
+        elapsed = time.perf_counter() - start
+
+        return {
+            'records': len(records),
+            'responses': responses,
+            'seconds': elapsed,
+            'responses_per_second': responses / elapsed if elapsed > 0 else None
+        }
@@ -0,0 +1,409 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''Hamlib rigctld compatible TCP server.
+
+`RigctlServer` lets software that speaks the Hamlib `rigctld` network protocol (ex. WSJT-X or logging software configured for "Hamlib NET rigctl") control a QDX. Frequency, mode, PTT, and split commands are mapped to QDX.VFO_A, QDX.OPERATING_MODE, QDX.TX_STATE, and QDX.SPLIT_MODE. All clients are served from a single asyncio event loop using `qdxcat.AsyncQDX`.
+
+Reads are answered from local settings while they are younger than *cache_ttl*, and concurrent reads of the same setting share a single request, so many clients polling at a high rate result in a bounded number of serial transactions. Status reads (frequency, mode, PTT, and split) are refreshed together from a single QDX.RADIO_INFO request.
+
+Only the default (non-extended) response protocol is supported.
+
+Example:
+```
+qdxcat-rigctld --device /dev/ttyACM0 --port 4532
+```
+
+or from Python:
+```
+import asyncio
+import qdxcat
+from qdxcat.rigctld import RigctlServer
+
+async def main():
+    qdx = qdxcat.AsyncQDX()
+    await qdx.connect()
+
+    async with RigctlServer(qdx, port = 4532) as server:
+        await server.serve_forever()
+
+asyncio.run(main())
+```
+'''
+
+__docformat__ = 'google'
+
+import asyncio
+import argparse
+
+from qdxcat.qdx import QDXBase, QDXTimeoutError, QDXCommandError
+from qdxcat.aio import AsyncQDX
+
+
+DEFAULT_PORT = 4532
+'''Default rigctld TCP port'''
+
+# hamlib error codes, sent negated (ex. 'RPRT -1')
+RIG_OK = 0
+RIG_EINVAL = 1
+RIG_ENIMPL = 4
+RIG_ETIMEOUT = 5
+RIG_EIO = 6
+RIG_ERJCTED = 9
+
+MODES = {'LSB': 1, 'USB': 3, 'PKTLSB': 1, 'PKTUSB': 3}
+'''Map of hamlib mode names to QDX.OPERATING_MODE values'''
+
+# hamlib 'dump_state' response (protocol version 0), required by hamlib network clients on connect
+DUMP_STATE = '\n'.join([
+    '0',                                                    # protocol version
+    '2',                                                    # rig model (NET rigctl)
+    '2',                                                    # ITU region
+    '3000000.000000 30000000.000000 0xc0c -1 -1 0x1 0x0',   # rx range: start, end, modes, power, vfos, antennas
+    '0 0 0 0 0 0 0',
+    '3000000.000000 30000000.000000 0xc0c 1 5000 0x1 0x0',  # tx range
+    '0 0 0 0 0 0 0',
+    '0xc0c 1',                                              # tuning steps
+    '0 0',
+    '0xc0c 3000',                                           # filters
+    '0 0',
+    '0',                                                    # max rit
+    '0',                                                    # max xit
+    '0',                                                    # max if shift
+    '0',                                                    # announces
+    '',                                                     # preamp
+    '',                                                     # attenuator
+    '0x0',                                                  # get functions
+    '0x0',                                                  # set functions
+    '0x0',                                                  # get levels
+    '0x0',                                                  # set levels
+    '0x0',                                                  # get parameters
+    '0x0',                                                  # set parameters
+]) + '\n'
+
+
+class RigctlServer:
+    '''rigctld compatible TCP server for a single QDX.
+
+    Supported commands (short and long forms):
+    ```
+    f  \\get_freq             F  \\set_freq <Hz>
+    m  \\get_mode             M  \\set_mode <USB|LSB|PKTUSB|PKTLSB> <passband>
+    t  \\get_ptt              T  \\set_ptt <0|1>
+    s  \\get_split_vfo        S  \\set_split_vfo <0|1> <VFO>
+    v  \\get_vfo              \\chk_vfo
+    \\dump_state              q  \\quit
+    ```
+
+    Settings are written with `qdxcat.AsyncQDX.VERIFY_DEFERRED`, so set commands reply without waiting for the value to be read back. The passband argument of *set_mode* is ignored (QDX.FILTER_BW is read only).
+
+    Attributes:
+        qdx (qdxcat.AsyncQDX): Controlled QDX
+        host (str): Listening address
+        port (int): Listening TCP port, the assigned port if 0 was specified once started
+        cache_ttl (float): Maximum age in seconds of local settings used to answer reads
+        coalesced (int): Number of reads answered by a request already in progress
+    '''
+
+    def __init__(self, qdx, host='127.0.0.1', port=DEFAULT_PORT, cache_ttl=0.2):
+        '''Initialize RigctlServer instance object.
+
+        Args:
+            qdx (qdxcat.AsyncQDX): Controlled QDX, connected to a serial port
+            host (str): Listening address, defaults to '127.0.0.1'
+            port (int): Listening TCP port, defaults to 4532 (0 to assign a free port)
+            cache_ttl (float): Maximum age in seconds of local settings used to answer reads, defaults to 0.2
+
+        Returns:
+            qdxcat.rigctld.RigctlServer: Constructed RigctlServer object
+        '''
+        self.qdx = qdx
+        self.host = host
+        self.port = port
+        self.cache_ttl = cache_ttl
+        self.coalesced = 0
+
+        self._server = None
+        # in-flight reads by command
+        self._reads = {}
+        # client stream writers to connection handler tasks
+        self._clients = {}
+
+        self._commands = {
+            'f':                self._get_freq,
+            'get_freq':         self._get_freq,
+            'F':                self._set_freq,
+            'set_freq':         self._set_freq,
+            'm':                self._get_mode,
+            'get_mode':         self._get_mode,
+            'M':                self._set_mode,
+            'set_mode':         self._set_mode,
+            't':                self._get_ptt,
+            'get_ptt':          self._get_ptt,
+            'T':                self._set_ptt,
+            'set_ptt':          self._set_ptt,
+            's':                self._get_split_vfo,
+            'get_split_vfo':    self._get_split_vfo,
+            'S':                self._set_split_vfo,
+            'set_split_vfo':    self._set_split_vfo,
+            'v':                self._get_vfo,
+            'get_vfo':          self._get_vfo,
+            'chk_vfo':          self._chk_vfo,
+            'dump_state':       self._dump_state
+        }
+
+    @property
+    def clients(self):
+        '''int: Number of connected clients'''
+        return len(self._clients)
+
+    async def start(self):
+        '''Start listening for clients.
+
+        Returns:
+            qdxcat.rigctld.RigctlServer: This server
+        '''
+        if self._server is None:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+
+        return self
+
+    async def serve_forever(self):
+        '''Start listening for clients, and serve them until cancelled or closed.'''
+        await self.start()
+
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            # raised by close()
+            if self._server is not None:
+                raise
+
+    async def close(self):
+        '''Stop listening and disconnect all clients.'''
+        if self._server is None:
+            return
+
+        server = self._server
+        self._server = None
+        server.close()
+
+        tasks = list(self._clients.values())
+
+        for writer in list(self._clients):
+            writer.close()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def execute(self, line):
+        '''Execute a single rigctld command line.
+
+        Args:
+            line (str): Command and arguments (ex. 'F 14074000', or '\\set_freq 14074000')
+
+        Returns:
+            str: Response text, including the trailing newline
+        '''
+        args = line.split()
+        name = args.pop(0).lstrip('\\')
+        handler = self._commands.get(name)
+
+        if handler is None:
+            return 'RPRT -{}\n'.format(RIG_ENIMPL)
+
+        try:
+            values = await handler(*args)
+        except QDXCommandError:
+            # before ValueError, which QDXCommandError subclasses
+            code = RIG_ERJCTED
+        except (ValueError, TypeError, KeyError):
+            code = RIG_EINVAL
+        except QDXTimeoutError:
+            code = RIG_ETIMEOUT
+        except Exception:
+            code = RIG_EIO
+        else:
+            if values is None:
+                return 'RPRT {}\n'.format(RIG_OK)
+
+            return ''.join( ['{}\n'.format(value) for value in values] )
+
+        return 'RPRT -{}\n'.format(code)
+
+    async def _handle(self, reader, writer):
+        '''Serve a client connection until it disconnects.
+
+        Args:
+            reader (asyncio.StreamReader): Client stream reader
+            writer (asyncio.StreamWriter): Client stream writer
+        '''
+        self._clients[writer] = asyncio.current_task()
+
+        try:
+            while True:
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                line = line.decode('ascii', errors='replace').strip()
+
+                if line == '':
+                    continue
+
+                if line in ('q', 'Q', '\\quit'):
+                    break
+
+                writer.write( (await self.execute(line)).encode('ascii') )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    async def _read(self, cmd):
+        '''Read a command value, sharing requests already in progress.
+
+        Args:
+            cmd (str): Command to get value for
+
+        Returns:
+            Command value
+        '''
+        qdx = self.qdx
+
+        if cmd in QDXBase.STATUS_COMMANDS:
+            # one request refreshes all status commands
+            key = QDXBase.RADIO_INFO_DICT
+            max_age = self.cache_ttl
+            read = lambda: qdx.get_status(max_age=max_age)
+        else:
+            # other commands use their own time-to-live (ex. QDX.FILTER_BW does not expire)
+            key = cmd
+            max_age = None
+            read = lambda: qdx.get(cmd, max_age=max_age)
+
+        if qdx._is_fresh(cmd, max_age):
+            return qdx.settings[cmd]
+
+        task = self._reads.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(read())
+            self._reads[key] = task
+            task.add_done_callback(lambda task: self._reads.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        await asyncio.shield(task)
+        return qdx.settings[cmd]
+
+    async def _write(self, cmd, value):
+        '''Write a command value without waiting for it to be read back.
+
+        Args:
+            cmd (str): Command to set value for
+            value (int): Command value
+        '''
+        await self.qdx.set(cmd, value, verify=AsyncQDX.VERIFY_DEFERRED)
+
+    async def _get_freq(self):
+        return [await self._read(QDXBase.VFO_A)]
+
+    async def _set_freq(self, freq):
+        await self._write(QDXBase.VFO_A, int(float(freq)))
+
+    async def _get_mode(self):
+        mode = await self._read(QDXBase.OPERATING_MODE)
+        passband = await self._read(QDXBase.FILTER_BW)
+        return ['LSB' if mode == MODES['LSB'] else 'USB', passband]
+
+    async def _set_mode(self, mode, passband=None):
+        await self._write(QDXBase.OPERATING_MODE, MODES[mode.upper()])
+
+    async def _get_ptt(self):
+        return [await self._read(QDXBase.TX_STATE)]
+
+    async def _set_ptt(self, ptt):
+        await self._write(QDXBase.TX_STATE, 1 if int(ptt) else 0)
+
+    async def _get_split_vfo(self):
+        split = await self._read(QDXBase.SPLIT_MODE)
+        return [split, 'VFOB' if split else 'VFOA']
+
+    async def _set_split_vfo(self, split, vfo=None):
+        await self._write(QDXBase.SPLIT_MODE, 1 if int(split) else 0)
+
+    async def _get_vfo(self):
+        return ['VFOA']
+
+    async def _chk_vfo(self):
+        # VFO arguments are not accepted by other commands
+        return [0]
+
+    async def _dump_state(self):
+        return [DUMP_STATE[:-1]]
+
+
+def main(args=None):
+    '''Run a rigctld compatible server until interrupted.
+
+    Args:
+        args (list): Command line arguments, defaults to None (`sys.argv`)
+    '''
+    parser = argparse.ArgumentParser(prog='qdxcat-rigctld', description='Serve a QDX over the Hamlib rigctld network protocol')
+    parser.add_argument('--host', default='127.0.0.1', help='listening address (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='listening TCP port (default: %(default)s)')
+    parser.add_argument('--device', help='QDX serial port (default: auto-detect)')
+    parser.add_argument('--baudrate', type=int, default=9600, help='serial port baudrate (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=1, help='serial port timeout in seconds (default: %(default)s)')
+    parser.add_argument('--cache-ttl', type=float, default=0.2, help='maximum age in seconds of settings used to answer reads (default: %(default)s)')
+    args = parser.parse_args(args)
+
+    async def serve():
+        qdx = AsyncQDX(args.device, args.baudrate, args.timeout)
+        await qdx.connect()
+
+        try:
+            async with RigctlServer(qdx, args.host, args.port, args.cache_ttl) as server:
+                await server.serve_forever()
+        finally:
+            qdx.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
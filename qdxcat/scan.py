@@ -0,0 +1,208 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''Frequency sweep (band scan) engine.
+
+A `Scan` steps QDX.VFO_A across a list or range of frequencies and samples a set of commands at each step. The readings for each step are pipelined with the frequency set for the next step, so each step costs a single serial round trip, and steps run as fast as the dwell time allows.
+
+Example:
+```
+import qdxcat
+qdx = qdxcat.QDX(persistent = True)
+
+# 20 m FT8 sub-band in 500 Hz steps, 50 ms dwell at each frequency
+scan = qdx.scan(start = 14074000, stop = 14077000, step = 500, dwell = 0.05, commands = [qdx.RADIO_INFO_DICT])
+
+for result in scan:
+    print(result.frequency, result.values)
+
+# or collect all results as columns
+columns = qdx.scan(frequencies = [7074000, 10136000, 14074000], commands = [qdx.TX_STATE]).to_columns()
+```
+'''
+
+__docformat__ = 'google'
+
+import time
+import array
+import collections
+
+from qdxcat.commands import INT, VERSION
+
+
+ScanResult = collections.namedtuple('ScanResult', ['frequency', 'timestamp', 'values'])
+ScanResult.__doc__ = '''Readings at a single scan step.
+
+Attributes:
+    frequency (int): QDX.VFO_A frequency in Hz
+    timestamp (float): Time the readings were requested (*time.time()*)
+    values (dict): Map of commands to command values, or to exceptions (qdxcat.QDXTimeoutError or qdxcat.QDXCommandError) for failed commands
+'''
+
+
+class Scan:
+    '''Frequency sweep over QDX.VFO_A.
+
+    Step *n* readings and the step *n + 1* frequency set are written in a single request. Readings for a step are requested once the dwell time has elapsed after its frequency set was written. Sleeping between steps happens on the calling thread, so higher priority requests (ex. PTT) are not delayed by a running scan.
+
+    Attributes:
+        frequencies (array.array): Frequencies to scan in Hz
+        dwell (float): Time in seconds to wait at each frequency before sampling
+        commands (list): Command strings sampled at each step
+        restore (bool): Whether to restore the QDX.VFO_A frequency after the scan
+    '''
+
+    def __init__(self, qdx, frequencies=None, start=None, stop=None, step=None, dwell=0, commands=None, restore=True):
+        '''Initialize Scan instance object.
+
+        Specify either *frequencies*, or *start*, *stop*, and *step*.
+
+        Args:
+            qdx (qdxcat.QDX): QDX object to scan with
+            frequencies (list): Frequencies to scan in Hz, defaults to None
+            start (int): First frequency in Hz, defaults to None
+            stop (int): Last frequency in Hz (inclusive), defaults to None
+            step (int): Frequency step in Hz, defaults to None
+            dwell (float): Time in seconds to wait at each frequency before sampling, defaults to 0
+            commands (list): Command strings to sample at each step, defaults to None (QDX.VFO_A)
+            restore (bool): Whether to restore the QDX.VFO_A frequency after the scan, defaults to True
+
+        Returns:
+            qdxcat.scan.Scan: Constructed Scan object
+
+        Raises:
+            ValueError: Frequencies or range not specified
+            ValueError: Invalid frequency (see `qdxcat.commands.CommandSpec.validate`)
+            ValueError: Invalid QDX command (not in QDX.COMMANDS)
+            ValueError: Command is not gettable (not in QDX.GET_COMMANDS)
+        '''
+        if frequencies is None:
+            if None in (start, stop, step) or step <= 0:
+                raise ValueError('Specify frequencies, or start, stop, and a positive step')
+
+            frequencies = range(int(start), int(stop) + 1, int(step))
+
+        if commands is None:
+            commands = [qdx.VFO_A]
+
+        for cmd in commands:
+            qdx._validate(cmd, qdx.GET_COMMANDS)
+
+        self.frequencies = array.array('q', frequencies)
+        self.dwell = dwell
+        self.commands = list(commands)
+        self.restore = restore
+
+        self._qdx = qdx
+        # preformatted requests, invalid frequencies raise before any serial I/O
+        self._set_requests = [qdx._set_request(qdx.VFO_A, frequency) for frequency in self.frequencies]
+        self._get_requests = qdx._batch_requests(self.commands)
+        self._stop = False
+
+    def __iter__(self):
+        return self.results()
+
+    def __len__(self):
+        return len(self.frequencies)
+
+    def stop(self):
+        '''Stop a running scan after the current step.'''
+        self._stop = True
+
+    def results(self):
+        '''Run the scan, yielding readings as each step completes.
+
+        Yields:
+            qdxcat.scan.ScanResult: Readings at each scan step
+
+        Raises:
+            OSError: Error during serial port request/response
+        '''
+        qdx = self._qdx
+        self._stop = False
+
+        if len(self.frequencies) == 0:
+            return
+
+        original = qdx.get(qdx.VFO_A) if self.restore else None
+        qdx._invalidate(qdx.VFO_A)
+
+        try:
+            qdx._serial_io(self._set_requests[0], count=0, priority=qdx.PRIORITY_DEFAULT)
+            set_time = time.monotonic()
+
+            for index, frequency in enumerate(self.frequencies):
+                delay = set_time + self.dwell - time.monotonic()
+
+                if delay > 0:
+                    time.sleep(delay)
+
+                last = self._stop or index == len(self.frequencies) - 1
+                next_set = '' if last else self._set_requests[index + 1]
+                timestamp = time.time()
+
+                responses = qdx._serial_io(''.join(self._get_requests) + next_set, count=len(self._get_requests), priority=qdx.PRIORITY_DEFAULT)
+                set_time = time.monotonic()
+
+                responses = dict( zip(self._get_requests, qdx._match_responses(self._get_requests, responses)) )
+                values = qdx._batch_results(self.commands, responses)
+                qdx._store_results(values)
+
+                yield ScanResult(frequency, timestamp, {cmd: values[cmd] for cmd in self.commands})
+
+                if last:
+                    break
+        finally:
+            if original is not None:
+                qdx._serial_io(qdx._set_request(qdx.VFO_A, original), count=0)
+
+            qdx._invalidate(qdx.VFO_A)
+
+    def to_columns(self):
+        '''Run the scan and collect all readings as columns.
+
+        Failed readings are stored as NaN.
+
+        Returns:
+            dict: Map of column names ('frequency', 'timestamp', and each command) to *array.array* columns (frequencies as 'q' integers, timestamps and command values as 'd' floats)
+
+        Raises:
+            ValueError: Sampled command values are not numeric (ex. QDX.RADIO_INFO_DICT)
+            OSError: Error during serial port request/response
+        '''
+        for cmd in self.commands:
+            if self._qdx.COMMAND_SPECS[cmd].type not in (INT, VERSION):
+                raise ValueError('Command values are not numeric: {}'.format(cmd))
+
+        columns = {'frequency': array.array('q'), 'timestamp': array.array('d')}
+        columns.update( {cmd: array.array('d') for cmd in self.commands} )
+        nan = float('nan')
+
+        for result in self.results():
+            columns['frequency'].append(result.frequency)
+            columns['timestamp'].append(result.timestamp)
+
+            for cmd, value in result.values.items():
+                columns[cmd].append(nan if value is None or isinstance(value, Exception) else value)
+
+        return columns
@@ -0,0 +1,344 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''Compact local settings storage.
+
+`RadioState` stores local settings and their timestamps in slots indexed by command, instead of a dictionary per QDX object. `RadioInfo` is an immutable record of a parsed QDX.RADIO_INFO response, which provides read-only dictionary access to its fields without building a dictionary on each read. Lookup tables are built once at import time and shared by all QDX objects.
+'''
+
+__docformat__ = 'google'
+
+import array
+import collections.abc
+
+from qdxcat.commands import COMMAND_SPECS
+
+
+MODES = ('USB', 'LSB', 'USB', 'USB')
+'''QDX.RADIO_INFO operating mode strings, by mode field value'''
+
+VFOS = ('A', 'B')
+'''QDX.RADIO_INFO receive VFO strings, by rx_vfo field value'''
+
+RADIO_INFO_FIELDS = (
+    ('vfo_freq',        0,  11),
+    ('rit_offset',      16, 21),
+    ('rit',             21, 22),
+    ('xit',             22, 23),
+    ('memory_bank',     23, 24),
+    ('memory_channel',  24, 26),
+    ('tx',              26, 27),
+    ('mode',            27, 28),
+    ('rx_vfo',          28, 29),
+    ('scan',            29, 30),
+    ('split',           30, 31),
+    ('tone',            31, 32),
+    ('tone_number',     32, 34)
+)
+'''QDX.RADIO_INFO fixed-width fields as (name, start offset, end offset) tuples'''
+
+_FIELD_INDEX = {name: index for index, (name, start, end) in enumerate(RADIO_INFO_FIELDS)}
+_RADIO_INFO_LENGTH = RADIO_INFO_FIELDS[-1][2]
+
+# RadioInfo keys to functions of the raw field tuple
+_RADIO_INFO_VALUES = {
+    'vfo_freq':         lambda fields: fields[0],
+    'rit_offset':       lambda fields: fields[1],
+    'rit':              lambda fields: bool(fields[2]),
+    'xit':              lambda fields: bool(fields[3]),
+    'memory_bank':      lambda fields: fields[4],
+    'memory_channel':   lambda fields: fields[5],
+    'tx':               lambda fields: bool(fields[6]),
+    'rx':               lambda fields: not bool(fields[6]),
+    'mode':             lambda fields: MODES[fields[7]],
+    'rx_vfo':           lambda fields: VFOS[fields[8]],
+    'scan':             lambda fields: bool(fields[9]),
+    'split':            lambda fields: bool(fields[10]),
+    'tone':             lambda fields: fields[11],
+    'tone_number':      lambda fields: fields[12]
+}
+
+COMMAND_INDEX = {cmd: index for index, cmd in enumerate(COMMAND_SPECS)}
+'''Map of command strings to `RadioState` slot indexes'''
+
+# unknown local setting marker, None is a valid local setting
+_MISSING = object()
+
+
+def parse_radio_info(response):
+    '''Parse a QDX.RADIO_INFO response into fixed-width integer fields.
+
+    Args:
+        response (str): Response value without leading command and trailing semicolon
+
+    Returns:
+        tuple: *int* field values in `RADIO_INFO_FIELDS` order
+
+    Raises:
+        ValueError: Invalid QDX.RADIO_INFO response
+    '''
+    if len(response) < _RADIO_INFO_LENGTH:
+        raise ValueError('Invalid radio info response, expected at least {} characters: {}'.format(_RADIO_INFO_LENGTH, response))
+
+    fields = []
+
+    for name, start, end in RADIO_INFO_FIELDS:
+        field = response[start:end]
+
+        if not field.lstrip('+-').isdigit():
+            raise ValueError('Invalid radio info response, {} field at offset {}: {}'.format(name, start, response))
+
+        fields.append(int(field))
+
+    return tuple(fields)
+
+
+class RadioInfo(collections.abc.Mapping):
+    '''Immutable parsed QDX.RADIO_INFO record.
+
+    Supports read-only dictionary access, and compares equal to a dictionary with the same items.
+
+    Dictionary structure:
+    ```
+    {
+        'vfo_freq': int,
+        'rit_offset': int,
+        'rit': bool,
+        'xit': bool,
+        'memory_bank': int,
+        'memory_channel': int,
+        'tx': bool,
+        'rx': bool,
+        'mode': str,
+        'rx_vfo': str,
+        'scan': bool,
+        'split': bool,
+        'tone': int,
+        'tone_number': int
+    }
+    ```
+
+    Attributes:
+        fields (tuple): Raw *int* field values in `RADIO_INFO_FIELDS` order
+    '''
+
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        '''Initialize RadioInfo instance object.
+
+        Args:
+            fields (tuple): Raw *int* field values in `RADIO_INFO_FIELDS` order
+
+        Returns:
+            qdxcat.state.RadioInfo: Constructed RadioInfo object
+        '''
+        object.__setattr__(self, 'fields', tuple(fields))
+
+    @classmethod
+    def parse(cls, response):
+        '''Parse a QDX.RADIO_INFO response.
+
+        Args:
+            response (str): Response value without leading command and trailing semicolon
+
+        Returns:
+            qdxcat.state.RadioInfo: Parsed record
+
+        Raises:
+            ValueError: Invalid QDX.RADIO_INFO response
+        '''
+        return cls( parse_radio_info(response) )
+
+    def raw(self, name):
+        '''Get a raw field value.
+
+        Args:
+            name (str): Field name (see `RADIO_INFO_FIELDS`)
+
+        Returns:
+            int: Field value
+        '''
+        return self.fields[_FIELD_INDEX[name]]
+
+    def to_dict(self):
+        '''Convert to a dictionary.
+
+        Returns:
+            dict: Map of keys to values
+        '''
+        return {key: value(self.fields) for key, value in _RADIO_INFO_VALUES.items()}
+
+    def __getitem__(self, key):
+        return _RADIO_INFO_VALUES[key](self.fields)
+
+    def __iter__(self):
+        return iter(_RADIO_INFO_VALUES)
+
+    def __len__(self):
+        return len(_RADIO_INFO_VALUES)
+
+    def __hash__(self):
+        return hash(self.fields)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('RadioInfo is immutable')
+
+    def __repr__(self):
+        return 'RadioInfo({})'.format(self.to_dict())
+
+
+class RadioState(collections.abc.MutableMapping):
+    '''Local settings store with dictionary access.
+
+    Values and timestamps are stored in fixed slots indexed by command (see `COMMAND_INDEX`). Keys other than QDX commands are stored in a fallback dictionary.
+    '''
+
+    __slots__ = ('_values', '_times', '_extra')
+
+    def __init__(self, settings=None):
+        '''Initialize RadioState instance object.
+
+        Args:
+            settings (dict): Initial local settings, defaults to None
+
+        Returns:
+            qdxcat.state.RadioState: Constructed RadioState object
+        '''
+        self._values = [_MISSING] * len(COMMAND_INDEX)
+        # monotonic timestamps, nan if unknown or invalidated
+        self._times = array.array('d', [float('nan')]) * len(COMMAND_INDEX)
+        self._extra = {}
+
+        if settings is not None:
+            self.update(settings)
+
+    def timestamp(self, cmd):
+        '''Get the time a local setting was last updated.
+
+        Args:
+            cmd (str): Command string
+
+        Returns:
+            float: *time.monotonic()* timestamp, or None if unknown or invalidated
+        '''
+        index = COMMAND_INDEX.get(cmd)
+
+        if index is None:
+            return None
+
+        timestamp = self._times[index]
+        # nan is not equal to itself
+        return timestamp if timestamp == timestamp else None
+
+    def store(self, cmd, value, timestamp):
+        '''Set a local setting and its timestamp.
+
+        Args:
+            cmd (str): Command string
+            value: Command value
+            timestamp (float): *time.monotonic()* timestamp
+        '''
+        index = COMMAND_INDEX.get(cmd)
+
+        if index is None:
+            self._extra[cmd] = value
+            return
+
+        self._values[index] = value
+        self._times[index] = timestamp
+
+    def expire(self, cmd):
+        '''Clear the timestamp of a local setting, keeping its value.
+
+        Args:
+            cmd (str): Command string
+        '''
+        index = COMMAND_INDEX.get(cmd)
+
+        if index is not None:
+            self._times[index] = float('nan')
+
+    def __getitem__(self, cmd):
+        index = COMMAND_INDEX.get(cmd)
+
+        if index is None:
+            return self._extra[cmd]
+
+        value = self._values[index]
+
+        if value is _MISSING:
+            raise KeyError(cmd)
+
+        return value
+
+    def __setitem__(self, cmd, value):
+        index = COMMAND_INDEX.get(cmd)
+
+        if index is None:
+            self._extra[cmd] = value
+        else:
+            self._values[index] = value
+
+    def __delitem__(self, cmd):
+        index = COMMAND_INDEX.get(cmd)
+
+        if index is None:
+            del self._extra[cmd]
+            return
+
+        if self._values[index] is _MISSING:
+            raise KeyError(cmd)
+
+        self._values[index] = _MISSING
+        self._times[index] = float('nan')
+
+    def __contains__(self, cmd):
+        index = COMMAND_INDEX.get(cmd)
+
+        if index is None:
+            return cmd in self._extra
+
+        return self._values[index] is not _MISSING
+
+    def get(self, cmd, default=None):
+        index = COMMAND_INDEX.get(cmd)
+
+        if index is None:
+            return self._extra.get(cmd, default)
+
+        value = self._values[index]
+        return default if value is _MISSING else value
+
+    def __iter__(self):
+        for cmd, index in COMMAND_INDEX.items():
+            if self._values[index] is not _MISSING:
+                yield cmd
+
+        yield from list(self._extra)
+
+    def __len__(self):
+        return len(self._values) - self._values.count(_MISSING) + len(self._extra)
+
+    def __repr__(self):
+        return 'RadioState({})'.format(dict(self.items()))
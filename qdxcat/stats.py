@@ -0,0 +1,226 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''Serial I/O instrumentation.
+
+`Stats` collects per-command request counters, latency histograms, timeout, `?;` rejection, error and reconnect counts, and bytes in and out. Instrumentation is disabled by default and adds a single attribute check per serial transaction while disabled.
+
+Example:
+```
+import qdxcat
+qdx = qdxcat.QDX()
+qdx.enable_stats()
+
+qdx.get(qdx.VFO_A, update = True)
+print(qdx.stats())
+
+# Prometheus text exposition format
+print(qdx.metrics.to_prometheus())
+```
+'''
+
+__docformat__ = 'google'
+
+import json
+import bisect
+import threading
+
+
+class Stats:
+    '''Serial I/O metrics for a single serial port.
+
+    Transactions containing a single request are recorded by command (ex. 'FA'). Pipelined transactions containing multiple requests are counted by command, and their latency is recorded under the 'batch' key.
+
+    Attributes:
+        buckets (tuple): Latency histogram bucket upper bounds in seconds
+    '''
+
+    DEFAULT_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+    '''Default latency histogram bucket upper bounds in seconds'''
+
+    def __init__(self, buckets=None):
+        '''Initialize Stats instance object.
+
+        Args:
+            buckets (tuple): Latency histogram bucket upper bounds in seconds, defaults to None (`Stats.DEFAULT_BUCKETS`)
+
+        Returns:
+            qdxcat.stats.Stats: Constructed Stats object
+        '''
+        self.buckets = tuple(Stats.DEFAULT_BUCKETS if buckets is None else sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''Reset all metrics.'''
+        with self._lock:
+            self._requests = {}
+            # command or 'batch' to [bucket counts..., +Inf count]
+            self._histograms = {}
+            self._latency_sum = {}
+            self._transactions = 0
+            self._timeouts = 0
+            self._rejections = 0
+            self._errors = 0
+            self._reconnects = 0
+            self._bytes_out = 0
+            self._bytes_in = 0
+
+    def record(self, request, count, responses, elapsed, error=None):
+        '''Record a serial transaction.
+
+        Args:
+            request (str): One or more concatenated requests
+            count (int): Number of expected responses
+            responses (list): Response strings including leading command and trailing semicolon, None if *error* occurred
+            elapsed (float): Transaction duration in seconds
+            error (Exception): Exception raised by the transaction, defaults to None
+        '''
+        codes = [req[:2] for req in request.split(';')[:-1]]
+        key = codes[0] if len(codes) == 1 else 'batch'
+        index = bisect.bisect_left(self.buckets, elapsed)
+
+        with self._lock:
+            self._transactions += 1
+            self._bytes_out += len(request)
+
+            for code in codes:
+                self._requests[code] = self._requests.get(code, 0) + 1
+
+            if key not in self._histograms:
+                self._histograms[key] = [0] * (len(self.buckets) + 1)
+                self._latency_sum[key] = 0
+
+            self._histograms[key][index] += 1
+            self._latency_sum[key] += elapsed
+
+            if error is not None:
+                self._errors += 1
+                return
+
+            self._bytes_in += sum([len(response) for response in responses])
+            self._timeouts += max(0, count - len(responses))
+            self._rejections += responses.count('?;')
+
+    def record_reconnect(self):
+        '''Record a serial port reconnect after a lost connection.'''
+        with self._lock:
+            self._reconnects += 1
+
+    def snapshot(self):
+        '''Get a snapshot of all metrics.
+
+        Returns:
+            dict: Metrics snapshot (see example below)
+
+        Snapshot structure:
+        ```
+        {
+            'transactions': int,
+            'timeouts': int,
+            'rejections': int,
+            'errors': int,
+            'reconnects': int,
+            'bytes_out': int,
+            'bytes_in': int,
+            'requests': {'CMD': int, ...},
+            'latency': {
+                'CMD': {'count': int, 'sum': float, 'buckets': {upper bound: cumulative count, ..., 'inf': int}},
+                ...
+            }
+        }
+        ```
+        '''
+        with self._lock:
+            latency = {}
+
+            for key, counts in self._histograms.items():
+                cumulative = 0
+                buckets = {}
+
+                for bound, bucket_count in zip(self.buckets + ('inf',), counts):
+                    cumulative += bucket_count
+                    buckets[bound] = cumulative
+
+                latency[key] = {'count': cumulative, 'sum': self._latency_sum[key], 'buckets': buckets}
+
+            return {
+                'transactions': self._transactions,
+                'timeouts': self._timeouts,
+                'rejections': self._rejections,
+                'errors': self._errors,
+                'reconnects': self._reconnects,
+                'bytes_out': self._bytes_out,
+                'bytes_in': self._bytes_in,
+                'requests': dict(self._requests),
+                'latency': latency
+            }
+
+    def to_json(self):
+        '''Export metrics as JSON.
+
+        Returns:
+            str: JSON encoded `Stats.snapshot`
+        '''
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self, labels=None, prefix='qdxcat'):
+        '''Export metrics in Prometheus text exposition format.
+
+        Args:
+            labels (dict): Labels added to all metrics (ex. `{'port': '/dev/ttyACM0'}`), defaults to None
+            prefix (str): Metric name prefix, defaults to 'qdxcat'
+
+        Returns:
+            str: Prometheus text exposition format metrics
+        '''
+        snapshot = self.snapshot()
+        labels = dict(labels or {})
+        lines = []
+
+        def format_labels(extra=None):
+            items = dict(labels)
+            items.update(extra or {})
+
+            if len(items) == 0:
+                return ''
+
+            return '{' + ','.join( ['{}="{}"'.format(key, str(value).replace('"', '\\"')) for key, value in items.items()] ) + '}'
+
+        for name in ['transactions', 'timeouts', 'rejections', 'errors', 'reconnects', 'bytes_out', 'bytes_in']:
+            lines.append('# TYPE {}_{}_total counter'.format(prefix, name))
+            lines.append('{}_{}_total{} {}'.format(prefix, name, format_labels(), snapshot[name]))
+
+        lines.append('# TYPE {}_requests_total counter'.format(prefix))
+        for cmd, count in sorted(snapshot['requests'].items()):
+            lines.append('{}_requests_total{} {}'.format(prefix, format_labels({'command': cmd}), count))
+
+        lines.append('# TYPE {}_latency_seconds histogram'.format(prefix))
+        for cmd, histogram in sorted(snapshot['latency'].items()):
+            for bound, count in histogram['buckets'].items():
+                le = '+Inf' if bound == 'inf' else repr(bound)
+                lines.append('{}_latency_seconds_bucket{} {}'.format(prefix, format_labels({'command': cmd, 'le': le}), count))
+
+            lines.append('{}_latency_seconds_sum{} {}'.format(prefix, format_labels({'command': cmd}), histogram['sum']))
+            lines.append('{}_latency_seconds_count{} {}'.format(prefix, format_labels({'command': cmd}), histogram['count']))
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,443 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''Telemetry time series with bounded memory.
+
+A `Telemetry` recorder samples QDX settings at a fixed interval into preallocated, typed ring buffers, so memory use is fixed by the buffer capacity regardless of run length. Samples can be downsampled on the fly (ex. one stored sample per minute from one second polls). Queries such as TX duty cycle and frequency dwell histograms run over whole columns, vectorized with NumPy if it is installed. Samples export to CSV, or to NumPy `.npz` files.
+
+Example:
+```
+import qdxcat
+qdx = qdxcat.QDX()
+
+# one stored sample per minute for 30 days
+telemetry = qdx.start_telemetry(interval = 1, downsample = 60, capacity = 30 * 24 * 60)
+
+telemetry.duty_cycle()
+telemetry.dwell_histogram()
+telemetry.export_csv('telemetry.csv')
+```
+'''
+
+__docformat__ = 'google'
+
+import csv
+import time
+import array
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from qdxcat.commands import INT, VERSION, COMMAND_SPECS
+from qdxcat.state import RADIO_INFO_FIELDS, RadioInfo
+
+
+class RingBuffer:
+    '''Fixed capacity typed ring buffer, oldest values are overwritten when full.
+
+    Attributes:
+        capacity (int): Maximum number of values
+    '''
+
+    __slots__ = ('capacity', '_data', '_index', '_count')
+
+    def __init__(self, capacity, typecode='d'):
+        '''Initialize RingBuffer instance object.
+
+        Args:
+            capacity (int): Maximum number of values
+            typecode (str): *array.array* type code, defaults to 'd'
+
+        Returns:
+            qdxcat.telemetry.RingBuffer: Constructed RingBuffer object
+        '''
+        self.capacity = capacity
+        # preallocated, no allocation while appending
+        self._data = array.array(typecode, [0]) * capacity
+        self._index = 0
+        self._count = 0
+
+    def append(self, value):
+        '''Append a value.
+
+        Args:
+            value: Value, converted to the buffer type
+        '''
+        self._data[self._index] = value
+        self._index = (self._index + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def values(self):
+        '''Get values in order, oldest first.
+
+        Returns:
+            array.array: Copy of the buffered values
+        '''
+        if self._count < self.capacity:
+            return self._data[:self._count]
+
+        return self._data[self._index:] + self._data[:self._index]
+
+    def clear(self):
+        '''Remove all values.'''
+        self._index = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+
+class Telemetry:
+    '''Telemetry recorder for a single QDX.
+
+    Each command is stored in one float column, QDX.RADIO_INFO_DICT is stored as one column per QDX.RADIO_INFO field (ex. '_IF.vfo_freq'). Failed readings are stored as NaN. When downsampling, PTT state columns store the mean of the aggregated samples (the fraction of time transmitting), and all other columns store the last sample.
+
+    Attributes:
+        commands (list): Command strings sampled
+        columns (list): Column names, starting with 'timestamp' (*time.time()*)
+        interval (float): Sample interval in seconds
+        downsample (int): Number of samples aggregated into each stored sample
+        capacity (int): Maximum number of stored samples per column
+        last_error (Exception): Exception raised by the last sample, or None
+    '''
+
+    def __init__(self, qdx, commands=None, capacity=86400, interval=1, downsample=1):
+        '''Initialize Telemetry instance object.
+
+        Args:
+            qdx (qdxcat.QDX): QDX object to sample
+            commands (list): Command strings to sample, defaults to None (QDX.VFO_A, QDX.TX_STATE, and QDX.RADIO_INFO_DICT)
+            capacity (int): Maximum number of stored samples per column, defaults to 86400
+            interval (float): Sample interval in seconds, defaults to 1
+            downsample (int): Number of samples aggregated into each stored sample, defaults to 1 (no downsampling)
+
+        Returns:
+            qdxcat.telemetry.Telemetry: Constructed Telemetry object
+
+        Raises:
+            ValueError: Invalid QDX command (not in QDX.COMMANDS)
+            ValueError: Command is not gettable (not in QDX.GET_COMMANDS)
+            ValueError: Command values are not numeric (ex. QDX.RADIO_INFO)
+        '''
+        if commands is None:
+            commands = [qdx.VFO_A, qdx.TX_STATE, qdx.RADIO_INFO_DICT]
+
+        self.commands = list(commands)
+        self.columns = ['timestamp']
+
+        for cmd in self.commands:
+            qdx._validate(cmd, qdx.GET_COMMANDS)
+
+            if cmd == qdx.RADIO_INFO_DICT:
+                self.columns.extend( ['{}.{}'.format(cmd, name) for name, start, end in RADIO_INFO_FIELDS] )
+            elif COMMAND_SPECS[cmd].type in (INT, VERSION):
+                self.columns.append(cmd)
+            else:
+                raise ValueError('Command values are not numeric: {}'.format(cmd))
+
+        self.interval = interval
+        self.downsample = max(1, int(downsample))
+        self.capacity = capacity
+        self.last_error = None
+
+        self._qdx = qdx
+        self._buffers = {column: RingBuffer(capacity) for column in self.columns}
+        # columns averaged when downsampling
+        self._mean_columns = frozenset([qdx.TX_STATE, '{}.tx'.format(qdx.RADIO_INFO_DICT)])
+        self._sums = dict.fromkeys(self.columns, 0.0)
+        self._samples = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        '''bool: Whether the sampling thread is running'''
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        '''Start the sampling thread, if not already running.'''
+        if self.running:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='qdxcat-telemetry')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        '''Stop the sampling thread.'''
+        self._stop.set()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+        self._thread = None
+
+    def sample(self):
+        '''Read monitored commands once and record a sample.
+
+        Status commands are read with a single QDX.RADIO_INFO request (see `qdxcat.QDX.get_status`), other commands in a single pipelined batch.
+
+        Raises:
+            qdxcat.QDXTimeoutError: No response received before timeout
+            qdxcat.QDXCommandError: Command not understood by the QDX
+        '''
+        qdx = self._qdx
+        status_cmds = [cmd for cmd in self.commands if cmd in qdx.STATUS_COMMANDS or cmd == qdx.RADIO_INFO_DICT]
+        other_cmds = [cmd for cmd in self.commands if cmd not in status_cmds]
+        values = {}
+
+        if len(status_cmds) > 0:
+            values.update( qdx.get_status(max_age=0) )
+
+        if len(other_cmds) > 0:
+            values.update( qdx.get_many(other_cmds, update=True) )
+
+        self.record(values)
+
+    def record(self, values, timestamp=None):
+        '''Record a sample.
+
+        Args:
+            values (dict): Map of commands to command values, missing commands are recorded as NaN
+            timestamp (float): Sample time (*time.time()*), defaults to None (now)
+        '''
+        row = {'timestamp': time.time() if timestamp is None else timestamp}
+        nan = float('nan')
+
+        for cmd in self.commands:
+            value = values.get(cmd)
+
+            if cmd == self._qdx.RADIO_INFO_DICT:
+                fields = value.fields if isinstance(value, RadioInfo) else [nan] * len(RADIO_INFO_FIELDS)
+
+                for (name, start, end), field in zip(RADIO_INFO_FIELDS, fields):
+                    row['{}.{}'.format(cmd, name)] = field
+            else:
+                row[cmd] = nan if value is None or isinstance(value, Exception) else value
+
+        with self._lock:
+            self._samples += 1
+
+            for column in self._mean_columns.intersection(self.columns):
+                self._sums[column] += row[column]
+
+            if self._samples < self.downsample:
+                return
+
+            for column in self.columns:
+                value = self._sums[column] / self._samples if column in self._mean_columns else row[column]
+                self._buffers[column].append(value)
+                self._sums[column] = 0.0
+
+            self._samples = 0
+
+    def clear(self):
+        '''Remove all stored samples.'''
+        with self._lock:
+            for buffer in self._buffers.values():
+                buffer.clear()
+
+            self._sums = dict.fromkeys(self.columns, 0.0)
+            self._samples = 0
+
+    def to_columns(self):
+        '''Get stored samples as columns, oldest first.
+
+        Returns:
+            dict: Map of column names to *numpy.ndarray* columns if NumPy is installed, otherwise *array.array* columns
+        '''
+        with self._lock:
+            columns = {column: buffer.values() for column, buffer in self._buffers.items()}
+
+        if numpy is not None:
+            return {column: numpy.frombuffer(values, dtype=numpy.float64) for column, values in columns.items()}
+
+        return columns
+
+    def __len__(self):
+        return len(self._buffers['timestamp'])
+
+    def duty_cycle(self, start=None, end=None):
+        '''Get the fraction of time spent transmitting.
+
+        Each stored sample is weighted by the time until the next sample (the last sample by the nominal sample period).
+
+        Args:
+            start (float): Earliest sample time (*time.time()*), defaults to None (oldest sample)
+            end (float): Latest sample time (*time.time()*), defaults to None (newest sample)
+
+        Returns:
+            float: TX duty cycle from 0 to 1, or None if there are no samples
+
+        Raises:
+            ValueError: PTT state not sampled (QDX.TX_STATE or QDX.RADIO_INFO_DICT)
+        '''
+        column = self._column(self._qdx.TX_STATE, 'tx')
+        timestamps, values, weights = self._weighted(column, start, end)
+
+        if numpy is not None:
+            valid = ~numpy.isnan(values)
+            total = weights[valid].sum()
+            return float((values[valid] * weights[valid]).sum() / total) if total > 0 else None
+
+        pairs = [(value, weight) for value, weight in zip(values, weights) if value == value]
+        total = sum([weight for value, weight in pairs])
+        return sum([value * weight for value, weight in pairs]) / total if total > 0 else None
+
+    def dwell_histogram(self, bin_width=1, start=None, end=None):
+        '''Get the time spent on each frequency.
+
+        Args:
+            bin_width (int): Frequency bin width in Hz, defaults to 1
+            start (float): Earliest sample time (*time.time()*), defaults to None (oldest sample)
+            end (float): Latest sample time (*time.time()*), defaults to None (newest sample)
+
+        Returns:
+            dict: Map of bin start frequencies in Hz to seconds, sorted by frequency
+
+        Raises:
+            ValueError: Frequency not sampled (QDX.VFO_A or QDX.RADIO_INFO_DICT)
+        '''
+        column = self._column(self._qdx.VFO_A, 'vfo_freq')
+        timestamps, values, weights = self._weighted(column, start, end)
+
+        if numpy is not None:
+            valid = ~numpy.isnan(values)
+            bins = (values[valid] // bin_width * bin_width).astype(numpy.int64)
+            frequencies, inverse = numpy.unique(bins, return_inverse=True)
+            seconds = numpy.bincount(inverse, weights=weights[valid], minlength=len(frequencies))
+            return {int(frequency): float(total) for frequency, total in zip(frequencies, seconds)}
+
+        histogram = {}
+
+        for value, weight in zip(values, weights):
+            if value == value:
+                frequency = int(value // bin_width * bin_width)
+                histogram[frequency] = histogram.get(frequency, 0) + weight
+
+        return dict(sorted(histogram.items()))
+
+    def export_csv(self, path):
+        '''Export stored samples to a CSV file, one column per `Telemetry.columns` entry.
+
+        Args:
+            path (str): CSV file path
+        '''
+        columns = self.to_columns()
+
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            writer.writerows( zip(*[columns[column] for column in self.columns]) )
+
+    def export_npz(self, path):
+        '''Export stored samples to a NumPy `.npz` file, one array per column.
+
+        Args:
+            path (str): File path
+
+        Raises:
+            ImportError: NumPy is not installed
+        '''
+        if numpy is None:
+            raise ImportError('NumPy is required to export .npz files')
+
+        numpy.savez_compressed(path, **self.to_columns())
+
+    def _column(self, cmd, field):
+        '''Get the column storing a command, or a QDX.RADIO_INFO field if the command is not sampled.
+
+        Args:
+            cmd (str): Command string
+            field (str): QDX.RADIO_INFO field name
+
+        Returns:
+            str: Column name
+
+        Raises:
+            ValueError: Neither column is sampled
+        '''
+        if cmd in self.columns:
+            return cmd
+
+        column = '{}.{}'.format(self._qdx.RADIO_INFO_DICT, field)
+
+        if column in self.columns:
+            return column
+
+        raise ValueError('Command not sampled: {}'.format(cmd))
+
+    def _weighted(self, column, start=None, end=None):
+        '''Get a column with sample durations, limited to a time range.
+
+        Args:
+            column (str): Column name
+            start (float): Earliest sample time, defaults to None
+            end (float): Latest sample time, defaults to None
+
+        Returns:
+            tuple: (timestamps, values, durations in seconds), *numpy.ndarray* if NumPy is installed, otherwise lists
+        '''
+        columns = self.to_columns()
+        timestamps = columns['timestamp']
+        values = columns[column]
+        period = self.interval * self.downsample
+
+        if numpy is not None:
+            mask = numpy.ones(len(timestamps), dtype=bool)
+
+            if start is not None:
+                mask &= timestamps >= start
+            if end is not None:
+                mask &= timestamps <= end
+
+            timestamps = timestamps[mask]
+            values = values[mask]
+            weights = numpy.append(numpy.diff(timestamps), period) if len(timestamps) > 0 else numpy.zeros(0)
+            return timestamps, values, weights
+
+        rows = [(timestamp, value) for timestamp, value in zip(timestamps, values) if (start is None or timestamp >= start) and (end is None or timestamp <= end)]
+        timestamps = [timestamp for timestamp, value in rows]
+        values = [value for timestamp, value in rows]
+        weights = [later - earlier for earlier, later in zip(timestamps, timestamps[1:])] + ([period] if len(rows) > 0 else [])
+        return timestamps, values, weights
+
+    def _run(self):
+        '''Sampling thread loop.'''
+        next_sample = time.monotonic()
+
+        while not self._stop.is_set():
+            try:
+                self.sample()
+                self.last_error = None
+            except Exception as e:
+                # try again next interval (ex. device temporarily disconnected)
+                self.last_error = e
+
+            next_sample += self.interval
+            self._stop.wait( max(0, next_sample - time.monotonic()) )
@@ -0,0 +1,114 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''Pluggable serial transports.
+
+A transport is a callable with the signature `transport(device, baudrate, timeout)` that returns an open serial port object. The default transport is `serial.Serial`. Any object implementing the subset of the pySerial API described by `Transport` can be used, for example `qdxcat.emulator.LoopbackTransport` to run without a QDX attached.
+
+Example:
+```
+import qdxcat
+from qdxcat.emulator import QDXEmulator
+
+emulator = QDXEmulator()
+qdx = qdxcat.QDX('emulator', transport = emulator.transport)
+```
+'''
+
+__docformat__ = 'google'
+
+import serial
+
+
+def serial_transport(device, baudrate=9600, timeout=1):
+    '''Default transport, opens a pySerial serial port.
+
+    Args:
+        device (str): Windows COM port (ex. 'COM42') or Unix serial device path (ex. '/dev/ttyACM0')
+        baudrate (int): Serial port baudrate, defaults to 9600
+        timeout (int): Serial port timeout in seconds, defaults to 1
+
+    Returns:
+        serial.Serial: Open serial port
+    '''
+    return serial.Serial(device, baudrate, timeout=timeout)
+
+
+class Transport:
+    '''Serial port interface required by qdxcat (subset of the pySerial `serial.Serial` API).
+
+    Subclasses implement `Transport.read`, `Transport.write`, `Transport.in_waiting`, and `Transport.close`. Transports that provide a `fileno()` method returning a selectable file descriptor are read via event loop file descriptor monitoring by `qdxcat.AsyncQDX`.
+
+    Attributes:
+        timeout (float): Read timeout in seconds, 0 for non-blocking reads, or None to block until *size* bytes are received
+        is_open (bool): Whether the transport is open
+    '''
+
+    def __init__(self, timeout=1):
+        '''Initialize Transport instance object.
+
+        Args:
+            timeout (float): Read timeout in seconds, defaults to 1
+        '''
+        self.timeout = timeout
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        '''int: Number of bytes available to read without blocking'''
+        raise NotImplementedError
+
+    def read(self, size=1):
+        '''Read bytes, blocking until *size* bytes are received or the timeout expires.
+
+        Args:
+            size (int): Number of bytes to read, defaults to 1
+
+        Returns:
+            bytes: Received bytes, may be shorter than *size* if the timeout expired
+        '''
+        raise NotImplementedError
+
+    def write(self, data):
+        '''Write bytes.
+
+        Args:
+            data (bytes): Bytes to write
+
+        Returns:
+            int: Number of bytes written
+        '''
+        raise NotImplementedError
+
+    def reset_input_buffer(self):
+        '''Discard all bytes available to read.'''
+        self.read(self.in_waiting)
+
+    def close(self):
+        '''Close the transport.'''
+        self.is_open = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,151 @@
+# MIT License
+#
+# Copyright (c) 2022-2023 Simply Equipped
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''Serial port I/O worker thread.
+
+All serial traffic for a `qdxcat.QDX` object is executed by a single worker thread that serves a priority queue, so requests from multiple threads never interleave on the serial port and time critical requests (ex. PTT) are processed before queued bulk requests.
+'''
+
+__docformat__ = 'google'
+
+import queue
+import itertools
+import threading
+import concurrent.futures
+
+
+class SerialWorker:
+    '''Single thread executing queued operations in priority order.
+
+    Lower priority values are processed first. Operations with the same priority are processed in the order they were submitted. The worker thread is started on first use.
+    '''
+
+    def __init__(self, name='qdxcat-worker'):
+        '''Initialize SerialWorker instance object.
+
+        Args:
+            name (str): Worker thread name, defaults to 'qdxcat-worker'
+
+        Returns:
+            qdxcat.worker.SerialWorker: Constructed SerialWorker object
+        '''
+        self._name = name
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, priority=5, **kwargs):
+        '''Queue an operation for the worker thread.
+
+        Args:
+            fn (callable): Function to call on the worker thread
+            *args: Positional arguments passed to *fn*
+            priority (int): Operation priority, lower values are processed first, defaults to 5
+            **kwargs: Keyword arguments passed to *fn*
+
+        Returns:
+            concurrent.futures.Future: Future resolved with the return value of *fn*, or the exception raised by *fn*
+        '''
+        future = concurrent.futures.Future()
+
+        with self._lock:
+            self._start()
+            # counter breaks priority ties in submission order
+            self._queue.put( (priority, next(self._counter), future, fn, args, kwargs) )
+
+        return future
+
+    def call(self, fn, *args, priority=5, **kwargs):
+        '''Call an operation on the worker thread and wait for the result.
+
+        If called from the worker thread the operation is called directly, which allows queued operations to call other operations.
+
+        Args:
+            fn (callable): Function to call on the worker thread
+            *args: Positional arguments passed to *fn*
+            priority (int): Operation priority, lower values are processed first, defaults to 5
+            **kwargs: Keyword arguments passed to *fn*
+
+        Returns:
+            Return value of *fn*
+
+        Raises:
+            Exception raised by *fn*
+        '''
+        if self.in_worker_thread():
+            return fn(*args, **kwargs)
+
+        return self.submit(fn, *args, priority=priority, **kwargs).result()
+
+    def in_worker_thread(self):
+        '''Whether the current thread is the worker thread.
+
+        Returns:
+            bool: True if called from the worker thread, False otherwise
+        '''
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def stop(self):
+        '''Stop the worker thread after all queued operations are processed.'''
+        with self._lock:
+            if self._thread is None:
+                return
+
+            # queued operations are processed before the stop request
+            self._queue.put( (float('inf'), next(self._counter), None, None, (), {}) )
+            # a restarted worker thread uses a new queue
+            self._queue = queue.PriorityQueue()
+            self._thread = None
+
+    def _start(self):
+        '''Start the worker thread, if not already running. Must be called while holding the worker lock.'''
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, args=(self._queue,), name=self._name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, operations):
+        '''Worker thread loop.
+
+        Args:
+            operations (queue.PriorityQueue): Queue of operations to process
+        '''
+        while True:
+            priority, count, future, fn, args, kwargs = operations.get()
+
+            if fn is None:
+                # stop requested
+                break
+
+            if not future.set_running_or_notify_cancel():
+                # cancelled while queued
+                continue
+
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
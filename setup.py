@@ -14,6 +14,9 @@ setuptools.setup(
     url='https://github.com/simplyequipped/qdxcat',
     packages=setuptools.find_packages(),
     install_requires=['pyserial'],
+    entry_points={
+        'console_scripts': ['qdxcat-broker=qdxcat.broker:main', 'qdxcat-rigctld=qdxcat.rigctld:main']
+    },
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',
@@ -21,6 +24,6 @@ setuptools.setup(
         'Operating System :: MacOS :: MacOS X',
         'Operating System :: Microsoft :: Windows'
     ],
-    python_requires='>=3.6'
+    python_requires='>=3.7'
 )
 
@@ -1,104 +1,981 @@
-import sys
-import qdx
-
-radio = qdx.QDX()
-
-if radio.port:
-    print('QDX found at' + radio.port)
-else:
-    print('QDX not found')
-    exit()
-
-tx = False
-for arg in sys.argv:
-    if arg.lower() in ['--tx', '-t']:
-        tx = True
-
-total = 0
-passed = 0
-failed = 0
-skipped = 0
-
-failed_cmds = {}
-skipped_cmds = {}
-
-for cmd in radio.commands:
-    print('\n' + cmd['label'] + ' (' + cmd['cmd'] + ')')
-
-    # skip tx command unless specified by user
-    if cmd['cmd'] == 'TX' and tx == False:
-        print('   skipping TX command')
-        total += 1
-        skipped += 1
-        skipped_cmds[cmd['cmd']] = cmd['label']
-        continue
-
-    # get test
+import json
+import math
+import time
+import queue
+import socket
+import threading
+import asyncio
+import threading
+import concurrent.futures
+
+import pytest
+from serial.tools.list_ports_common import ListPortInfo
+
+import qdxcat
+import qdxcat.cache
+from qdxcat.emulator import QDXEmulator
+from qdxcat.recorder import Replay, read_records
+from qdxcat.rigctld import RigctlServer
+from qdxcat.worker import SerialWorker
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # keep capability and settings caches out of the user cache directory
+    monkeypatch.setattr(qdxcat.cache, 'DEFAULT_CACHE_DIR', str(tmp_path))
+
+@pytest.fixture
+def emulator():
+    return QDXEmulator()
+
+@pytest.fixture
+def radio(emulator):
+    radio = qdxcat.QDX(autodetect=False, persistent=True, transport=emulator.transport)
+    radio.set_port('emulator', sync=False)
+    yield radio
+    radio.close()
+
+
+@pytest.mark.parametrize('cmd', [cmd for cmd in qdxcat.QDX.GET_COMMANDS if cmd != qdxcat.QDX.TX_STATE])
+def test_get(radio, cmd):
+    assert radio.get(cmd, update=True) is not None
+
+@pytest.mark.parametrize('cmd', [cmd for cmd in qdxcat.QDX.SET_COMMANDS if cmd in qdxcat.QDX.GET_COMMANDS])
+def test_set(radio, emulator, cmd):
+    spec = qdxcat.COMMAND_SPECS[cmd]
+    value = list(spec.options)[-1] if spec.options is not None else min(7078000, spec.maximum or 7078000)
+
+    radio.set(cmd, value)
+    assert emulator.state[cmd] == value
+    assert radio.get(cmd, update=True) == value
+
+def test_radio_info(radio, emulator):
+    radio.set(qdxcat.QDX.VFO_A, 14074000)
+    emulator.process(b'RU150;')
+    info = radio.get(qdxcat.QDX.RADIO_INFO_DICT, update=True)
+
+    assert info['vfo_freq'] == 14074000
+    assert info['rit_offset'] == 150
+    assert info['mode'] == 'USB'
+    assert len( emulator.format_radio_info() ) == len('00014074000     +00150000003000000 ')
+
+def test_ptt(radio, emulator):
+    radio.ptt_on()
+    assert emulator.state['TQ'] == 1
+    radio.toggle_ptt()
+    assert radio.get(qdxcat.QDX.TX_STATE, update=True) == 0
+
+def test_version(radio):
+    assert radio.get(qdxcat.QDX.VERSION, update=True) == 1.07
+
+def test_unsupported_firmware():
+    radio = qdxcat.QDX(autodetect=False, transport=QDXEmulator(version=1.05).transport)
+    radio.set_port('emulator', sync=False)
+
+    with pytest.raises(qdxcat.QDXCommandError):
+        radio.get(qdxcat.QDX.VOX_EN, update=True)
+
+    radio.close()
+
+def test_invalid_request(emulator):
+    assert emulator.process(b'MD2;') == b'?;'
+    assert emulator.process(b'ZZ;') == b'?;'
+    assert emulator.process(b'FA;ZZ;MD;') == b'FA00007074000;?;MD3;'
+
+def test_get_many(radio, emulator):
+    emulator.state['FB'] = 10136000
+    assert radio.get_many([qdxcat.QDX.VFO_B, qdxcat.QDX.OPERATING_MODE], update=True) == {'FB': 10136000, 'MD': 3}
+
+def test_sync_local_settings(radio):
+    radio.sync_local_settings()
+    assert radio.settings[qdxcat.QDX.RADIO_ID] == 20
+    assert radio.settings[qdxcat.QDX.TXCO_FREQ] == 25000000
+
+def test_latency():
+    radio = qdxcat.QDX(autodetect=False, transport=QDXEmulator(latency=0.05).transport)
+    radio.set_port('emulator', sync=False)
+
+    start = time.monotonic()
+    radio.get(qdxcat.QDX.VFO_A, update=True)
+    assert time.monotonic() - start >= 0.05
+    radio.close()
+
+def test_pty(emulator):
+    device = emulator.open_pty()
+
+    try:
+        radio = qdxcat.QDX(autodetect=False, persistent=True)
+        radio.set_port(device, sync=False)
+        assert radio.get(qdxcat.QDX.RADIO_ID, update=True) == 20
+        radio.close()
+    finally:
+        emulator.close()
+
+def test_async(emulator):
+    async def run():
+        radio = qdxcat.AsyncQDX('emulator', transport=emulator.transport)
+        await radio.set_port('emulator', sync=False)
+        await radio.set(qdxcat.QDX.VFO_B, 3573000)
+        value = await radio.get(qdxcat.QDX.VFO_B, update=True)
+        values = await radio.get_many([qdxcat.QDX.VFO_A, qdxcat.QDX.OPERATING_MODE], update=True)
+        deferred = await radio.set(qdxcat.QDX.TX_RISE, 8, verify=qdxcat.QDX.VERIFY_DEFERRED)
+        results = await radio.transaction({qdxcat.QDX.VFO_A: 7078000, qdxcat.QDX.TX_FALL: 8})
+        await radio.ptt_on()
+        radio.close()
+        return value, values, await deferred, results
+
+    assert asyncio.run(run()) == (3573000, {'FA': 7074000, 'MD': 3}, 8, {qdxcat.QDX.VFO_A: 7078000, qdxcat.QDX.TX_FALL: 8})
+    assert emulator.state['TQ'] == 1
+
+def test_reconnect(emulator):
+    opened = []
+    failures = [0]
+
+    def transport(device, baudrate=9600, timeout=1):
+        port = emulator.transport(device, baudrate, timeout)
+        write = port.write
+
+        def failing_write(data):
+            if failures[0] > 0:
+                failures[0] -= 1
+                raise OSError('device unplugged')
+
+            return write(data)
+
+        port.write = failing_write
+        opened.append(port)
+        return port
+
+    radio = qdxcat.QDX(autodetect=False, persistent=True, transport=transport)
+    radio.set_port('emulator', sync=False)
+    radio.enable_stats()
+
+    # serial port stays open across requests
+    for i in range(3):
+        radio.get(qdxcat.QDX.VFO_A, update=True)
+
+    assert len(opened) == 1 and opened[0].is_open
+
+    # lost connection is re-opened and the request retried
+    failures[0] = 1
+    assert radio.get(qdxcat.QDX.VFO_A, update=True) == emulator.state['FA']
+    assert len(opened) == 2 and not opened[0].is_open
+    assert radio.stats()['reconnects'] == 1
+
+    # retry fails too, the next request re-opens the serial port
+    failures[0] = 2
+    with pytest.raises(OSError):
+        radio.get(qdxcat.QDX.VFO_A, update=True)
+
+    assert radio.get(qdxcat.QDX.VFO_A, update=True) == emulator.state['FA']
+    assert len(opened) == 4
+
+    radio.close()
+    assert not opened[-1].is_open
+
+def test_single_request(emulator):
+    opened = []
+
+    def transport(device, baudrate=9600, timeout=1):
+        opened.append( emulator.transport(device, baudrate, timeout) )
+        return opened[-1]
+
+    radio = qdxcat.QDX(autodetect=False, transport=transport)
+    radio.set_port('emulator', sync=False)
+
+    # serial port opened and closed for each request
+    for i in range(2):
+        radio.get(qdxcat.QDX.VFO_A, update=True)
+
+    assert len(opened) == 2
+    assert not any(port.is_open for port in opened)
+    radio.close()
+
+def test_close(emulator):
+    radio = qdxcat.QDX(autodetect=False, transport=emulator.transport)
+    radio.set_port('emulator', sync=False)
+
+    with radio:
+        radio.get(qdxcat.QDX.VFO_A, update=True)
+        thread = radio._worker._thread
+
+    # worker thread stopped on close
+    thread.join(timeout=1)
+    assert not thread.is_alive()
+
+    # and restarted by later requests
+    assert radio.get(qdxcat.QDX.VFO_A, update=True) == emulator.state['FA']
+    radio.close()
+
+def test_errors(emulator):
+    radio = qdxcat.QDX(autodetect=False, transport=emulator.transport)
+    radio.set_port('emulator', timeout=0.1, sync=False)
+
+    # '?;' response
+    emulator.version = 1.05
+    with pytest.raises(qdxcat.QDXCommandError):
+        radio.get(qdxcat.QDX.VOX_EN, update=True)
+
+    # silent device
+    emulator.latency = 0.3
+    with pytest.raises(qdxcat.QDXTimeoutError):
+        radio.get(qdxcat.QDX.VFO_A, update=True)
+
+    radio.close()
+
+def test_get_many_rejection(radio, emulator):
+    emulator.version = 1.05
+    requests = emulator.requests
+
+    # unsupported command between supported commands in a single batch
+    with pytest.raises(qdxcat.QDXCommandError, match='Q3;'):
+        radio.get_many([qdxcat.QDX.VFO_A, qdxcat.QDX.VOX_EN, qdxcat.QDX.AUDIO_GAIN], update=True)
+
+    assert emulator.requests == requests + 3
+    # other results are stored and returned without serial I/O
+    assert radio.get_many([qdxcat.QDX.VFO_A, qdxcat.QDX.AUDIO_GAIN]) == {qdxcat.QDX.VFO_A: emulator.state['FA'], qdxcat.QDX.AUDIO_GAIN: emulator.state['AG']}
+    assert emulator.requests == requests + 3
+
+def test_set_many(radio, emulator):
+    assert radio.set_many({qdxcat.QDX.VFO_A: 10136000, qdxcat.QDX.AUDIO_GAIN: 3}) == {'FA': 10136000, 'AG': 3}
+    assert (emulator.state['FA'], emulator.state['AG']) == (10136000, 3)
+
+def test_worker_priority():
+    worker = SerialWorker()
+    blocked = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def block():
+        blocked.set()
+        release.wait(timeout=5)
+
+    worker.submit(block)
+    assert blocked.wait(timeout=5)
+
+    # queued while the worker is busy
+    futures = [worker.submit(order.append, 'bulk{}'.format(i), priority=qdxcat.QDX.PRIORITY_BULK) for i in range(3)]
+    futures.append( worker.submit(order.append, 'default', priority=qdxcat.QDX.PRIORITY_DEFAULT) )
+    futures.append( worker.submit(order.append, 'freq', priority=qdxcat.QDX.PRIORITY_FREQ) )
+    futures.append( worker.submit(order.append, 'ptt', priority=qdxcat.QDX.PRIORITY_PTT) )
+    release.set()
+    concurrent.futures.wait(futures, timeout=5)
+    assert order == ['ptt', 'freq', 'default', 'bulk0', 'bulk1', 'bulk2']
+
+    # re-entrant call from the worker thread runs directly instead of queueing
+    def outer():
+        return worker.call(threading.current_thread), threading.current_thread()
+
+    inner_thread, outer_thread = worker.submit(outer).result(timeout=5)
+    assert inner_thread is outer_thread and worker.in_worker_thread() is False
+    worker.stop()
+
+def test_cache_ttl(radio, emulator):
+    radio.cache_ttl[qdxcat.QDX.VFO_B] = 0.05
+
+    # fresh values are returned without serial I/O
+    requests = emulator.requests
+    value = radio.get(qdxcat.QDX.VFO_B)
+    assert radio.get(qdxcat.QDX.VFO_B) == value
+    assert emulator.requests == requests + 1
+
+    # expired values are re-read
+    time.sleep(0.06)
+    radio.get(qdxcat.QDX.VFO_B)
+    assert emulator.requests == requests + 2
+
+    # max_age=0 always reads, commands without a time-to-live never expire
+    radio.get(qdxcat.QDX.VFO_B, max_age=0)
+    assert emulator.requests == requests + 3
+    radio.get(qdxcat.QDX.AUDIO_GAIN)
+    radio.get(qdxcat.QDX.AUDIO_GAIN)
+    assert emulator.requests == requests + 4
+    radio.get(qdxcat.QDX.AUDIO_GAIN, max_age=0)
+    assert emulator.requests == requests + 5
+
+    # writes invalidate dependent IF-derived settings
+    for cmd, value, dependents, field, field_value in [
+        (qdxcat.QDX.VFO_A, 10136000, [qdxcat.QDX.RADIO_INFO_DICT], 'vfo_freq', 10136000),
+        (qdxcat.QDX.OPERATING_MODE, 1, [qdxcat.QDX.RADIO_INFO_DICT], 'mode', 'LSB'),
+        (qdxcat.QDX.SPLIT_MODE, 1, [qdxcat.QDX.RADIO_INFO_DICT, qdxcat.QDX.RX_VFO_MODE, qdxcat.QDX.TX_VFO_MODE], 'split', True)
+    ]:
+        radio.get_many([qdxcat.QDX.RADIO_INFO_DICT, qdxcat.QDX.RX_VFO_MODE, qdxcat.QDX.TX_VFO_MODE])
+        requests = emulator.requests
+        radio.get_many([qdxcat.QDX.RADIO_INFO_DICT, qdxcat.QDX.RX_VFO_MODE, qdxcat.QDX.TX_VFO_MODE])
+        assert emulator.requests == requests
+
+        radio.set(cmd, value)
+        requests = emulator.requests
+
+        for dependent in dependents:
+            radio.get(dependent)
+
+        assert emulator.requests == requests + len(dependents)
+        assert radio.get(qdxcat.QDX.RADIO_INFO_DICT)[field] == field_value
+
+def test_get_status(radio, emulator):
+    emulator.state.update({'TQ': 1, 'MD': 1, 'SP': 1, 'RT': 1})
+    requests = emulator.requests
+
+    # one IF request fills all status settings
+    status = radio.get_status()
+    assert emulator.requests == requests + 1
+    assert status[qdxcat.QDX.VFO_A] == emulator.state['FA']
+    assert (status[qdxcat.QDX.TX_STATE], status[qdxcat.QDX.OPERATING_MODE], status[qdxcat.QDX.SPLIT_MODE], status[qdxcat.QDX.RIT_STATUS]) == (1, 1, 1, 1)
+    assert status[qdxcat.QDX.RADIO_INFO_DICT]['split'] is True
+    assert radio.get_many(qdxcat.QDX.STATUS_COMMANDS) == {cmd: status[cmd] for cmd in qdxcat.QDX.STATUS_COMMANDS}
+    assert emulator.requests == requests + 1
+
+    # receiving on VFO B updates VFO B
+    emulator.state.update({'FR': 1, 'FB': 3573000})
+    radio.get_status(max_age=0)
+    assert emulator.requests == requests + 2
+    assert radio.get(qdxcat.QDX.VFO_B) == 3573000
+    assert radio.get(qdxcat.QDX.RADIO_INFO_DICT)['rx_vfo'] == 'B'
+    assert emulator.requests == requests + 2
+
+    # malformed IF response fails only its own command
+    emulator.format_radio_info = lambda: 'garbage'
+    with pytest.raises(qdxcat.QDXCommandError):
+        radio.get_many([qdxcat.QDX.VFO_A, qdxcat.QDX.RADIO_INFO], update=True)
+
+    assert radio.get(qdxcat.QDX.VFO_A) == emulator.state['FA']
+    assert emulator.requests == requests + 4
+
+    # settings sync continues past the malformed response
+    radio.sync_local_settings()
+    assert radio.settings[qdxcat.QDX.RADIO_INFO] is None
+
+def test_pool(monkeypatch):
+    emulators = {'qdx1': QDXEmulator(), 'qdx2': QDXEmulator(version=1.05), 'other': QDXEmulator(state={'ID': 0})}
+    ports = []
+
+    for device in emulators:
+        port = ListPortInfo(device)
+        port.serial_number = 'SN-' + device
+        ports.append(port)
+
+    monkeypatch.setattr(qdxcat.QDXBase, '_candidate_ports', lambda self: ports)
+    qdxcat.QDX.clear_discovery_cache()
+    transport = lambda device, baudrate=9600, timeout=1: emulators[device].transport(device, baudrate, timeout)
+
     try:
-        total += 1
-        if cmd['get'] is not None:
-            value = radio.command(cmd['cmd'])
-            if value is None:
-                raise Exception('Command not understood')
-    except Exception as e:
-        failed += 1
-        failed_cmds['get ' + cmd['label']] = cmd['cmd']
-        print('   get: fail')
-        print('      ' + str(e))
-    else:
-        if cmd['get'] is None:
-            passed += 1
-            print('   get: None')
-        else:
-            passed += 1
-            print('   get: pass')
-
-            if cmd['map'] is None:
-                print('      ' + str(value))
-            else:
-                for key, val in cmd['map'].items():
-                    if key == str(value):
-                        print('      ' + str(val) + ' (' + str(value) + ')')
-                        break
-
-    # set test
+        pool = qdxcat.QDXPool(timeout=0.2, transport=transport)
+        deadline = time.monotonic() + 5
+
+        # wait for the background settings sync started for each radio
+        while not all(qdxcat.QDX.VERSION in radio.settings for radio in pool) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # all candidates probed, non-QDX devices skipped
+        assert all(emulator.requests > 0 for emulator in emulators.values())
+        assert sorted(pool.ports()) == ['qdx1', 'qdx2']
+        assert len(pool) == 2 and len(pool.radios()) == 2
+        assert pool.get('SN-qdx1') is pool['qdx1']
+        assert pool.get('other') is None
+        assert 'SN-qdx2' in pool and 'SN-other' not in pool
+        assert pool.serial_numbers() == {'qdx1': 'SN-qdx1', 'qdx2': 'SN-qdx2'}
+        assert pool.detect() == []
+
+        # calls are processed by each radio's worker thread
+        threads = []
+        for port in pool.ports():
+            emulator = emulators[port]
+            emulator.process = lambda data, process=emulator.process: threads.append(threading.current_thread()) or process(data)
+
+        assert pool.set_all(qdxcat.QDX.VFO_A, 10136000) == {'qdx1': 10136000, 'qdx2': 10136000}
+        assert all(emulator.state['FA'] == 10136000 for emulator in [emulators['qdx1'], emulators['qdx2']])
+        assert set(threads) == {radio._worker._thread for radio in pool}
+
+        # errors are collected per radio
+        results = pool.get_all(qdxcat.QDX.VOX_EN, update=True)
+        assert results['qdx1'] == emulators['qdx1'].state['Q3']
+        assert isinstance(results['qdx2'], qdxcat.QDXCommandError)
+
+        pool.remove('SN-qdx2')
+        assert pool.ports() == ['qdx1']
+
+        with pytest.raises(KeyError):
+            pool.remove('qdx2')
+
+        threads = [radio._worker._thread for radio in pool]
+        pool.close()
+
+        for thread in threads:
+            thread.join(timeout=1)
+
+        assert not any(thread.is_alive() for thread in threads)
+    finally:
+        qdxcat.QDX.clear_discovery_cache()
+
+
+def test_stats(radio, emulator):
+    assert radio.stats() is None
+
+    requests = []
+    radio.add_request_hook(requests.append)
+    radio.enable_stats()
+
+    radio.get(qdxcat.QDX.VFO_A, update=True)
+    radio.get_many([qdxcat.QDX.VFO_B, qdxcat.QDX.OPERATING_MODE], update=True)
+    emulator.version = 1.05
+
+    with pytest.raises(qdxcat.QDXCommandError):
+        radio.get(qdxcat.QDX.VOX_EN, update=True)
+
+    stats = radio.stats()
+    assert requests == ['FA;', 'FB;MD;', 'Q3;']
+    assert stats['transactions'] == 3
+    assert stats['rejections'] == 1
+    assert stats['requests']['FA'] == 1
+    assert stats['latency']['batch']['count'] == 1
+    assert stats['bytes_out'] == len('FA;FB;MD;Q3;')
+    assert 'qdxcat_requests_total{command="FA"} 1' in radio.metrics.to_prometheus()
+
+def test_command_specs():
+    for cmd in qdxcat.QDX.COMMANDS:
+        spec = qdxcat.COMMAND_SPECS[cmd]
+        assert spec.gettable == (cmd in qdxcat.QDX.GET_COMMANDS)
+        assert spec.settable == (cmd in qdxcat.QDX.SET_COMMANDS)
+
+    assert set(qdxcat.COMMAND_SPECS) == set(qdxcat.QDX.COMMANDS)
+
+@pytest.mark.parametrize('cmd, value', [('MD', 2), ('FA', -1), ('Q4', 101), ('FA', 'abc')])
+def test_set_invalid_value(radio, emulator, cmd, value):
+    with pytest.raises(ValueError):
+        radio.set(cmd, value)
+
+    # rejected before reaching the wire
+    assert emulator.requests == 0
+
+def test_negotiate(tmp_path):
+    emulator = QDXEmulator(version=1.05)
+    radio = qdxcat.QDX(autodetect=False, transport=emulator.transport)
+    radio.capability_cache = str(tmp_path / 'capabilities.json')
+    radio.set_port('emulator', sync=False)
+    # emulated ports have no USB serial number
+    radio._serial_number = 'QDX-TEST'
+
+    assert qdxcat.QDX.VOX_EN not in radio.negotiate()
+    assert radio.firmware_version == 1.05
+
+    # fails locally without serial I/O
+    requests = emulator.requests
+    with pytest.raises(qdxcat.QDXCommandError):
+        radio.get(qdxcat.QDX.VOX_EN, update=True)
+    assert emulator.requests == requests
+
+    # later starts use the capability cache
+    cached = qdxcat.QDX(autodetect=False, transport=emulator.transport)
+    cached.capability_cache = radio.capability_cache
+    cached.set_port('emulator', sync=False)
+    cached._serial_number = 'QDX-TEST'
+    cached.negotiate()
+    assert emulator.requests == requests
+    assert cached.supported_commands == radio.supported_commands
+
+    # firmware update detected by the next sync
+    emulator.version = 1.07
+    cached.sync_local_settings()
+    assert cached.firmware_version == 1.07
+    assert qdxcat.QDX.VOX_EN in cached.supported_commands
+
+    radio.close()
+    cached.close()
+
+def test_settings_snapshot(tmp_path, emulator):
+    def new_radio():
+        radio = qdxcat.QDX(autodetect=False, transport=emulator.transport)
+        radio.capability_cache = None
+        radio.settings_cache = str(tmp_path / 'settings.json')
+        # emulated ports have no USB serial number
+        radio._port = 'emulator'
+        radio._serial_number = 'QDX-TEST'
+        return radio
+
+    radio = new_radio()
+    radio.set_port('emulator', sync=False)
+    radio.sync_local_settings()
+
+    emulator.state['FA'] = 14074000
+    emulator.state['Q4'] = 50
+    restarted = new_radio()
+    restarted.set_port('emulator', sync=False)
+
+    # loaded immediately, without serial I/O
+    requests = emulator.requests
+    assert restarted.get(qdxcat.QDX.TX_RISE) == 10
+    assert restarted.is_stale(qdxcat.QDX.TX_RISE)
+    assert emulator.requests == requests
+
+    info = restarted.settings[qdxcat.QDX.RADIO_INFO_DICT]
+    assert isinstance(info, qdxcat.RadioInfo) and info == radio.settings[qdxcat.QDX.RADIO_INFO_DICT]
+    assert info.raw('mode') == emulator.state['MD']
+
+    # volatile settings are re-read on use
+    assert restarted.get(qdxcat.QDX.VFO_A) == 14074000
+
+    restarted.sync_volatile_settings()
+    assert not restarted.is_stale(qdxcat.QDX.OPERATING_MODE)
+    assert restarted.is_stale(qdxcat.QDX.TX_RISE)
+
+    radio.close()
+    restarted.close()
+
+def test_write_modes(radio, emulator):
+    requests = emulator.requests
+    assert radio.set(qdxcat.QDX.VFO_A, 7074000, verify=qdxcat.QDX.VERIFY_NONE) == 7074000
+    # written without read back
+    assert emulator.requests == requests + 1
+    assert radio.get(qdxcat.QDX.VFO_A) == 7074000
+
+    futures = [radio.set(qdxcat.QDX.VFO_A, 7078000, verify=qdxcat.QDX.VERIFY_DEFERRED), radio.set(qdxcat.QDX.TX_RISE, 8, verify=qdxcat.QDX.VERIFY_DEFERRED)]
+    assert [future.result(timeout=1) for future in futures] == [7078000, 8]
+
+    # written twice before read back, only the latest value is verified
+    futures = radio._worker.call( lambda: [radio.set(qdxcat.QDX.TX_RISE, value, verify=qdxcat.QDX.VERIFY_DEFERRED) for value in (9, 10)] )
+    assert [future.result(timeout=1) for future in futures] == [None, 10]
+
+    # firmware ignoring a setting
+    emulator._set = lambda spec, value: None
+    errors = []
+    future = radio.set(qdxcat.QDX.TX_FALL, 12, verify=qdxcat.QDX.VERIFY_DEFERRED, callback=errors.append)
+
+    with pytest.raises(qdxcat.QDXVerifyError):
+        future.result(timeout=1)
+
+    assert errors[0].failed == {qdxcat.QDX.TX_FALL: (12, 10)}
+    assert radio.get(qdxcat.QDX.TX_FALL) == 10
+
+def test_transaction(radio, emulator):
+    settings = {qdxcat.QDX.SIDEBAND: 0, qdxcat.QDX.VOX_EN: 1, qdxcat.QDX.TX_RISE: 8, qdxcat.QDX.TX_FALL: 8}
+    assert radio.transaction(settings) == settings
+
+    with pytest.raises(ValueError):
+        radio.transaction({qdxcat.QDX.TX_RISE: 10, qdxcat.QDX.OPERATING_MODE: 2})
+    assert emulator.state['Q4'] == 8
+
+    # firmware ignoring a setting, previous values are restored
+    set_value = emulator._set
+    emulator._set = lambda spec, value: None if spec.code == 'Q5' else set_value(spec, value)
+
+    with pytest.raises(qdxcat.QDXVerifyError) as error:
+        radio.transaction({qdxcat.QDX.TX_RISE: 10, qdxcat.QDX.TX_FALL: 10})
+
+    assert error.value.rolled_back
+    assert error.value.failed == {qdxcat.QDX.TX_FALL: (10, 8)}
+    assert emulator.state['Q4'] == 8
+
+def test_ptt_engine(radio, emulator):
+    radio.ptt.warm()
+    requests = emulator.requests
+
+    # single write, no read back on the critical path
+    radio.ptt.key_up()
+    assert emulator.requests == requests + 1
+    assert emulator.state['TQ'] == 1
+
+    target = time.monotonic() + 0.02
+    latency = radio.ptt.schedule(0, at=target).result(timeout=1)
+    assert time.monotonic() >= target
+    assert 0 <= latency < 0.1
+    assert emulator.state['TQ'] == 0
+
+    radio.ptt.schedule(1, utc=time.time() + 0.01).result(timeout=1)
+    assert radio.ptt.latency_stats()['count'] == 2
+
+    # keyed down and up again before read back, no stale verification failure
+    errors = []
+    radio.ptt._callback = errors.append
+    radio._worker.call( lambda: [radio.ptt.key_down(), radio.ptt.key_up()] )
+    radio._worker.call(lambda: None, priority=qdxcat.QDX.PRIORITY_BULK)
+    assert errors == [] and radio.ptt.last_error is None
+    assert emulator.state['TQ'] == 1
+
+    # firmware ignoring PTT, reported by background verification
+    emulator._set = lambda spec, value: None
+    radio.ptt.key_down()
+    # queued after the verification batch
+    radio._worker.call(lambda: None, priority=qdxcat.QDX.PRIORITY_BULK)
+    assert isinstance(errors[0], qdxcat.QDXVerifyError)
+
+def test_scan(radio, emulator):
+    emulator.state['FA'] = 7078000
+    radio.enable_stats()
+    scan = radio.scan(start=14074000, stop=14076000, step=500, commands=[qdxcat.QDX.VFO_A, qdxcat.QDX.OPERATING_MODE])
+
+    results = list(scan)
+    assert [result.frequency for result in results] == [14074000, 14074500, 14075000, 14075500, 14076000]
+    assert all(result.values[qdxcat.QDX.VFO_A] == result.frequency for result in results)
+    # one round trip per step, plus the first set, the original frequency read and restore
+    assert radio.stats()['transactions'] == len(scan) + 3
+    assert emulator.state['FA'] == 7078000
+
+    columns = radio.scan(frequencies=[7074000, 10136000], dwell=0.01, commands=[qdxcat.QDX.VFO_A]).to_columns()
+    assert list(columns[qdxcat.QDX.VFO_A]) == [7074000, 10136000]
+    assert columns['timestamp'][1] - columns['timestamp'][0] >= 0.01
+
+    with pytest.raises(ValueError):
+        radio.scan(frequencies=[-1])
+
+def test_radio_state(radio, emulator):
+    info = radio.get(qdxcat.QDX.RADIO_INFO_DICT, update=True)
+    assert isinstance(info, qdxcat.RadioInfo)
+    assert info['vfo_freq'] == emulator.state['FA'] and info['mode'] == 'USB'
+    assert info == info.to_dict()
+
+    with pytest.raises(AttributeError):
+        info.fields = ()
+
+    # dict-style access to local settings
+    assert isinstance(radio.settings, qdxcat.RadioState)
+    assert radio.settings[qdxcat.QDX.VFO_A] == emulator.state['FA']
+    assert qdxcat.QDX.TX_FALL not in radio.settings
+    radio.settings['custom'] = 1
+    assert dict(radio.settings)['custom'] == 1
+    del radio.settings[qdxcat.QDX.VFO_A]
+    assert radio.setting_age(qdxcat.QDX.VFO_A) is None
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='Unix sockets not supported')
+def test_broker(radio, emulator, tmp_path):
+    emulator.latency = 0.05
+
+    with qdxcat.Broker(radio, str(tmp_path / 'broker.sock')) as broker:
+        clients = [qdxcat.BrokerClient(broker.path) for i in range(4)]
+        requests = emulator.requests
+
+        # concurrent duplicate reads share one serial transaction
+        with concurrent.futures.ThreadPoolExecutor(len(clients)) as executor:
+            values = list( executor.map(lambda client: client.get(qdxcat.QDX.VFO_A, update=True), clients) )
+
+        assert values == [emulator.state['FA']] * len(clients)
+        assert emulator.requests - requests < len(clients)
+        assert broker.coalesced > 0
+
+        assert clients[0].set(qdxcat.QDX.VFO_A, 7074000) == 7074000
+        assert clients[1].get(qdxcat.QDX.VFO_A) == 7074000
+        assert isinstance(clients[1].get(qdxcat.QDX.RADIO_INFO_DICT, update=True), qdxcat.RadioInfo)
+
+        with pytest.raises(qdxcat.QDXCommandError):
+            emulator.version = 1.05
+            clients[0].get(qdxcat.QDX.VOX_EN, update=True)
+
+        changes = queue.Queue()
+        clients[2].subscribe(changes.put, [qdxcat.QDX.VFO_A])
+        clients[3].set(qdxcat.QDX.VFO_A, 7078000)
+        change = changes.get(timeout=5)
+        assert (change.cmd, change.new_value) == (qdxcat.QDX.VFO_A, 7078000)
+
+        # requests that are not JSON objects get an error reply
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(broker.path)
+            replies = sock.makefile('r')
+
+            for line in [b'[1]\n', b'"x"\n', b'not json\n']:
+                sock.sendall(line)
+                assert json.loads(replies.readline())['error']['type'] == 'ValueError'
+
+        for client in clients:
+            client.close()
+
+def test_lazy_connect(emulator, monkeypatch):
+    monkeypatch.setattr(qdxcat.QDXBase, '_candidate_ports', lambda self: [ListPortInfo('emulator')])
+    qdxcat.QDX.clear_discovery_cache()
+
+    # no serial I/O during construction
+    radio = qdxcat.QDX(transport=emulator.transport, lazy=True)
+    assert emulator.requests == 0
+    assert radio.connect(sync=False).result(timeout=5) == 'emulator'
+    assert emulator.requests == 1
+
+    # discovery results are shared by later QDX objects
+    other = qdxcat.QDX(transport=emulator.transport, lazy=True)
+    other.connect(sync=False).result(timeout=5)
+    assert emulator.requests == 1
+
+    # connect on first use
+    first_use = qdxcat.QDX('emulator', transport=emulator.transport, lazy=True)
+    assert first_use.get(qdxcat.QDX.VFO_A) == emulator.state['FA']
+
+    async def run():
+        radio = qdxcat.AsyncQDX(transport=emulator.transport)
+        return await radio.connect(sync=False)
+
+    assert asyncio.run(run()) == 'emulator'
+    qdxcat.QDX.clear_discovery_cache()
+
+    for qdx in (radio, other, first_use):
+        qdx.close()
+
+def test_async_autodetect(emulator, monkeypatch):
+    threads = []
+
+    def candidate_ports(self):
+        threads.append(threading.current_thread())
+        return [ListPortInfo('emulator')]
+
+    load_settings = qdxcat.AsyncQDX._load_settings
+    monkeypatch.setattr(qdxcat.QDXBase, '_candidate_ports', candidate_ports)
+    monkeypatch.setattr(qdxcat.AsyncQDX, '_load_settings', lambda self: threads.append(threading.current_thread()) or load_settings(self))
+    qdxcat.QDX.clear_discovery_cache()
+
+    async def run():
+        radio = qdxcat.AsyncQDX(transport=emulator.transport)
+        # probe uses the custom transport
+        assert await radio._probe('emulator')
+        port = await radio.connect(sync=False)
+        radio.close()
+        return port
+
     try:
-        total += 1
-        if cmd['set'] is not None:
-            if value is None:
-                if cmd['map'] is not None:
-                    if '0' in cmd['map'].keys():
-                        value = 0
-                    else:
-                        for key, val in cmd['map'].items():
-                            value = key
-                            break
-                else:
-                    raise Exception('no known value to set')
-            else:
-                radio.command(cmd['cmd'], value)
-    except Exception as e:
-        failed += 1
-        failed_cmds['set ' + cmd['label']] = cmd['cmd']
-        print('   set: fail')
-        print('      ' + str(e))
-    else:
-        if cmd['set'] is None:
-            passed += 1
-            print('   set: None')
-        else:
-            passed += 1
-            print('   set: pass')
-
-
-print('\n\nTest Summary:')
-print('   ' + str(passed) + '/' + str(total) + ' passed')
-print('   ' + str(skipped) + '/' + str(total) + ' skipped')
-for label, cmd in skipped_cmds.items():
-    print('      ' + label + ' (' + cmd + ')')
-print('   ' + str(failed) + '/' + str(total) + ' failed')
-for label, cmd in failed_cmds.items():
-    print('      ' + label + ' (' + cmd + ')')
-print('')
+        assert asyncio.run(run()) == 'emulator'
+        assert emulator.requests >= 2
+        # port enumeration and settings snapshot loading do not block the event loop
+        assert len(threads) == 2 and threading.current_thread() not in threads
+    finally:
+        qdxcat.QDX.clear_discovery_cache()
+
+def test_profile(radio, emulator, tmp_path):
+    path = str(tmp_path / 'station.json')
+    radio.export_profile('station').save(path)
+    profile = qdxcat.Profile.load(path)
+    assert profile.name == 'station' and qdxcat.QDX.TXCO_FREQ not in profile.settings
+
+    # nothing to write when the radio already matches
+    requests = emulator.requests
+    assert radio.apply_profile(profile) == {}
+    assert emulator.requests == requests
+
+    other_emulator = QDXEmulator()
+    other_emulator.state['Q4'] = 20
+    other = qdxcat.QDX(autodetect=False, transport=other_emulator.transport)
+    other.set_port('emulator', sync=False)
+    other.enable_stats()
+
+    assert other.apply_profile(profile) == {qdxcat.QDX.TX_RISE: (20, 10)}
+    assert other_emulator.state['Q4'] == 10
+    # pipelined diff read, then one transaction (rollback read, write, and verify)
+    assert other.stats()['transactions'] == math.ceil(len(profile.settings) / qdxcat.QDX.BATCH_SIZE) + 3
+
+    with pytest.raises(ValueError):
+        qdxcat.Profile({qdxcat.QDX.TX_RISE: 101})
+
+    other.close()
+
+def test_recorder(radio, emulator, tmp_path):
+    path = str(tmp_path / 'session.qdxr')
+
+    with radio.start_recording(path) as recorder:
+        radio.get(qdxcat.QDX.RADIO_INFO_DICT, update=True)
+        radio.set(qdxcat.QDX.VFO_A, 7074000)
+        radio.get_many([qdxcat.QDX.VFO_B, qdxcat.QDX.OPERATING_MODE], update=True)
+
+    assert recorder.records == 4
+    records = list( read_records(path) )
+    assert [record.request for record in records] == ['IF;', 'FA7074000;', 'FA;', 'FB;MD;']
+    assert records[1].responses == []
+    assert all(record.timestamp <= later.timestamp for record, later in zip(records, records[1:]))
+
+    results = [values for record, values in Replay(path)]
+    assert results[0][qdxcat.QDX.RADIO_INFO_DICT] == radio.settings[qdxcat.QDX.RADIO_INFO_DICT]
+    assert results[2] == {qdxcat.QDX.VFO_A: 7074000}
+    assert results[3][qdxcat.QDX.OPERATING_MODE] == emulator.state['MD']
+
+    start = time.monotonic()
+    assert len( list(Replay(path).results(realtime=True)) ) == 4
+    assert time.monotonic() - start >= records[-1].timestamp - records[0].timestamp
+
+    assert Replay(path).benchmark()['responses'] == 4
+
+    # non-ASCII characters are replaced instead of raising in the response hook
+    with qdxcat.Recorder(str(tmp_path / 'noise.qdxr')) as recorder:
+        recorder.record('FA;', ['FA\u00ff;'], 0.01)
+        recorder.record('IF;', ['IFgarbage;'], 0.01)
+
+    assert list( read_records(recorder.path) )[0].responses == ['FA?;']
+
+    # malformed responses are replayed as failed commands
+    results = list( Replay(recorder.path) )
+    assert len(results) == 2
+    assert isinstance(results[1][1][qdxcat.QDX.RADIO_INFO_DICT], qdxcat.QDXCommandError)
+
+def test_telemetry(radio, emulator, tmp_path):
+    telemetry = qdxcat.Telemetry(radio, capacity=4, interval=10, downsample=2)
+    assert telemetry.columns[:3] == ['timestamp', qdxcat.QDX.VFO_A, qdxcat.QDX.TX_STATE]
+
+    telemetry.sample()
+    assert len(telemetry) == 0
+    telemetry.sample()
+    columns = telemetry.to_columns()
+    assert list(columns[qdxcat.QDX.VFO_A]) == [emulator.state['FA']]
+    assert columns['_IF.vfo_freq'][0] == emulator.state['FA']
+
+    telemetry.clear()
+    telemetry.downsample = 1
+    # tx for 10 of 40 seconds (last sample lasts one interval), ring buffer keeps the last 4 samples
+    for timestamp, frequency, tx in [(0, 14074000, 1), (10, 7074000, 0), (20, 7074000, 1), (30, 7074000, 0), (40, 14074000, 0)]:
+        telemetry.record({qdxcat.QDX.VFO_A: frequency, qdxcat.QDX.TX_STATE: tx}, timestamp)
+
+    assert len(telemetry) == 4
+    assert list(telemetry.to_columns()['timestamp']) == [10, 20, 30, 40]
+    assert telemetry.duty_cycle() == 0.25
+    assert telemetry.duty_cycle(start=20, end=20) == 1
+    assert telemetry.dwell_histogram(bin_width=1000) == {7074000: 30, 14074000: 10}
+    assert math.isnan(telemetry.to_columns()['_IF.tx'][0])
+
+    path = str(tmp_path / 'telemetry.csv')
+    telemetry.export_csv(path)
+
+    with open(path) as f:
+        lines = f.read().splitlines()
+
+    assert lines[0].split(',') == telemetry.columns
+    assert len(lines) == 5
+
+    with pytest.raises(ValueError):
+        qdxcat.Telemetry(radio, commands=[qdxcat.QDX.RADIO_INFO])
+
+    running = radio.start_telemetry(interval=0.01)
+    time.sleep(0.1)
+    running.stop()
+    assert len(running) > 0
+    assert running.last_error is None
+
+def test_rigctld(emulator):
+    async def run():
+        radio = qdxcat.AsyncQDX('emulator', transport=emulator.transport)
+        await radio.set_port('emulator', sync=False)
+
+        async with RigctlServer(radio, port=0, cache_ttl=10) as server:
+            clients = [await asyncio.open_connection('127.0.0.1', server.port) for i in range(5)]
+
+            async def command(client, line, lines=1):
+                reader, writer = client
+                writer.write( (line + '\n').encode('ascii') )
+                return [ (await reader.readline()).decode('ascii').strip() for i in range(lines) ]
+
+            requests = emulator.requests
+            async def poll(client):
+                return [await command(client, 'f') for i in range(10)]
+
+            polls = await asyncio.gather( *[poll(client) for client in clients] )
+            assert polls == [[[str(emulator.state['FA'])]] * 10] * 5
+            # one status request shared by all polls
+            assert emulator.requests - requests == 1
+            assert server.coalesced > 0
+
+            client = clients[0]
+            assert await command(client, 'F 7074000.000000') == ['RPRT 0']
+            assert await command(client, '\\get_freq') == ['7074000']
+            assert emulator.state['FA'] == 7074000
+            assert await command(client, 'M LSB 0') == ['RPRT 0']
+            assert await command(client, 'm', 2) == ['LSB', str(emulator.state['FW'])]
+            assert await command(client, 'T 1') == ['RPRT 0']
+            assert await command(client, 't') == ['1']
+            assert emulator.state['TQ'] == 1
+            assert await command(client, 'T 0') == ['RPRT 0']
+            assert await command(client, 'S 1 VFOB') == ['RPRT 0']
+            assert await command(client, 's', 2) == ['1', 'VFOB']
+            assert await command(client, 'M AM 0') == ['RPRT -1']
+            assert await command(client, 'x') == ['RPRT -4']
+            assert (await command(client, '\\dump_state'))[0] == '0'
+
+            assert server.clients == 5
+
+            for reader, writer in clients:
+                writer.close()
+
+        radio.close()
+
+    asyncio.run(run())
+
+def test_rigctld_rejected():
+    # filter bandwidth not reported by the radio
+    emulator = QDXEmulator()
+    del emulator.state['FW']
+
+    async def run():
+        radio = qdxcat.AsyncQDX('emulator', transport=emulator.transport)
+        await radio.set_port('emulator', sync=False)
+        server = RigctlServer(radio)
+        response = await server.execute('m')
+        radio.close()
+        return response
+
+    assert asyncio.run(run()) == 'RPRT -9\n'
+
+def test_monitor_poll(radio, emulator):
+    monitor = qdxcat.Monitor(radio, [qdxcat.QDX.VFO_A, qdxcat.QDX.TX_STATE, qdxcat.QDX.AUDIO_GAIN])
+    received = []
+
+    def failing(change):
+        raise RuntimeError('subscriber error')
+
+    monitor.subscribe(failing)
+    monitor.subscribe(received.append)
+
+    # first poll publishes all unknown values
+    changes = monitor.poll()
+    assert [change.cmd for change in changes] == monitor.commands
+    assert received == changes
+    assert isinstance(monitor.last_callback_error, RuntimeError)
+
+    # only changed values are published
+    assert monitor.poll() == []
+    emulator.state['FA'] = 10136000
+    emulator.state['AG'] += 1
+    changes = monitor.poll()
+    assert [(change.cmd, change.new_value) for change in changes] == [(qdxcat.QDX.VFO_A, 10136000), (qdxcat.QDX.AUDIO_GAIN, emulator.state['AG'])]
+    assert received[-2:] == changes
+
+    monitor.unsubscribe(failing)
+    monitor.unsubscribe(received.append)
+    emulator.state['TQ'] = 1
+    monitor.poll()
+    assert received[-1].cmd == qdxcat.QDX.AUDIO_GAIN
+
+def test_monitor_thread(radio, emulator):
+    monitor = qdxcat.Monitor(radio, [qdxcat.QDX.VFO_A], min_interval=0.05, max_interval=0.2, backoff=2)
+    monitor.poll()
+    monitor.start()
+    assert monitor.running
+
+    # backs off while nothing changes
+    time.sleep(0.5)
+    assert monitor.interval == 0.2
+
+    # resets to the minimum interval after a change
+    published = queue.Queue()
+    monitor.subscribe(published.put)
+    emulator.state['FA'] = 10136000
+    change = published.get(timeout=1)
+    assert (change.old_value, change.new_value) == (7074000, 10136000)
+    deadline = time.monotonic() + 0.2
+
+    while monitor.interval != monitor.min_interval and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    assert monitor.interval == monitor.min_interval
+
+    threading.Timer(0.05, emulator.state.__setitem__, ('FA', 3573000)).start()
+    assert next( monitor.changes(timeout=1) ).new_value == 3573000
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, emulator.state.__setitem__, 'FA', 7074000)
+
+        async for change in monitor:
+            return change
+
+    assert asyncio.run(run()).new_value == 7074000
 
+    # changes stops iterating after the timeout
+    assert list(monitor.changes(timeout=0.1)) == []
 
+    monitor.stop()
+    assert not monitor.running
+    assert monitor.last_error is None
+    requests = emulator.requests
+    time.sleep(0.1)
+    assert emulator.requests == requests